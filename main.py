@@ -1,7 +1,10 @@
 """Main CLI application."""
 
 import os
+import signal
 import sys
+import threading
+from datetime import datetime
 from pathlib import Path
 
 import click
@@ -42,8 +45,13 @@ def setup_logging(log_level: str, log_file: str):
 @click.option('--config-file', type=click.Path(), help='Configuration file path')
 @click.option('--log-level', default='INFO', help='Logging level')
 @click.option('--debug', is_flag=True, help='Enable debug mode')
+@click.option('--profile', is_flag=True, help='Profile the command and print its hotspots')
+@click.option('--profile-mode', type=click.Choice(['deterministic', 'sampling']), default='deterministic',
+              help='cProfile every call, or sample the stacks of all threads')
+@click.option('--profile-memory', is_flag=True, help='Also trace allocations with tracemalloc')
+@click.option('--profile-top', default=20, type=int, help='Hotspots and allocation sites reported')
 @click.pass_context
-def cli(ctx, config_file, log_level, debug):
+def cli(ctx, config_file, log_level, debug, profile, profile_mode, profile_memory, profile_top):
     """Food Tech Analytics Data Parser CLI."""
     # Load environment variables
     if config_file and Path(config_file).exists():
@@ -65,14 +73,56 @@ def cli(ctx, config_file, log_level, debug):
     ctx.ensure_object(dict)
     ctx.obj['container'] = container
     
+    if profile:
+        profiler = container.profiler(mode=profile_mode, memory=profile_memory, top=profile_top)
+        container.instrumentation().add_listener(profiler.add_run)
+        profiler.start()
+        # Runs after the command, also when it exits with an error
+        ctx.call_on_close(lambda: _finish_profile(profiler, ctx.invoked_subcommand or 'cli'))
+    
     logger.info("Food Tech Analytics Data Parser initialized")
 
 
+def _finish_profile(profiler, command):
+    """Stop profiling a command, write its report and print the hotspots."""
+    profiler.stop()
+    try:
+        report_path, report = profiler.write(command)
+    except OSError as e:
+        logger.error(f"Could not write profile: {e}")
+        click.echo(f"Could not write profile: {e}", err=True)
+        return
+    
+    click.echo(f"\nProfile of {command} ({report['mode']}, {report['seconds']:.2f}s): {report_path}")
+    if report['stages']:
+        click.echo("Stages:")
+        for stage, totals in report['stages'].items():
+            click.echo(f"  {stage:<10} {totals['seconds']:9.3f}s  {totals['calls']:6} calls  "
+                       f"{totals['rows_out']:9} rows out")
+        slowest = list(report['files'].items())[:5]
+        click.echo("Slowest files:")
+        for name, totals in slowest:
+            click.echo(f"  {totals['seconds']:9.3f}s  {name}")
+    if report['hotspots']:
+        click.echo(f"Top {len(report['hotspots'])} hotspots (own time):")
+    for hotspot in report['hotspots']:
+        calls = f"{hotspot['calls']:8} calls" if hotspot['calls'] is not None else ''
+        click.echo(f"  {hotspot['self_seconds']:9.3f}s  {hotspot['total_seconds']:9.3f}s total  {calls:>14}  "
+                   f"{hotspot['function']}")
+    if 'allocations' in report:
+        click.echo(f"Top {len(report['allocations'])} allocation sites "
+                   f"(traced peak {report['traced_peak_bytes'] / 2 ** 20:.1f} MiB):")
+        for allocation in report['allocations']:
+            click.echo(f"  {allocation['size_bytes'] / 2 ** 10:10.1f} KiB  {allocation['count']:8} blocks  "
+                       f"{allocation['site']}")
+
+
 @cli.command()
 @click.option('--partner-id', required=True, help='Partner ID to process')
 @click.option('--dry-run', is_flag=True, help='Validate only, do not insert to database')
+@click.option('--new-only', is_flag=True, help='Only process files new or modified since the last run')
 @click.pass_context
-def parse_partner(ctx, partner_id, dry_run):
+def parse_partner(ctx, partner_id, dry_run, new_only):
     """Parse data for a specific partner."""
     container = ctx.obj['container']
     
@@ -91,7 +141,8 @@ def parse_partner(ctx, partner_id, dry_run):
         result = data_processing_service.process_partner_data(
             partner_id=partner_id,
             data_sources_path=app_config.data_sources_path,
-            dry_run=dry_run or app_config.dry_run
+            dry_run=dry_run or app_config.dry_run,
+            new_only=new_only
         )
         
         # Display results
@@ -99,6 +150,16 @@ def parse_partner(ctx, partner_id, dry_run):
         click.echo(f"Success: {result['success']}")
         click.echo(f"Files processed: {result['files_processed']}")
         click.echo(f"Records processed: {result['records_processed']}")
+        click.echo(f"Records rejected: {result['records_rejected']}")
+        if result['records_skipped']:
+            click.echo(f"Records skipped (already loaded): {result['records_skipped']}")
+        if result['records_rejected'] and not (dry_run or app_config.dry_run):
+            click.echo(f"Rejected rows quarantined under run: {result['run_id']}")
+        for validation in result['validation']:
+            if validation['mode'] == 'sample' or validation['escalated']:
+                click.echo(f"Validation of {validation['sheet_name']}: sampled {validation['sample_size']} "
+                           f"of {validation['rows']} rows"
+                           f"{', escalated to full' if validation['escalated'] else ''}")
         
         if result['warnings']:
             click.echo(f"\nWarnings:")
@@ -121,16 +182,26 @@ def parse_partner(ctx, partner_id, dry_run):
 
 @cli.command()
 @click.option('--dry-run', is_flag=True, help='Validate only, do not insert to database')
+@click.option('--new-only', is_flag=True, help='Only process files new or modified since the last run')
+@click.option('--distributed', is_flag=True,
+              help='Share the files with parse-all --distributed on other nodes through the job queue')
 @click.pass_context
-def parse_all(ctx, dry_run):
+def parse_all(ctx, dry_run, new_only, distributed):
     """Parse data for all configured partners."""
     container = ctx.obj['container']
     
+    if distributed and (dry_run or container.app_config().dry_run):
+        raise click.UsageError("--distributed cannot be combined with a dry run")
+    
     try:
         # Get services
         data_processing_service = container.data_processing_service()
         app_config = container.app_config()
         
+        if distributed:
+            _parse_all_distributed(container, new_only)
+            return
+        
         # Override dry_run if specified
         if dry_run:
             os.environ['DRY_RUN'] = 'true'
@@ -140,7 +211,8 @@ def parse_all(ctx, dry_run):
         # Process all partners
         results = data_processing_service.process_all_partners(
             data_sources_path=app_config.data_sources_path,
-            dry_run=dry_run or app_config.dry_run
+            dry_run=dry_run or app_config.dry_run,
+            new_only=new_only
         )
         
         # Display results
@@ -189,6 +261,272 @@ def parse_all(ctx, dry_run):
         sys.exit(1)
 
 
+def _parse_all_distributed(container, new_only):
+    """Queue every partner's files, skipping those done already, and run jobs alongside the other nodes."""
+    logger.info(f"Starting distributed processing as node {container.job_queue().node_id}")
+    _queue_partner_files(container, None, new_only=new_only, skip_done=True)
+    stats = _drain_queue(container, None, wait_for_retries=True, dry_run=False)
+    if stats.failed:
+        click.echo("Failed jobs are listed by 'queue status --status failed'")
+        sys.exit(1)
+    click.echo("\nAll processing completed successfully!")
+
+
+@cli.command()
+@click.option('--run-id', required=True, help='Run whose quarantined rejects should be replayed')
+@click.option('--dry-run', is_flag=True, help='Validate only, do not insert to database')
+@click.option('--force', is_flag=True, help='Replay reject files that an earlier reingest replayed as well')
+@click.pass_context
+def reingest(ctx, run_id, dry_run, force):
+    """Replay corrected rejected rows of a previous run."""
+    container = ctx.obj['container']
+    
+    try:
+        data_processing_service = container.data_processing_service()
+        app_config = container.app_config()
+        
+        logger.info(f"Replaying rejects of run: {run_id}")
+        
+        result = data_processing_service.reingest_rejects(
+            run_id=run_id,
+            dry_run=dry_run or app_config.dry_run,
+            force=force
+        )
+        
+        click.echo(f"\nReplay Results for run {run_id}:")
+        click.echo(f"Success: {result['success']}")
+        click.echo(f"Records processed: {result['records_processed']}")
+        click.echo(f"Records rejected: {result['records_rejected']}")
+        if result['records_rejected'] and not (dry_run or app_config.dry_run):
+            click.echo(f"Rows still failing quarantined under run: {result['run_id']}")
+        
+        if result['warnings']:
+            click.echo(f"\nWarnings:")
+            for warning in result['warnings']:
+                click.echo(f"  - {warning}")
+        
+        if result['errors']:
+            click.echo(f"\nErrors:")
+            for error in result['errors']:
+                click.echo(f"  - {error}")
+            sys.exit(1)
+        
+        click.echo("\nReplay completed successfully!")
+        
+    except Exception as e:
+        logger.error(f"Failed to replay rejects of run {run_id}: {e}")
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+
+@cli.command()
+@click.option('--partner-id', 'partner_ids', multiple=True, help='Partner ID to watch (repeatable; all if omitted)')
+@click.option('--interval', type=float, help='Seconds between polls')
+@click.option('--settle', type=float, help='Seconds a file must stay unchanged before it is loaded')
+@click.option('--workers', type=int, help='Partner batches processed at once')
+@click.option('--dry-run', is_flag=True, help='Validate only, do not insert to database')
+@click.pass_context
+def watch(ctx, partner_ids, interval, settle, workers, dry_run):
+    """Load partner files continuously as they are dropped."""
+    container = ctx.obj['container']
+    
+    try:
+        watch_service = container.watch_service()
+        app_config = container.app_config()
+        if interval is not None:
+            watch_service.interval = interval
+        if settle is not None:
+            watch_service.settle_seconds = settle
+        if workers is not None:
+            watch_service.workers = max(1, workers)
+        
+        # Finish the batches in flight on Ctrl+C or SIGTERM
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+        
+        def report(result):
+            marker = "✓" if result['success'] else "✗"
+            click.echo(f"{marker} {result['partner_id']}: {result['files_processed']} files, "
+                       f"{result['records_processed']} records, {result['records_rejected']} rejected")
+            for error in result['errors']:
+                click.echo(f"  - {error}")
+        
+        click.echo(f"Watching {app_config.data_sources_path} (Ctrl+C to stop)")
+        stats = watch_service.run(
+            data_sources_path=app_config.data_sources_path,
+            partner_ids=list(partner_ids) or None,
+            dry_run=dry_run or app_config.dry_run,
+            stop=stop,
+            on_result=report
+        )
+        
+        click.echo(f"\nStopped: {stats.files_processed} files with {stats.records_processed} records loaded, "
+                   f"{stats.files_failed} files failed")
+        
+    except Exception as e:
+        logger.error(f"Failed to watch data sources: {e}")
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+
+@cli.group()
+def queue():
+    """Durable job queue of partner files."""
+
+
+@queue.command('enqueue')
+@click.option('--partner-id', 'partner_ids', multiple=True, help='Partner ID to queue (repeatable; all if omitted)')
+@click.option('--priority', default=0, type=int, help='Higher priorities run first')
+@click.option('--new-only', is_flag=True, help='Only queue files new or modified since the last run')
+@click.pass_context
+def queue_enqueue(ctx, partner_ids, priority, new_only):
+    """Queue the data files of partners."""
+    container = ctx.obj['container']
+    
+    try:
+        total = _queue_partner_files(container, partner_ids, priority, new_only)
+        click.echo(f"\n{total} jobs queued")
+        
+    except Exception as e:
+        logger.error(f"Failed to queue files: {e}")
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+
+@queue.command('status')
+@click.option('--status', 'status_filter', type=click.Choice(['queued', 'running', 'done', 'failed']),
+              help='List only jobs in this status')
+@click.option('--partner-id', help='List only jobs of this partner')
+@click.option('--limit', default=20, type=int, help='Jobs listed')
+@click.pass_context
+def queue_status(ctx, status_filter, partner_id, limit):
+    """Show queued, running, done and failed jobs."""
+    container = ctx.obj['container']
+    
+    try:
+        job_queue = container.job_queue()
+        
+        counts = job_queue.counts()
+        if not counts:
+            click.echo("The queue is empty.")
+            return
+        
+        statuses = ['queued', 'running', 'done', 'failed']
+        click.echo(f"\n{'Partner':<15} " + " ".join(f"{status:<8}" for status in statuses))
+        click.echo("-" * 50)
+        for partner, partner_counts in sorted(counts.items()):
+            click.echo(f"{partner:<15} " + " ".join(f"{partner_counts.get(status, 0):<8}" for status in statuses))
+        
+        jobs = job_queue.jobs(status=status_filter, partner_id=partner_id, limit=limit)
+        if jobs:
+            click.echo(f"\n{'Job':<6} {'Status':<8} {'Partner':<15} {'Tries':<6} {'Size':>12}  File")
+            for job in jobs:
+                click.echo(f"{job.id:<6} {job.status:<8} {job.partner_id:<15} "
+                           f"{job.attempts}/{job.max_attempts:<4} {job.size_bytes:>12}  {Path(job.file_path).name}")
+                if job.status == 'running' and job.lease_owner:
+                    expires = datetime.fromtimestamp(job.lease_expires_at).strftime('%H:%M:%S')
+                    click.echo(f"       leased to {job.lease_owner} until {expires}")
+                if job.last_error:
+                    click.echo(f"       {job.last_error}")
+        
+    except Exception as e:
+        logger.error(f"Failed to show the queue: {e}")
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+
+@queue.command('drain')
+@click.option('--workers', type=int, help='Jobs run at once')
+@click.option('--no-wait', is_flag=True, help='Stop when no job is due instead of waiting for retries')
+@click.option('--dry-run', is_flag=True, help='Validate only, do not insert to database')
+@click.pass_context
+def queue_drain(ctx, workers, no_wait, dry_run):
+    """Run queued jobs until the queue is empty."""
+    container = ctx.obj['container']
+    
+    try:
+        app_config = container.app_config()
+        stats = _drain_queue(container, workers, not no_wait, dry_run or app_config.dry_run)
+        if stats.failed:
+            sys.exit(1)
+        
+    except Exception as e:
+        logger.error(f"Failed to drain the queue: {e}")
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+
+def _queue_partner_files(container, partner_ids, priority=0, new_only=False, skip_done=False):
+    """Queue the data files of partners (all if none given); returns the number of jobs added."""
+    data_processing_service = container.data_processing_service()
+    job_queue = container.job_queue()
+    app_config = container.app_config()
+    
+    total = 0
+    for partner_id in partner_ids or container.config_service().list_partners():
+        try:
+            files = data_processing_service.plan_files(app_config.data_sources_path, partner_id, new_only)
+        except FileNotFoundError as e:
+            click.echo(f"  - {partner_id}: {e}")
+            continue
+        job_ids = job_queue.enqueue(partner_id, files, priority, skip_done=skip_done)
+        click.echo(f"{partner_id}: {len(job_ids)} of {len(files)} files queued")
+        total += len(job_ids)
+    # Queued files are durable now; record them as seen
+    if data_processing_service.discovery_service is not None:
+        data_processing_service.discovery_service.save()
+    return total
+
+
+def _drain_queue(container, workers, wait_for_retries, dry_run):
+    """Run queued jobs until none is left, printing each result; returns the drain counters."""
+    data_processing_service = container.data_processing_service()
+    job_queue = container.job_queue()
+    app_config = container.app_config()
+    
+    # Finish the jobs running on Ctrl+C or SIGTERM
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    
+    def process(job):
+        return data_processing_service.process_files(job.partner_id, [Path(job.file_path)], dry_run)
+    
+    def report(job, result):
+        marker = "✓" if result['success'] else "✗"
+        click.echo(f"{marker} job {job.id} {job.partner_id} {Path(job.file_path).name}: "
+                   f"{result['records_processed']} records")
+    
+    stats = job_queue.drain(process, workers=workers or app_config.queue_workers, stop=stop,
+                            wait_for_retries=wait_for_retries, on_result=report)
+    
+    click.echo(f"\n{stats.succeeded} jobs succeeded, {stats.retried} to be retried, {stats.failed} failed; "
+               f"{stats.records_processed} records processed")
+    if stats.lost:
+        click.echo(f"{stats.lost} jobs were taken over by other nodes after their leases expired")
+    return stats
+
+
+@queue.command('retry')
+@click.option('--job-id', 'job_ids', multiple=True, type=int, help='Job to retry (repeatable; all failed if omitted)')
+@click.option('--running', is_flag=True, help='Also requeue running jobs whose lease expired (after a drain died)')
+@click.pass_context
+def queue_retry(ctx, job_ids, running):
+    """Queue failed jobs again."""
+    container = ctx.obj['container']
+    
+    try:
+        statuses = ('failed', 'running') if running else ('failed',)
+        count = container.job_queue().requeue(list(job_ids) or None, statuses)
+        click.echo(f"{count} jobs requeued")
+        
+    except Exception as e:
+        logger.error(f"Failed to requeue jobs: {e}")
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+
 @cli.command()
 @click.option('--partner-id', required=True, help='Partner ID to validate')
 @click.pass_context
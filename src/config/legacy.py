@@ -0,0 +1,129 @@
+"""Normalization of legacy partner configurations into the current schema."""
+
+from typing import Any, Dict, List
+
+from loguru import logger
+
+# Legacy data_type -> column_type; types the schema lacks are kept as text
+_COLUMN_TYPES = {
+    'string': 'string',
+    'integer': 'integer',
+    'int': 'integer',
+    'float': 'float',
+    'decimal': 'decimal',
+    'date': 'date',
+    'datetime': 'datetime',
+    'boolean': 'boolean',
+    'time': 'string',
+}
+
+_FILE_FORMATS = {'excel': 'excel', 'xlsx': 'excel', 'xls': 'excel', 'csv': 'csv', 'json': 'json'}
+
+# Characters stripped by the legacy currency_to_decimal transformation
+_CURRENCY_SYMBOLS = ('₹', ',')
+
+
+def is_legacy_config(data: Dict[str, Any]) -> bool:
+    """Check whether a configuration uses the legacy data_sources layout."""
+    return 'data_sources' in data and 'source_config' not in data
+
+
+def normalize_partner_config(data: Dict[str, Any], partner_id: str) -> Dict[str, Any]:
+    """
+    Convert a configuration to the current PartnerConfig layout.
+
+    Current configurations are returned unchanged. Legacy ones describe
+    data_sources with file_patterns and sheets whose column_mappings name
+    source columns by a logical name, and separate data_transformations that
+    map those names to table columns. Every data source becomes a source
+    config with its file patterns; every data transformation becomes a
+    target of its sheet. Legacy header_row is 0-based and skip_rows counts
+    the rows above the header, so headers_row is header_row + 1. Sheets
+    without a transformation load nothing and are left out. Settings with no
+    equivalent (validation_rules, partner_type) are kept in metadata.
+
+    Args:
+        data: Parsed configuration file
+        partner_id: Partner identifier (legacy files take it from the file name)
+
+    Returns:
+        Configuration in the current layout
+    """
+    if not is_legacy_config(data):
+        return data
+
+    transformations: Dict[str, List[Dict[str, Any]]] = {}
+    for transformation in data.get('data_transformations', []):
+        transformations.setdefault(transformation['source_sheet'], []).append(transformation)
+    required_fields = {}
+    for rule in data.get('validation_rules', []):
+        if rule.get('rule_type') == 'required_fields':
+            required_fields.setdefault(rule.get('sheet'), set()).update(rule.get('fields', []))
+
+    sources = [
+        _normalize_source(source, transformations, required_fields)
+        for source in data['data_sources']
+    ]
+    metadata = dict(data.get('metadata', {}))
+    for key in ('partner_type', 'validation_rules'):
+        if key in data:
+            metadata[key] = data[key]
+    logger.debug(f"Normalized legacy configuration of {partner_id} ({len(sources)} data sources)")
+    return {
+        'partner_id': data.get('partner_id', partner_id),
+        'partner_name': data.get('partner_name', partner_id),
+        'template_id': data.get('template_id', f"{partner_id}_legacy"),
+        'description': data.get('description', metadata.get('description')),
+        'version': str(data.get('version', metadata.get('version', '1.0'))),
+        'source_config': sources[0],
+        'additional_sources': sources[1:],
+        'metadata': metadata
+    }
+
+
+def _normalize_source(source: Dict[str, Any], transformations: Dict[str, List[Dict[str, Any]]],
+                      required_fields: Dict[str, set]) -> Dict[str, Any]:
+    """Convert one legacy data source into a source config."""
+    sheets_config = []
+    for sheet in source.get('sheets', []):
+        targets = [
+            _normalize_target(sheet, transformation, required_fields.get(sheet['sheet_name'], set()))
+            for transformation in transformations.get(sheet['sheet_name'], [])
+        ]
+        if not targets:
+            continue
+        sheets_config.append({
+            'sheet_name': sheet['sheet_name'],
+            'headers_row': int(sheet.get('header_row', 0)) + 1,
+            'targets': targets
+        })
+    return {
+        'source_name': source.get('source_name'),
+        'file_format': _FILE_FORMATS.get(str(source.get('source_type', 'excel')).lower(), 'excel'),
+        'encoding': source.get('encoding', 'utf-8'),
+        'file_patterns': list(source.get('file_patterns', [])),
+        'sheets_config': sheets_config
+    }
+
+
+def _normalize_target(sheet: Dict[str, Any], transformation: Dict[str, Any], required: set) -> Dict[str, Any]:
+    """Convert a legacy data transformation of a sheet into a target."""
+    columns = sheet.get('column_mappings', {})
+    column_mappings = []
+    for rule in transformation.get('transformation_rules', []):
+        logical_name = rule['source_column']
+        steps = []
+        if rule.get('transformation') == 'currency_to_decimal':
+            steps.extend({'type': 'replace', 'old_value': symbol, 'new_value': ''} for symbol in _CURRENCY_SYMBOLS)
+        if rule.get('date_format'):
+            steps.append({'type': 'date_format', 'input_format': rule['date_format']})
+        if rule.get('value_mapping'):
+            steps.append({'type': 'map', 'values': rule['value_mapping']})
+        column_mappings.append({
+            'source_column': columns.get(logical_name, logical_name),
+            'system_column': rule['target_column'],
+            'column_type': _COLUMN_TYPES.get(str(rule.get('data_type', 'string')).lower(), 'string'),
+            'required': logical_name in required,
+            'transformations': steps
+        })
+    return {'target_table': transformation['target_table'], 'column_mappings': column_mappings}
@@ -5,6 +5,8 @@ from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field, validator
 
+from .sizes import parse_memory_size
+
 
 class FileFormat(str, Enum):
     """Supported file formats."""
@@ -13,6 +15,12 @@ class FileFormat(str, Enum):
     JSON = "json"
 
 
+class StringStorage(str, Enum):
+    """In-memory representation of text columns."""
+    PYTHON = "python"
+    PYARROW = "pyarrow"
+
+
 class ColumnType(str, Enum):
     """Supported column data types."""
     STRING = "string"
@@ -34,27 +42,97 @@ class TransformationType(str, Enum):
     NUMERIC_CONVERSION = "numeric_conversion"
     SPLIT = "split"
     CONCAT = "concat"
+    MAP = "map"
 
 
-    class ColumnMapping(BaseModel):
+class ColumnMapping(BaseModel):
     """Configuration for column mapping."""
-    source_column: str = Field(..., description="Source column name")
+    source_column: Optional[str] = Field(default=None, description="Source column name")
+    expression: Optional[str] = Field(default=None, description="Derived-column expression over source/system columns")
+    key_columns: Optional[List[str]] = Field(default=None,
+                                             description="Natural-key columns hashed into a deterministic surrogate key")
+    key_prefix: str = Field(default="", description="Prefix of generated surrogate keys")
+    key_occurrence: bool = Field(default=False,
+                                 description="Also hash how many earlier rows of the file share the natural key")
     system_column: str = Field(..., description="Target system column name")
-    column_type: ColumnType = Field(..., description="Data type of the column")
+    column_type: Optional[ColumnType] = Field(default=None, description="Data type of the column (inferred from the target table if omitted)")
     required: bool = Field(default=True, description="Whether column is required")
     default_value: Optional[Any] = Field(default=None, description="Default value if missing")
     transformations: List[Dict[str, Any]] = Field(default_factory=list, description="List of transformations")
 
+    @validator('expression', always=True)
+    def validate_expression(cls, v, values):
+        if v is None:
+            return v
+        from ..transformers.expressions import compile_expression
+        compile_expression(v)
+        return v
+
+    @validator('key_columns', always=True)
+    def validate_key_columns(cls, v, values):
+        has_source = values.get('source_column') or values.get('expression')
+        if v is None:
+            if not has_source:
+                raise ValueError('one of source_column, expression or key_columns must be provided')
+            return v
+        if not v:
+            raise ValueError('key_columns must name at least one column')
+        if has_source:
+            raise ValueError('key_columns cannot be combined with source_column or expression')
+        return v
+
+    @validator('key_prefix')
+    def validate_key_prefix(cls, v):
+        if not v.isascii():
+            raise ValueError('key_prefix must be ASCII')
+        return v
+
+    @validator('key_occurrence')
+    def validate_key_occurrence(cls, v, values):
+        if v and not values.get('key_columns'):
+            raise ValueError('key_occurrence requires key_columns')
+        return v
+
+
+class UnpivotColumn(BaseModel):
+    """A wide column melted into child rows."""
+    source_column: str = Field(..., description="Source column holding the amount")
+    values: Dict[str, Any] = Field(default_factory=dict, description="Constant columns attached to its rows")
+
+
+class UnpivotConfig(BaseModel):
+    """Configuration for melting wide amount columns into one row per amount."""
+    columns: List[UnpivotColumn] = Field(..., description="Columns melted into rows, in output order")
+    value_column: str = Field(default="value", description="Column receiving the melted amount")
+    drop_zero: bool = Field(default=True, description="Drop zero amounts as well as nulls")
+
+    @validator('columns')
+    def validate_columns(cls, v):
+        if not v:
+            raise ValueError('unpivot needs at least one column')
+        return v
+
+
+class TargetConfig(BaseModel):
+    """Configuration for one of several tables fed by the same sheet."""
+    target_table: str = Field(..., description="Target database table")
+    column_mappings: List[ColumnMapping] = Field(..., description="Column mapping configurations")
+    filters: Dict[str, Any] = Field(default_factory=dict, description="Row filters to apply (added to the sheet's)")
+    unpivot: Optional[UnpivotConfig] = Field(default=None, description="Melt wide columns into child rows first")
+
 
 class SheetConfig(BaseModel):
     """Configuration for individual sheet/table."""
     sheet_name: str = Field(..., description="Sheet name or CSV filename")
-    target_table: str = Field(..., description="Target database table")
+    target_table: Optional[str] = Field(default=None, description="Target database table (unless targets are given)")
     headers_row: int = Field(default=1, description="Row number containing headers")
     data_start_row: Optional[int] = Field(default=None, description="Row where data starts (defaults to headers_row + 1)")
     skip_rows: List[int] = Field(default_factory=list, description="Row numbers to skip")
-    column_mappings: List[ColumnMapping] = Field(..., description="Column mapping configurations")
+    column_mappings: List[ColumnMapping] = Field(default_factory=list, description="Column mapping configurations")
     filters: Dict[str, Any] = Field(default_factory=dict, description="Row filters to apply")
+    unpivot: Optional[UnpivotConfig] = Field(default=None, description="Melt wide columns into child rows first")
+    targets: List[TargetConfig] = Field(default_factory=list,
+                                        description="Tables fed from one read of the sheet, each with its own mappings")
 
     @validator('data_start_row', always=True)
     def set_data_start_row(cls, v, values):
@@ -62,14 +140,48 @@ class SheetConfig(BaseModel):
             return values['headers_row'] + 1
         return v
 
+    @validator('targets', always=True)
+    def validate_targets(cls, v, values):
+        if v:
+            if values.get('target_table') or values.get('column_mappings') or values.get('unpivot'):
+                raise ValueError('targets cannot be combined with target_table, column_mappings or unpivot')
+        elif not values.get('target_table') or not values.get('column_mappings'):
+            raise ValueError('target_table and column_mappings are required unless targets are given')
+        return v
+
+    def expand_targets(self) -> List['SheetConfig']:
+        """One single-table config per target, sharing the sheet's read settings and filters."""
+        if not self.targets:
+            return [self]
+        return [
+            self.copy(update={
+                'target_table': target.target_table,
+                'column_mappings': target.column_mappings,
+                'filters': {**self.filters, **target.filters},
+                'unpivot': target.unpivot,
+                'targets': []
+            })
+            for target in self.targets
+        ]
+
 
 class SourceConfig(BaseModel):
     """Configuration for data source."""
+    source_name: Optional[str] = Field(default=None, description="Data source name")
+    file_patterns: List[str] = Field(default_factory=list,
+                                     description="Glob patterns of the file names this source reads (any if empty)")
     file_format: FileFormat = Field(..., description="File format")
     encoding: str = Field(default="utf-8", description="File encoding")
+    string_storage: Optional[StringStorage] = Field(default=None,
+                                                    description="Text column representation (defaults to app setting)")
     sheets_config: List[SheetConfig] = Field(..., description="Sheet configurations")
     global_transformations: List[Dict[str, Any]] = Field(default_factory=list, description="Global transformations")
 
+    @validator('sheets_config')
+    def expand_sheet_targets(cls, v):
+        # Expanded configs keep the sheet name, so the sheet is still read once
+        return [target for sheet_config in v for target in sheet_config.expand_targets()]
+
 
 class PartnerConfig(BaseModel):
     """Complete partner configuration."""
@@ -79,6 +191,8 @@ class PartnerConfig(BaseModel):
     description: Optional[str] = Field(default=None, description="Configuration description")
     version: str = Field(default="1.0", description="Configuration version")
     source_config: SourceConfig = Field(..., description="Source data configuration")
+    additional_sources: List[SourceConfig] = Field(default_factory=list,
+                                                   description="Further data sources, routed by their file_patterns")
     metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional metadata")
 
     @validator('partner_id')
@@ -102,10 +216,57 @@ class AppConfig(BaseModel):
     
     data_sources_path: str = Field(default="../Data_Sources", description="Data sources directory")
     configs_path: str = Field(default="configs/partners", description="Configurations directory")
+    rejects_path: str = Field(default="rejects", description="Directory for quarantined reject files")
+    fingerprints_path: str = Field(default="fingerprints", description="Directory for row fingerprint stores")
+    discovery_snapshot: str = Field(default="discovery_snapshot.json",
+                                    description="File keeping the data directory snapshot between runs")
+    metrics_path: str = Field(default="metrics", description="Directory for stage timing reports")
+    metrics_enabled: bool = Field(default=False, description="Record stage timings and export them")
+    profile_path: str = Field(default="profiles", description="Directory for --profile reports")
     
     batch_size: int = Field(default=1000, description="Database batch size")
+    insert_recovery: bool = Field(default=True, description="Bisect failing insert batches to isolate bad rows")
+    checkpoint_every: int = Field(default=0,
+                                  description="Insert batches per checkpointed commit (0 disables checkpoints)")
+    upsert: bool = Field(default=False, description="Update rows whose primary key already exists")
+    referential_checks: bool = Field(default=True, description="Check foreign keys in memory before loading")
+    consistency_checks: bool = Field(default=True, description="Compare item totals with order amounts")
+    row_fingerprints: bool = Field(default=False, description="Skip rows loaded by earlier runs")
+    consistency_tolerance: float = Field(default=0.01, description="Absolute variance accepted by consistency checks")
+    consistency_relative_tolerance: float = Field(default=0.001,
+                                                  description="Variance accepted as a fraction of the order amount")
+    watch_interval: float = Field(default=2.0, description="Seconds between polls of the watch command")
+    watch_settle_seconds: float = Field(default=2.0,
+                                        description="Seconds a file must stay unchanged before watch loads it")
+    watch_workers: int = Field(default=2, description="Partner batches the watch command processes at once")
+    queue_url: str = Field(default="sqlite:///jobs.sqlite", description="Database URL of the job queue")
+    queue_workers: int = Field(default=2, description="Jobs a queue drain runs at once")
+    queue_partner_concurrency: int = Field(default=1, description="Jobs of one partner running at once")
+    queue_max_attempts: int = Field(default=3, description="Attempts of a job before it is marked failed")
+    queue_retry_delay: float = Field(default=30.0, description="Seconds before a failed job's first retry")
+    queue_aging_rate: float = Field(default=100000.0,
+                                    description="Bytes a queued job's size counts less per second waited")
+    queue_lease_seconds: float = Field(default=300.0, description="Seconds a claimed job stays leased without a heartbeat")
+    queue_heartbeat_interval: float = Field(default=60.0, description="Seconds between lease renewals of a drain")
+    queue_node_id: Optional[str] = Field(default=None, description="Name of this node in job leases")
     max_workers: int = Field(default=4, description="Maximum worker threads")
+    reader_workers: int = Field(default=2, description="Pipeline threads parsing files")
+    transform_workers: int = Field(default=2, description="Pipeline threads transforming and validating")
+    loader_workers: int = Field(default=1, description="Pipeline threads loading into the database")
+    pipeline_queue_size: int = Field(default=2, description="Files buffered between pipeline stages")
+    reader_processes: int = Field(default=0, description="Processes parsing files (0 parses in reader threads)")
+    string_storage: StringStorage = Field(default=StringStorage.PYTHON, description="Text column representation")
+    handoff_dir: Optional[str] = Field(default=None,
+                                       description="Directory for Arrow hand-off files (shared memory if unset)")
+    memory_budget: int = Field(default=0, description="Memory budget in bytes for planning file reads (0 disables)")
+    spill_dir: Optional[str] = Field(default=None, description="Directory for spilled chunks (temp directory if unset)")
     enable_validation: bool = Field(default=True, description="Enable data validation")
+    validation_mode: str = Field(default="full", description="Validation depth: full, sample or auto")
+    validation_sample_size: int = Field(default=10000, description="Rows checked in sample validation")
+    validation_escalation_rate: float = Field(default=0.0,
+                                              description="Sample error rate that escalates to full validation")
+    validation_full_max_rows: int = Field(default=100000,
+                                          description="Largest frame validated in full in auto mode")
     
     debug: bool = Field(default=False, description="Debug mode")
     dry_run: bool = Field(default=False, description="Dry run mode")
@@ -115,4 +276,15 @@ class AppConfig(BaseModel):
         valid_levels = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
         if v.upper() not in valid_levels:
             raise ValueError(f'log_level must be one of {valid_levels}')
-        return v.upper() 
\ No newline at end of file
+        return v.upper()
+
+    @validator('memory_budget', pre=True)
+    def validate_memory_budget(cls, v):
+        return parse_memory_size(v)
+
+    @validator('validation_mode')
+    def validate_validation_mode(cls, v):
+        valid_modes = ['full', 'sample', 'auto']
+        if v.lower() not in valid_modes:
+            raise ValueError(f'validation_mode must be one of {valid_modes}')
+        return v.lower() 
\ No newline at end of file
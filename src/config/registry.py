@@ -0,0 +1,241 @@
+"""Registry of validated partner configurations, cached until their file changes."""
+
+import fnmatch
+import hashlib
+import json
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from ..transformers.expressions import CompiledExpression, compile_expression
+from .legacy import normalize_partner_config
+from .models import PartnerConfig
+
+
+def header_fingerprint(columns: Iterable[Any]) -> str:
+    """Stable fingerprint of a set of column names (order and surrounding spaces ignored)."""
+    names = sorted({str(column).strip() for column in columns})
+    return hashlib.sha1('\x1f'.join(names).encode('utf-8')).hexdigest()[:16]
+
+
+class FileRouter:
+    """
+    Routes file names to data sources with a single precompiled regex.
+
+    The file_patterns globs of every source are translated with fnmatch and
+    joined into one alternation with a named group per source, so a file is
+    routed with one match instead of being tried against every sheet.
+    Matching is case-insensitive and the first source listing a matching
+    pattern wins; files no pattern matches go to the first source without
+    patterns, if any.
+    """
+
+    def __init__(self, source_patterns: List[List[str]]):
+        """
+        Initialize file router.
+
+        Args:
+            source_patterns: Glob patterns of each source, in source order
+        """
+        alternatives = []
+        self._fallback: Optional[int] = None
+        for position, patterns in enumerate(source_patterns):
+            if not patterns:
+                if self._fallback is None:
+                    self._fallback = position
+                continue
+            body = '|'.join(f'(?:{fnmatch.translate(pattern)})' for pattern in patterns)
+            alternatives.append(f'(?P<source{position}>{body})')
+        self._pattern = re.compile('|'.join(alternatives), re.IGNORECASE) if alternatives else None
+
+    def route(self, file_name: str) -> Optional[int]:
+        """Position of the source reading a file name, or None if no source does."""
+        if self._pattern is not None:
+            match = self._pattern.match(file_name)
+            if match:
+                return int(match.lastgroup[len('source'):])
+        return self._fallback
+
+
+@dataclass
+class CompiledConfig:
+    """
+    A validated partner configuration and the artifacts derived from it.
+
+    Attributes:
+        partner_id: Partner identifier
+        path: Configuration file
+        digest: SHA-256 of the file content
+        model: Validated configuration
+        config: The configuration as a dictionary; shared, so treat it as read-only
+        source_columns: Source columns each sheet's targets read, by sheet name
+        required_columns: Source columns a target cannot do without, by (sheet name, table)
+        header_fingerprints: Fingerprint of each sheet's source columns, by sheet name
+        expressions: Compiled derived-column expressions, by (sheet name, table)
+        router: Routes file names to source_config (0) or an additional source (1, 2, ...)
+    """
+    partner_id: str
+    path: Path
+    digest: str
+    model: PartnerConfig
+    config: Dict[str, Any]
+    source_columns: Dict[str, FrozenSet[str]]
+    required_columns: Dict[Tuple[str, str], FrozenSet[str]]
+    header_fingerprints: Dict[str, str]
+    expressions: Dict[Tuple[str, str], Tuple[CompiledExpression, ...]]
+    router: FileRouter
+    _header_checks: Dict[Tuple[str, str, str], List[str]] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def compile(cls, path: Path, digest: str, model: PartnerConfig) -> 'CompiledConfig':
+        """Derive the artifacts of a validated configuration."""
+        config = model.dict()
+        source_columns: Dict[str, set] = {}
+        required_columns = {}
+        expressions = {}
+        sources = [config['source_config']] + config['additional_sources']
+        for sheet_config in (sheet for source in sources for sheet in source['sheets_config']):
+            key = (sheet_config['sheet_name'], sheet_config['target_table'])
+            used, required, compiled = _target_columns(sheet_config)
+            source_columns.setdefault(key[0], set()).update(used)
+            required_columns[key] = frozenset(required)
+            expressions[key] = compiled
+        return cls(
+            partner_id=model.partner_id,
+            path=path,
+            digest=digest,
+            model=model,
+            config=config,
+            source_columns={sheet: frozenset(columns) for sheet, columns in source_columns.items()},
+            required_columns=required_columns,
+            header_fingerprints={sheet: header_fingerprint(columns) for sheet, columns in source_columns.items()},
+            expressions=expressions,
+            router=FileRouter([source['file_patterns'] for source in sources])
+        )
+
+    @property
+    def sources(self) -> List[Dict[str, Any]]:
+        """source_config followed by the additional sources."""
+        return [self.config['source_config']] + self.config['additional_sources']
+
+    def route(self, file_name: str) -> Optional[Dict[str, Any]]:
+        """Source config that reads a file, or None if no source's file_patterns match it."""
+        position = self.router.route(file_name)
+        return None if position is None else self.sources[position]
+
+    def missing_columns(self, sheet_name: str, target_table: str, columns: Iterable[Any]) -> List[str]:
+        """
+        Required source columns of a target that a parsed header lacks.
+
+        Results are memoized by header fingerprint, so the chunks of a file
+        (and files sharing a header) are checked once.
+        """
+        columns = list(columns)
+        key = (sheet_name, target_table, header_fingerprint(columns))
+        missing = self._header_checks.get(key)
+        if missing is None:
+            present = {str(column).strip() for column in columns}
+            required = self.required_columns.get((sheet_name, target_table), frozenset())
+            missing = sorted(required - present)
+            self._header_checks[key] = missing
+        return missing
+
+
+def _target_columns(sheet_config: Dict[str, Any]) -> Tuple[set, set, Tuple[CompiledExpression, ...]]:
+    """(source columns used, source columns required, compiled expressions) of one target."""
+    used, required, compiled = set(), set(), []
+    produced = set()
+    unpivot = sheet_config.get('unpivot')
+    if unpivot:
+        used.update(column['source_column'] for column in unpivot['columns'])
+        produced.add(unpivot['value_column'])
+        produced.update(name for column in unpivot['columns'] for name in column['values'])
+
+    mapped = set()
+    for mapping in sheet_config['column_mappings']:
+        if mapping.get('source_column'):
+            source_column = mapping['source_column']
+            if source_column not in produced:
+                used.add(source_column)
+                if mapping['required'] and mapping['default_value'] is None:
+                    required.add(source_column)
+        elif mapping.get('expression'):
+            expression = compile_expression(mapping['expression'])
+            compiled.append(expression)
+            used.update(set(expression.columns) - mapped - produced)
+        elif mapping.get('key_columns'):
+            used.update(set(mapping['key_columns']) - mapped - produced)
+        mapped.add(mapping['system_column'])
+    return used, required, tuple(compiled)
+
+
+@dataclass
+class _Entry:
+    compiled: CompiledConfig
+    mtime_ns: int
+    size: int
+
+
+class ConfigRegistry:
+    """
+    Loads each partner configuration once and keeps it until its file changes.
+
+    A lookup costs one stat() of the file. When its mtime or size changed the
+    content is hashed, and only a different hash re-parses and re-validates
+    the file, so touching or rewriting a file with the same content keeps
+    the compiled configuration.
+    """
+
+    def __init__(self, configs_path: Path):
+        """
+        Initialize configuration registry.
+
+        Args:
+            configs_path: Directory of <partner_id>.json files
+        """
+        self.configs_path = Path(configs_path)
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.RLock()
+
+    def get(self, partner_id: str) -> CompiledConfig:
+        """
+        Get the compiled configuration of a partner, loading it if needed.
+
+        Raises:
+            FileNotFoundError: No configuration file for the partner
+        """
+        path = self.configs_path / f"{partner_id}.json"
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self.invalidate(partner_id)
+            raise FileNotFoundError(f"Configuration file not found: {path}")
+
+        with self._lock:
+            entry = self._entries.get(partner_id)
+            if entry is not None and (entry.mtime_ns, entry.size) == (stat.st_mtime_ns, stat.st_size):
+                return entry.compiled
+
+            content = path.read_bytes()
+            digest = hashlib.sha256(content).hexdigest()
+            if entry is not None and entry.compiled.digest == digest:
+                logger.debug(f"Configuration of {partner_id} touched but unchanged")
+                compiled = entry.compiled
+            else:
+                data = normalize_partner_config(json.loads(content), partner_id)
+                compiled = CompiledConfig.compile(path, digest, PartnerConfig(**data))
+                logger.info(f"Loaded configuration for partner: {partner_id}")
+            self._entries[partner_id] = _Entry(compiled, stat.st_mtime_ns, stat.st_size)
+            return compiled
+
+    def invalidate(self, partner_id: Optional[str] = None):
+        """Forget one partner's configuration, or all of them."""
+        with self._lock:
+            if partner_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(partner_id, None)
@@ -0,0 +1,24 @@
+"""Parsing of memory sizes given in configuration."""
+
+import re
+from typing import Any
+
+_SIZE_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([kmgt]?i?b?)?\s*$', re.IGNORECASE)
+_SIZE_UNITS = {'': 1, 'b': 1, 'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30, 't': 1 << 40}
+
+
+def parse_memory_size(value: Any) -> int:
+    """
+    Parse a memory size such as 512MB, 2GB or 1.5G into bytes (binary units).
+
+    Empty values and 0 mean no budget.
+    """
+    if value is None or value == '':
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = _SIZE_PATTERN.match(str(value))
+    if not match:
+        raise ValueError(f"Invalid memory size: {value!r} (expected e.g. 512MB or 2GB)")
+    number, unit = match.groups()
+    return int(float(number) * _SIZE_UNITS[(unit or '').lower()[:1]])
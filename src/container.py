@@ -4,13 +4,21 @@ import os
 from dependency_injector import containers, providers
 
 from .config.models import AppConfig
-from .interfaces.data_interfaces import IConfigService, IDataTransformer, IDatabaseService
+from .interfaces.data_interfaces import IConfigService, IDataTransformer, IDataValidator, IDatabaseService
 from .interfaces.parser_interface import IParserFactory
 from .parsers.parser_factory import ParserFactory
 from .services.config_service import ConfigService
 from .services.database_service import DatabaseService
 from .services.data_processing_service import DataProcessingService
+from .services.discovery_service import DiscoveryService
+from .services.fingerprint_service import FingerprintService
+from .services.instrumentation import Instrumentation
+from .services.job_queue import JobQueue
+from .services.profiling import Profiler
+from .services.reject_service import RejectService
+from .services.watch_service import WatchService
 from .transformers.data_transformer import DataTransformer
+from .validators.data_validator import DataValidator
 
 
 class ApplicationContainer(containers.DeclarativeContainer):
@@ -27,16 +35,55 @@ class ApplicationContainer(containers.DeclarativeContainer):
         db_name=config.db_name,
         db_user=config.db_user,
         db_password=config.db_password,
-        db_schema=config.db_schema.provided.as_(str, default="public"),
-        log_level=config.log_level.provided.as_(str, default="INFO"),
-        log_file_path=config.log_file_path.provided.as_(str, default="logs/data_parser.log"),
-        data_sources_path=config.data_sources_path.provided.as_(str, default="../Data_Sources"),
-        configs_path=config.configs_path.provided.as_(str, default="configs/partners"),
-        batch_size=config.batch_size.provided.as_(int, default=1000),
-        max_workers=config.max_workers.provided.as_(int, default=4),
-        enable_validation=config.enable_validation.provided.as_(bool, default=True),
-        debug=config.debug.provided.as_(bool, default=False),
-        dry_run=config.dry_run.provided.as_(bool, default=False)
+        db_schema=config.db_schema,
+        log_level=config.log_level,
+        log_file_path=config.log_file_path,
+        data_sources_path=config.data_sources_path,
+        configs_path=config.configs_path,
+        rejects_path=config.rejects_path,
+        fingerprints_path=config.fingerprints_path,
+        discovery_snapshot=config.discovery_snapshot,
+        metrics_path=config.metrics_path,
+        metrics_enabled=config.metrics_enabled,
+        profile_path=config.profile_path,
+        batch_size=config.batch_size,
+        insert_recovery=config.insert_recovery,
+        checkpoint_every=config.checkpoint_every,
+        upsert=config.upsert,
+        referential_checks=config.referential_checks,
+        consistency_checks=config.consistency_checks,
+        row_fingerprints=config.row_fingerprints,
+        consistency_tolerance=config.consistency_tolerance,
+        consistency_relative_tolerance=config.consistency_relative_tolerance,
+        watch_interval=config.watch_interval,
+        watch_settle_seconds=config.watch_settle_seconds,
+        watch_workers=config.watch_workers,
+        queue_url=config.queue_url,
+        queue_workers=config.queue_workers,
+        queue_partner_concurrency=config.queue_partner_concurrency,
+        queue_max_attempts=config.queue_max_attempts,
+        queue_retry_delay=config.queue_retry_delay,
+        queue_aging_rate=config.queue_aging_rate,
+        queue_lease_seconds=config.queue_lease_seconds,
+        queue_heartbeat_interval=config.queue_heartbeat_interval,
+        queue_node_id=config.queue_node_id,
+        max_workers=config.max_workers,
+        reader_workers=config.reader_workers,
+        transform_workers=config.transform_workers,
+        loader_workers=config.loader_workers,
+        pipeline_queue_size=config.pipeline_queue_size,
+        reader_processes=config.reader_processes,
+        handoff_dir=config.handoff_dir,
+        string_storage=config.string_storage,
+        memory_budget=config.memory_budget,
+        spill_dir=config.spill_dir,
+        enable_validation=config.enable_validation,
+        validation_mode=config.validation_mode,
+        validation_sample_size=config.validation_sample_size,
+        validation_escalation_rate=config.validation_escalation_rate,
+        validation_full_max_rows=config.validation_full_max_rows,
+        debug=config.debug,
+        dry_run=config.dry_run
     )
     
     # Core services
@@ -44,20 +91,101 @@ class ApplicationContainer(containers.DeclarativeContainer):
     
     data_transformer: providers.Provider[IDataTransformer] = providers.Singleton(DataTransformer)
     
-    database_service: providers.Provider[IDatabaseService] = providers.Singleton(DatabaseService)
+    data_validator: providers.Provider[IDataValidator] = providers.Singleton(
+        DataValidator,
+        mode=app_config.provided.validation_mode,
+        sample_size=app_config.provided.validation_sample_size,
+        escalation_rate=app_config.provided.validation_escalation_rate,
+        full_max_rows=app_config.provided.validation_full_max_rows
+    )
+    
+    database_service: providers.Provider[IDatabaseService] = providers.Singleton(
+        DatabaseService,
+        upsert=app_config.provided.upsert
+    )
+    
+    reject_service = providers.Singleton(
+        RejectService,
+        rejects_path=app_config.provided.rejects_path
+    )
+    
+    fingerprint_service = providers.Singleton(
+        FingerprintService,
+        fingerprints_path=app_config.provided.fingerprints_path
+    )
+    
+    discovery_service = providers.Singleton(
+        DiscoveryService,
+        snapshot_path=app_config.provided.discovery_snapshot
+    )
+    
+    instrumentation = providers.Singleton(
+        Instrumentation,
+        enabled=app_config.provided.metrics_enabled,
+        metrics_path=app_config.provided.metrics_path
+    )
+    
+    # A new profiler per profiled command; mode, memory and top are passed by the CLI
+    profiler = providers.Factory(
+        Profiler,
+        profile_path=app_config.provided.profile_path
+    )
     
     config_service: providers.Provider[IConfigService] = providers.Singleton(
         ConfigService,
         configs_path=app_config.provided.configs_path
     )
     
+    job_queue = providers.Singleton(
+        JobQueue,
+        url=app_config.provided.queue_url,
+        partner_concurrency=app_config.provided.queue_partner_concurrency,
+        max_attempts=app_config.provided.queue_max_attempts,
+        retry_delay=app_config.provided.queue_retry_delay,
+        aging_rate=app_config.provided.queue_aging_rate,
+        lease_seconds=app_config.provided.queue_lease_seconds,
+        heartbeat_interval=app_config.provided.queue_heartbeat_interval,
+        node_id=app_config.provided.queue_node_id
+    )
+    
     # Main processing service
     data_processing_service = providers.Singleton(
         DataProcessingService,
         parser_factory=parser_factory,
         data_transformer=data_transformer,
         database_service=database_service,
-        config_service=config_service
+        config_service=config_service,
+        data_validator=data_validator,
+        reject_service=reject_service,
+        batch_size=app_config.provided.batch_size,
+        insert_recovery=app_config.provided.insert_recovery,
+        checkpoint_every=app_config.provided.checkpoint_every,
+        referential_checks=app_config.provided.referential_checks,
+        consistency_checks=app_config.provided.consistency_checks,
+        consistency_tolerance=app_config.provided.consistency_tolerance,
+        consistency_relative_tolerance=app_config.provided.consistency_relative_tolerance,
+        reader_workers=app_config.provided.reader_workers,
+        transform_workers=app_config.provided.transform_workers,
+        loader_workers=app_config.provided.loader_workers,
+        pipeline_queue_size=app_config.provided.pipeline_queue_size,
+        reader_processes=app_config.provided.reader_processes,
+        handoff_dir=app_config.provided.handoff_dir,
+        string_storage=app_config.provided.string_storage,
+        memory_budget=app_config.provided.memory_budget,
+        spill_dir=app_config.provided.spill_dir,
+        fingerprint_service=fingerprint_service,
+        row_fingerprints=app_config.provided.row_fingerprints,
+        discovery_service=discovery_service,
+        instrumentation=instrumentation
+    )
+    
+    watch_service = providers.Singleton(
+        WatchService,
+        data_processing_service=data_processing_service,
+        config_service=config_service,
+        interval=app_config.provided.watch_interval,
+        settle_seconds=app_config.provided.watch_settle_seconds,
+        workers=app_config.provided.watch_workers
     )
 
 
@@ -77,9 +205,48 @@ def create_container() -> ApplicationContainer:
         'log_file_path': os.getenv('LOG_FILE_PATH', 'logs/data_parser.log'),
         'data_sources_path': os.getenv('DATA_SOURCES_PATH', '../Data_Sources'),
         'configs_path': os.getenv('CONFIGS_PATH', 'configs/partners'),
+        'rejects_path': os.getenv('REJECTS_PATH', 'rejects'),
+        'fingerprints_path': os.getenv('FINGERPRINTS_PATH', 'fingerprints'),
+        'discovery_snapshot': os.getenv('DISCOVERY_SNAPSHOT', 'discovery_snapshot.json'),
+        'metrics_path': os.getenv('METRICS_PATH', 'metrics'),
+        'metrics_enabled': os.getenv('METRICS_ENABLED', 'false').lower() == 'true',
+        'profile_path': os.getenv('PROFILE_PATH', 'profiles'),
         'batch_size': int(os.getenv('BATCH_SIZE', '1000')),
+        'insert_recovery': os.getenv('INSERT_RECOVERY', 'true').lower() == 'true',
+        'checkpoint_every': int(os.getenv('CHECKPOINT_EVERY', '0')),
+        'upsert': os.getenv('UPSERT', 'false').lower() == 'true',
+        'referential_checks': os.getenv('REFERENTIAL_CHECKS', 'true').lower() == 'true',
+        'consistency_checks': os.getenv('CONSISTENCY_CHECKS', 'true').lower() == 'true',
+        'row_fingerprints': os.getenv('ROW_FINGERPRINTS', 'false').lower() == 'true',
+        'consistency_tolerance': float(os.getenv('CONSISTENCY_TOLERANCE', '0.01')),
+        'consistency_relative_tolerance': float(os.getenv('CONSISTENCY_RELATIVE_TOLERANCE', '0.001')),
+        'watch_interval': float(os.getenv('WATCH_INTERVAL', '2')),
+        'watch_settle_seconds': float(os.getenv('WATCH_SETTLE_SECONDS', '2')),
+        'watch_workers': int(os.getenv('WATCH_WORKERS', '2')),
+        'queue_url': os.getenv('QUEUE_URL', 'sqlite:///jobs.sqlite'),
+        'queue_workers': int(os.getenv('QUEUE_WORKERS', '2')),
+        'queue_partner_concurrency': int(os.getenv('QUEUE_PARTNER_CONCURRENCY', '1')),
+        'queue_max_attempts': int(os.getenv('QUEUE_MAX_ATTEMPTS', '3')),
+        'queue_retry_delay': float(os.getenv('QUEUE_RETRY_DELAY', '30')),
+        'queue_aging_rate': float(os.getenv('QUEUE_AGING_RATE', '100000')),
+        'queue_lease_seconds': float(os.getenv('QUEUE_LEASE_SECONDS', '300')),
+        'queue_heartbeat_interval': float(os.getenv('QUEUE_HEARTBEAT_INTERVAL', '60')),
+        'queue_node_id': os.getenv('QUEUE_NODE_ID') or None,
         'max_workers': int(os.getenv('MAX_WORKERS', '4')),
+        'reader_workers': int(os.getenv('READER_WORKERS', '2')),
+        'transform_workers': int(os.getenv('TRANSFORM_WORKERS', '2')),
+        'loader_workers': int(os.getenv('LOADER_WORKERS', '1')),
+        'pipeline_queue_size': int(os.getenv('PIPELINE_QUEUE_SIZE', '2')),
+        'reader_processes': int(os.getenv('READER_PROCESSES', '0')),
+        'handoff_dir': os.getenv('HANDOFF_DIR') or None,
+        'string_storage': os.getenv('STRING_STORAGE', 'python'),
+        'memory_budget': os.getenv('MEMORY_BUDGET', ''),
+        'spill_dir': os.getenv('SPILL_DIR') or None,
         'enable_validation': os.getenv('ENABLE_VALIDATION', 'true').lower() == 'true',
+        'validation_mode': os.getenv('VALIDATION_MODE', 'full'),
+        'validation_sample_size': int(os.getenv('VALIDATION_SAMPLE_SIZE', '10000')),
+        'validation_escalation_rate': float(os.getenv('VALIDATION_ESCALATION_RATE', '0')),
+        'validation_full_max_rows': int(os.getenv('VALIDATION_FULL_MAX_ROWS', '100000')),
         'debug': os.getenv('DEBUG', 'false').lower() == 'true',
         'dry_run': os.getenv('DRY_RUN', 'false').lower() == 'true'
     })
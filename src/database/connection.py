@@ -3,7 +3,7 @@
 import os
 from typing import Optional
 
-from sqlalchemy import create_engine, Engine
+from sqlalchemy import create_engine, event, Engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import QueuePool
 from loguru import logger
@@ -28,6 +28,9 @@ class DatabaseConnection:
             echo=os.getenv('DEBUG', 'false').lower() == 'true'
         )
         
+        if self.engine.dialect.name == 'sqlite':
+            self._configure_sqlite()
+        
         self.SessionLocal = sessionmaker(
             autocommit=False,
             autoflush=False,
@@ -49,6 +52,24 @@ class DatabaseConnection:
         
         return f"postgresql://{user}:{password}@{host}:{port}/{name}"
     
+    def _configure_sqlite(self):
+        """
+        Make SQLite (used for local runs and tests) behave transactionally.
+        
+        pysqlite's implicit transaction handling breaks SAVEPOINT, so BEGIN is
+        emitted explicitly; foreign keys are enforced like on PostgreSQL.
+        """
+        @event.listens_for(self.engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.close()
+        
+        @event.listens_for(self.engine, "begin")
+        def _on_begin(connection):
+            connection.exec_driver_sql("BEGIN")
+    
     def create_tables(self) -> bool:
         """Create all database tables."""
         try:
@@ -0,0 +1,56 @@
+"""Helpers for reading table definitions from the SQLAlchemy metadata."""
+
+from typing import Optional
+
+from sqlalchemy import Boolean, Column, Date, DateTime, Enum, Float, Integer, Numeric, String, Table, Text
+
+from .models import Base
+
+
+def get_table(table_name: str) -> Optional[Table]:
+    """Get table definition by name, or None if the table is unknown."""
+    if not table_name:
+        return None
+    return Base.metadata.tables.get(table_name)
+
+
+def get_column(table_name: str, column_name: str) -> Optional[Column]:
+    """Get column definition by table and column name."""
+    table = get_table(table_name)
+    if table is None:
+        return None
+    return table.columns.get(column_name)
+
+
+def infer_column_type(table_name: str, column_name: str) -> Optional[str]:
+    """
+    Infer the config column type for a target table column.
+
+    Args:
+        table_name: Target table name
+        column_name: Target column name
+
+    Returns:
+        Column type name as used in column mappings, or None if unknown
+    """
+    column = get_column(table_name, column_name)
+    if column is None:
+        return None
+
+    sa_type = column.type
+    # Order matters: Enum subclasses String and Float subclasses Numeric
+    if isinstance(sa_type, Boolean):
+        return 'boolean'
+    if isinstance(sa_type, Integer):
+        return 'integer'
+    if isinstance(sa_type, Float):
+        return 'float'
+    if isinstance(sa_type, Numeric):
+        return 'decimal'
+    if isinstance(sa_type, DateTime):
+        return 'datetime'
+    if isinstance(sa_type, Date):
+        return 'date'
+    if isinstance(sa_type, (Enum, String, Text)):
+        return 'string'
+    return None
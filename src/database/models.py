@@ -5,7 +5,7 @@ from decimal import Decimal
 from typing import Optional
 
 from sqlalchemy import (
-    Boolean, Column, DateTime, Enum, ForeignKey, Integer, Numeric, String, Text, UniqueConstraint
+    BigInteger, Boolean, Column, DateTime, Enum, ForeignKey, Integer, Numeric, String, Text, UniqueConstraint
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
@@ -430,4 +430,22 @@ class OrderReconciliation(Base):
     resolved_at = Column(DateTime)
     notes = Column(Text)
     created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now()) 
\ No newline at end of file
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now()) 
+
+
+class LoadProgress(Base):
+    """Progress of a checkpointed load of one sheet of a source file into one table."""
+    __tablename__ = 'load_progress'
+    
+    partner_id = Column(String(50), primary_key=True)
+    source_file = Column(String(500), primary_key=True)
+    sheet_name = Column(String(255), primary_key=True)
+    target_table = Column(String(100), primary_key=True)
+    # Size and mtime of the source file; progress of another version is ignored
+    file_signature = Column(String(100), nullable=False)
+    # Rows with a lower index (source row position) are committed
+    row_offset = Column(BigInteger, nullable=False, default=0)
+    # Rejected rows with a lower index are quarantined
+    rejects_offset = Column(BigInteger, nullable=False, default=0)
+    run_id = Column(String(64))
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
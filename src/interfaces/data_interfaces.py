@@ -1,7 +1,7 @@
 """Interfaces for data transformation and validation."""
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 import pandas as pd
 
@@ -23,6 +23,23 @@ class IDataTransformer(ABC):
         """
         pass
 
+    @abstractmethod
+    def transform_with_diagnostics(self, df: pd.DataFrame, config: Dict[str, Any],
+                                   column_cache: Optional[Dict[tuple, Any]] = None
+                                   ) -> Tuple[pd.DataFrame, Dict[str, pd.Series]]:
+        """
+        Transform data and report per-column type coercion failures.
+        
+        Args:
+            df: Input DataFrame
+            config: Transformation configuration
+            column_cache: Converted columns shared by the tables mapped from df
+            
+        Returns:
+            Transformed DataFrame and boolean failure masks keyed by column
+        """
+        pass
+
 
 class IDataValidator(ABC):
     """Abstract interface for data validators."""
@@ -60,6 +77,52 @@ class IDatabaseService(ABC):
         """
         pass
 
+    @abstractmethod
+    def insert_data_with_recovery(self, df: pd.DataFrame, table_name: str, batch_size: int = 1000) -> Dict[str, Any]:
+        """
+        Insert data, isolating rows rejected by the database.
+        
+        Args:
+            df: DataFrame to insert
+            table_name: Target table name
+            batch_size: Batch size for insertion
+            
+        Returns:
+            Insert results with rows inserted and the failed rows
+        """
+        pass
+
+    @abstractmethod
+    def insert_data_checkpointed(self, df: pd.DataFrame, table_name: str, progress: Dict[str, Any],
+                                 end_offset: int, batch_size: int = 1000, commit_every: int = 10,
+                                 recovery: bool = True) -> Dict[str, Any]:
+        """
+        Insert data in index order, committing every commit_every batches with the load's progress.
+        
+        Args:
+            df: DataFrame to insert, indexed by source row position
+            table_name: Target table name
+            progress: Load progress key, source file signature and run ID
+            end_offset: Row offset recorded once every row is committed
+            batch_size: Batch size for insertion
+            commit_every: Batches per commit
+            recovery: Isolate rows rejected by the database
+            
+        Returns:
+            Insert results with committed rows and the failed rows
+        """
+        pass
+
+    @abstractmethod
+    def get_load_progress(self, progress: Dict[str, Any]) -> Tuple[int, int]:
+        """Get the (row offset, rejects offset) a checkpointed load committed."""
+        pass
+
+    @abstractmethod
+    def set_rejects_offset(self, progress: Dict[str, Any], rejects_offset: int):
+        """Record how far the rejected rows of a checkpointed load are quarantined."""
+        pass
+
     @abstractmethod
     def get_existing_records(self, table_name: str, filters: Dict[str, Any]) -> pd.DataFrame:
         """
@@ -74,6 +137,20 @@ class IDatabaseService(ABC):
         """
         pass
 
+    @abstractmethod
+    def get_column_values(self, table_name: str, column_name: str) -> pd.Series:
+        """
+        Get all values of a single column.
+        
+        Args:
+            table_name: Table to query
+            column_name: Column to read
+            
+        Returns:
+            Series with the column values
+        """
+        pass
+
     @abstractmethod
     def create_tables(self) -> bool:
         """Create all required tables in database."""
@@ -88,6 +165,11 @@ class IConfigService(ABC):
         """Load configuration for a specific partner."""
         pass
 
+    @abstractmethod
+    def get_compiled_config(self, partner_id: str) -> Any:
+        """Get a partner's validated configuration with its derived artifacts."""
+        pass
+
     @abstractmethod
     def get_all_partner_configs(self) -> List[Dict[str, Any]]:
         """Get configurations for all partners."""
@@ -96,4 +178,9 @@ class IConfigService(ABC):
     @abstractmethod
     def validate_config(self, config: Dict[str, Any]) -> Dict[str, Any]:
         """Validate partner configuration."""
+        pass
+
+    @abstractmethod
+    def list_partners(self) -> List[str]:
+        """Get list of available partner IDs."""
         pass 
\ No newline at end of file
@@ -2,7 +2,7 @@
 
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import pandas as pd
 
@@ -10,7 +10,8 @@ import pandas as pd
 class IFileParser(ABC):
     """Abstract interface for file parsers."""
 
-    def __init__(self, file_path: Path, config: Dict[str, Any]):
+    def __init__(self, file_path: Optional[Path] = None, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
         self.file_path = file_path
         self.config = config
         self.encoding = config.get('encoding', 'utf-8')
@@ -40,6 +41,24 @@ class IFileParser(ABC):
         """Get list of supported file extensions."""
         pass
 
+    def iter_chunks(self, file_path: Path, config: Dict[str, Any],
+                    chunk_rows: int) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        Parse file in chunks of at most chunk_rows rows.
+        
+        Chunk indexes continue across chunks of a sheet, so row positions match
+        those of a whole-frame parse. Parsers that cannot stream yield whole sheets.
+        
+        Args:
+            file_path: Path to the file to parse
+            config: Configuration for parsing
+            chunk_rows: Maximum rows per chunk
+            
+        Returns:
+            Iterator of (sheet/table name, DataFrame chunk)
+        """
+        yield from self.parse(file_path, config).items()
+
 
 class IParserFactory(ABC):
     """Abstract interface for parser factory."""
@@ -0,0 +1,158 @@
+"""Zero-copy hand-off of parsed frames from worker processes via Arrow IPC files."""
+
+import os
+import tempfile
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+from loguru import logger
+
+from .string_storage import arrow_types_mapper
+
+# Memory-backed filesystem on Linux; files there never touch the disk
+_SHARED_MEMORY_DIR = Path('/dev/shm')
+
+
+@dataclass(frozen=True)
+class FrameHandle:
+    """Picklable reference to a frame written as an Arrow IPC file."""
+    sheet_name: str
+    path: str
+    rows: int
+    nbytes: int
+
+
+def default_handoff_dir() -> Path:
+    """Directory for hand-off files: shared memory where available, else the temp directory."""
+    if _SHARED_MEMORY_DIR.is_dir() and os.access(_SHARED_MEMORY_DIR, os.W_OK):
+        return _SHARED_MEMORY_DIR
+    return Path(tempfile.gettempdir())
+
+
+def frame_to_arrow(df: pd.DataFrame) -> pa.Table:
+    """
+    Convert a parsed frame to an Arrow table.
+
+    Spreadsheet columns often mix types (numbers and text in one column);
+    such columns are converted to text, which the transformer parses again
+    according to the column mapping.
+    """
+    try:
+        return pa.Table.from_pandas(df, preserve_index=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        df = df.copy()
+        for position in range(df.shape[1]):
+            column = df.iloc[:, position]
+            try:
+                pa.array(column, from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                df.isetitem(position, column.astype(str).where(column.notna()))
+        return pa.Table.from_pandas(df, preserve_index=True)
+
+
+def write_frame(df: pd.DataFrame, sheet_name: str, directory: Path) -> FrameHandle:
+    """
+    Write a frame as an Arrow IPC file for another process to map.
+
+    Args:
+        df: Frame to hand off
+        sheet_name: Sheet the frame was parsed from
+        directory: Hand-off directory (ideally memory backed)
+
+    Returns:
+        Handle to pass back to the consuming process
+    """
+    table = frame_to_arrow(df)
+    path = Path(directory) / f"handoff-{os.getpid()}-{uuid.uuid4().hex}.arrow"
+    with pa.OSFile(str(path), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return FrameHandle(sheet_name=sheet_name, path=str(path), rows=table.num_rows, nbytes=table.nbytes)
+
+
+def read_frame(handle: FrameHandle, arrow_dtypes: bool = False, arrow_strings: bool = False) -> pd.DataFrame:
+    """
+    Map a handed-off frame into this process and release its file.
+
+    The IPC file is memory mapped, so the Arrow buffers are never copied or
+    deserialized. With arrow_dtypes the DataFrame keeps using those buffers
+    (zero copy); with arrow_strings only text columns do, and other columns
+    are converted to NumPy dtypes; otherwise text becomes object dtype.
+
+    Args:
+        handle: Handle returned by write_frame
+        arrow_dtypes: Keep Arrow-backed dtypes instead of converting
+        arrow_strings: Keep Arrow-backed text columns only
+
+    Returns:
+        Reconstructed DataFrame
+    """
+    with pa.memory_map(handle.path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    if arrow_dtypes:
+        df = table.to_pandas(types_mapper=pd.ArrowDtype)
+    elif arrow_strings:
+        df = table.to_pandas(types_mapper=arrow_types_mapper)
+    else:
+        df = table.to_pandas()
+    _release(handle.path)
+    return df
+
+
+def discard_frames(handles: List[FrameHandle]):
+    """Remove hand-off files that will not be read."""
+    for handle in handles:
+        _release(handle.path)
+
+
+def _release(path: str):
+    """Unlink a hand-off file; an open mapping stays valid until it is dropped."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        # e.g. Windows refuses to delete a mapped file
+        logger.debug(f"Could not remove hand-off file {path}: {e}")
+
+
+_parser_factory = None
+
+
+def parse_file_to_arrow(file_path: str, source_config: Dict[str, Any],
+                        handoff_dir: Optional[str] = None) -> List[FrameHandle]:
+    """
+    Parse a file in a worker process and hand its frames back as Arrow IPC files.
+
+    Only the small handles are pickled back to the parent process.
+
+    Args:
+        file_path: File to parse
+        source_config: Partner source configuration
+        handoff_dir: Directory for the IPC files (shared memory by default)
+
+    Returns:
+        One handle per parsed sheet
+    """
+    global _parser_factory
+    if _parser_factory is None:
+        from .parser_factory import ParserFactory
+        _parser_factory = ParserFactory()
+
+    parser = _parser_factory.get_parser(Path(file_path))
+    if parser is None:
+        raise ValueError(f"No parser available for file: {file_path}")
+
+    directory = Path(handoff_dir) if handoff_dir else default_handoff_dir()
+    handles = []
+    try:
+        for sheet_name, df in parser.parse(Path(file_path), source_config).items():
+            handles.append(write_frame(df, sheet_name, directory))
+    except BaseException:
+        discard_frames(handles)
+        raise
+    return handles
@@ -1,18 +1,19 @@
 """CSV file parser implementation."""
 
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import pandas as pd
 from loguru import logger
 
 from ..interfaces.parser_interface import IFileParser
+from .string_storage import PYTHON, apply_string_storage
 
 
 class CSVParser(IFileParser):
     """Parser for CSV files."""
 
-    def __init__(self, file_path: Path, config: Dict[str, Any]):
+    def __init__(self, file_path: Optional[Path] = None, config: Optional[Dict[str, Any]] = None):
         super().__init__(file_path, config)
     
     def can_parse(self, file_path: Path) -> bool:
@@ -33,51 +34,9 @@ class CSVParser(IFileParser):
         logger.info(f"Parsing CSV file: {file_path}")
         
         try:
-            # Get configuration
-            
-            # Find matching sheet config
-            sheet_config = None
-            file_name = file_path.name
-
-            # clean columns first
-            df =
-            
-            for sc in self.sheets_config:
-                if sc['sheet_name'] == file_name or sc['sheet_name'] == file_path.stem:
-                    sheet_config = sc
-                    break
-            
-            if not sheet_config:
-                # Use default configuration
-                sheet_config = {
-                    'sheet_name': file_name,
-                    'headers_row': 1,
-                    'skip_rows': []
-                }
-            
-            headers_row = sheet_config.get('headers_row', 1) - 1  # Convert to 0-based
-            skip_rows = sheet_config.get('skip_rows', [])
-            
-            logger.debug(f"Reading CSV with encoding: {self.encoding}")
-            
-            # Try to detect delimiter
-            delimiter = self._detect_delimiter(file_path, self.encoding)
-            
             # Read CSV file
-            df = pd.read_csv(
-                file_path,
-                encoding=self.encoding,
-                delimiter=delimiter,
-                header=headers_row,
-                skiprows=skip_rows,
-                low_memory=False
-            )
-            
-            # Clean column names
-            df.columns = df.columns.astype(str).str.strip()
-            
-            # Remove completely empty rows
-            df = df.dropna(how='all')
+            df = pd.read_csv(file_path, **self._read_options(file_path, config))
+            df = self._clean_frame(df, config)
             
             # Reset index
             df = df.reset_index(drop=True)
@@ -91,6 +50,66 @@ class CSVParser(IFileParser):
             logger.error(f"Failed to parse CSV file {file_path}: {e}")
             raise
     
+    def iter_chunks(self, file_path: Path, config: Dict[str, Any],
+                    chunk_rows: int) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """Parse CSV file in chunks of at most chunk_rows rows."""
+        logger.info(f"Parsing CSV file in chunks of {chunk_rows} rows: {file_path}")
+        
+        offset = 0
+        with pd.read_csv(file_path, chunksize=chunk_rows, **self._read_options(file_path, config)) as reader:
+            for chunk in reader:
+                chunk = self._clean_frame(chunk, config)
+                chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+                offset += len(chunk)
+                if len(chunk):
+                    yield file_path.stem, chunk
+    
+    def _read_options(self, file_path: Path, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Resolve pd.read_csv options from the matching sheet config."""
+        # Get configuration
+        encoding = config.get('encoding', self.encoding)
+        sheets_config = config.get('sheets_config', self.sheets_config)
+        
+        # Find matching sheet config
+        sheet_config = None
+        file_name = file_path.name
+        
+        for sc in sheets_config:
+            if sc['sheet_name'] == file_name or sc['sheet_name'] == file_path.stem:
+                sheet_config = sc
+                break
+        
+        if not sheet_config:
+            # Use default configuration
+            sheet_config = {
+                'sheet_name': file_name,
+                'headers_row': 1,
+                'skip_rows': []
+            }
+        
+        headers_row = sheet_config.get('headers_row', 1) - 1  # Convert to 0-based
+        skip_rows = sheet_config.get('skip_rows', [])
+        
+        logger.debug(f"Reading CSV with encoding: {encoding}")
+        
+        return {
+            'encoding': encoding,
+            # Try to detect delimiter
+            'delimiter': self._detect_delimiter(file_path, encoding),
+            'header': headers_row,
+            'skiprows': skip_rows,
+            'low_memory': False
+        }
+    
+    def _clean_frame(self, df: pd.DataFrame, config: Dict[str, Any]) -> pd.DataFrame:
+        """Clean column names, drop empty rows and apply the configured string storage."""
+        # Clean column names
+        df.columns = df.columns.astype(str).str.strip()
+        
+        # Remove completely empty rows
+        df = df.dropna(how='all')
+        return apply_string_storage(df, config.get('string_storage') or PYTHON)
+    
     def get_supported_extensions(self) -> List[str]:
         """Get list of supported file extensions."""
         return ['.csv']
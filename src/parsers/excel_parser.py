@@ -1,18 +1,25 @@
 """Excel file parser implementation."""
 
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import pandas as pd
 from loguru import logger
 
 from ..interfaces.parser_interface import IFileParser
+from .string_storage import PYTHON, apply_string_storage
+
+# Strings pandas reads as missing by default
+_NA_VALUES = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+])
 
 
 class ExcelParser(IFileParser):
     """Parser for Excel files (.xlsx, .xls)."""
 
-    def __init__(self, file_path: Path, config: Dict[str, Any]):
+    def __init__(self, file_path: Optional[Path] = None, config: Optional[Dict[str, Any]] = None):
         super().__init__(file_path, config)
     
     def can_parse(self, file_path: Path) -> bool:
@@ -67,6 +74,7 @@ class ExcelParser(IFileParser):
                     
                     # Reset index
                     df = df.reset_index(drop=True)
+                    df = apply_string_storage(df, config.get('string_storage') or PYTHON)
                     
                     result[sheet_name] = df
                     logger.debug(f"Successfully parsed sheet '{sheet_name}' with {len(df)} rows")
@@ -83,6 +91,122 @@ class ExcelParser(IFileParser):
             logger.error(f"Failed to parse Excel file {file_path}: {e}")
             raise
     
+    def iter_chunks(self, file_path: Path, config: Dict[str, Any],
+                    chunk_rows: int) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        Parse Excel file in chunks of at most chunk_rows rows.
+        
+        .xlsx sheets are streamed row by row (openpyxl read-only mode) with the
+        same header, skip and cleaning rules as parse(); .xls files are read whole.
+        """
+        if file_path.suffix.lower() != '.xlsx':
+            yield from super().iter_chunks(file_path, config, chunk_rows)
+            return
+        
+        logger.info(f"Parsing Excel file in chunks of {chunk_rows} rows: {file_path}")
+        
+        import openpyxl
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            for sheet_config in config.get('sheets_config', []):
+                sheet_name = sheet_config['sheet_name']
+                if sheet_name not in workbook.sheetnames:
+                    logger.error(f"Failed to parse sheet '{sheet_name}': worksheet not found")
+                    continue
+                yield from self._iter_sheet_chunks(workbook[sheet_name], sheet_config, config, chunk_rows)
+        finally:
+            workbook.close()
+    
+    def _iter_sheet_chunks(self, worksheet, sheet_config: Dict[str, Any], config: Dict[str, Any],
+                           chunk_rows: int) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """Stream one worksheet as DataFrame chunks."""
+        sheet_name = sheet_config['sheet_name']
+        headers_row = sheet_config.get('headers_row', 1) - 1  # Convert to 0-based
+        data_start_row = sheet_config.get('data_start_row', headers_row + 1) - 1
+        skip_rows = set(sheet_config.get('skip_rows', []))
+        rows_to_skip = max(data_start_row - headers_row - 1, 0)
+        
+        header = None
+        columns: List[str] = []
+        rows = []
+        offset = 0
+        position = 0
+        for row_number, row in enumerate(worksheet.iter_rows(values_only=True)):
+            if row_number in skip_rows:
+                continue
+            if position < headers_row:
+                position += 1
+                continue
+            position += 1
+            if header is None:
+                header = tuple(self._cell_value(value) for value in row)
+                continue
+            if rows_to_skip:
+                rows_to_skip -= 1
+                continue
+            rows.append(tuple(self._cell_value(value) for value in row))
+            if len(rows) == chunk_rows:
+                columns = self._column_names(header, columns, rows)
+                chunk = self._chunk_frame(rows, columns, offset, config)
+                offset += len(chunk)
+                rows = []
+                if len(chunk):
+                    yield sheet_name, chunk
+        
+        if rows:
+            columns = self._column_names(header, columns, rows)
+            chunk = self._chunk_frame(rows, columns, offset, config)
+            if len(chunk):
+                yield sheet_name, chunk
+    
+    def _chunk_frame(self, rows: List[tuple], columns: List[str], offset: int,
+                     config: Dict[str, Any]) -> pd.DataFrame:
+        """Build a cleaned chunk whose index continues from offset."""
+        width = len(columns)
+        df = pd.DataFrame.from_records([row[:width] for row in rows], columns=columns).infer_objects()
+        df = df.dropna(how='all')
+        df.index = pd.RangeIndex(offset, offset + len(df))
+        return apply_string_storage(df, config.get('string_storage') or PYTHON)
+    
+    def _column_names(self, header: tuple, columns: List[str], rows: List[tuple]) -> List[str]:
+        """
+        Header names as pandas would build them (unnamed and duplicate columns).
+        
+        Read-only rows span the whole sheet dimension. Like pandas, trailing
+        columns are kept only up to the last one with a header or a value; a
+        chunk with wider rows extends the columns of the previous chunks.
+        """
+        width = max([len(columns), self._used_width(header)] + [self._used_width(row) for row in rows])
+        if width == len(columns):
+            return columns
+        names = []
+        counts: Dict[str, int] = {}
+        for index in range(width):
+            value = header[index] if index < len(header) else None
+            name = f"Unnamed: {index}" if value is None else str(value)
+            if name in counts:
+                counts[name] += 1
+                name = f"{name}.{counts[name]}"
+            else:
+                counts[name] = 0
+            names.append(name.strip())
+        return names
+    
+    def _used_width(self, row: tuple) -> int:
+        """Number of cells up to the last non-empty one."""
+        for index in range(len(row) - 1, -1, -1):
+            if row[index] is not None:
+                return index + 1
+        return 0
+    
+    def _cell_value(self, value: Any) -> Any:
+        """Convert a cell as pandas' openpyxl reader does (whole floats to int, NA strings to None)."""
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if isinstance(value, str) and value in _NA_VALUES:
+            return None
+        return value
+    
     def get_supported_extensions(self) -> List[str]:
         """Get list of supported file extensions."""
         return ['.xlsx', '.xls']
@@ -1,7 +1,7 @@
 """Parser factory implementation."""
 
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional
 
 from loguru import logger
 
@@ -14,11 +14,10 @@ class ParserFactory(IParserFactory):
     """Factory for creating appropriate file parsers."""
 
 
-    def __init__(self, file_path: Path, config: Dict[str, Any]):
+    def __init__(self):
         """Initialize parser factory with default parsers."""
         self._parsers: List[IFileParser] = []
         self._register_default_parsers()
-        super().__init__(file_path, config)
     
     def _register_default_parsers(self):
         """Register default parsers."""
@@ -0,0 +1,58 @@
+"""In-memory representation of text columns."""
+
+import pandas as pd
+import pyarrow as pa
+
+PYTHON = 'python'
+PYARROW = 'pyarrow'
+
+# Arrow-backed strings: one contiguous buffer per column instead of a Python object per cell
+ARROW_STRING_DTYPE = pd.StringDtype(PYARROW)
+
+_ARROW_ERRORS = (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError)
+
+
+def apply_string_storage(df: pd.DataFrame, storage: str = PYTHON) -> pd.DataFrame:
+    """
+    Store the text columns of a parsed frame as configured.
+
+    With 'pyarrow', object columns holding text become Arrow-backed string
+    columns. Columns mixing text with numbers (common in spreadsheets) are
+    converted to text as well; the transformer parses them again according to
+    the column mapping. Object columns holding only numbers, booleans or
+    dates are unboxed to the matching NumPy dtype.
+
+    Args:
+        df: Parsed frame
+        storage: 'python' (object dtype) or 'pyarrow'
+
+    Returns:
+        Frame with text columns in the requested representation
+    """
+    if storage != PYARROW:
+        return df
+
+    result = df.copy(deep=False)
+    for position in range(result.shape[1]):
+        column = result.iloc[:, position]
+        if column.dtype != object:
+            continue
+        try:
+            array = pa.array(column, from_pandas=True)
+        except _ARROW_ERRORS:
+            array = None
+        if array is None or pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+            result.isetitem(position, column.astype(str).where(column.notna()).astype(ARROW_STRING_DTYPE))
+        elif pa.types.is_null(array.type):
+            result.isetitem(position, column.astype(ARROW_STRING_DTYPE))
+        elif (pa.types.is_integer(array.type) or pa.types.is_floating(array.type)
+              or pa.types.is_boolean(array.type) or pa.types.is_timestamp(array.type)):
+            result.isetitem(position, pd.Series(array.to_pandas(), index=column.index, name=column.name))
+    return result
+
+
+def arrow_types_mapper(arrow_type: pa.DataType):
+    """types_mapper for Table.to_pandas keeping Arrow string buffers, other types default."""
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return ARROW_STRING_DTYPE
+    return None
@@ -8,6 +8,7 @@ from loguru import logger
 from pydantic import ValidationError
 
 from ..config.models import PartnerConfig
+from ..config.registry import CompiledConfig, ConfigRegistry
 from ..interfaces.data_interfaces import IConfigService
 
 
@@ -18,33 +19,36 @@ class ConfigService(IConfigService):
         """Initialize configuration service."""
         self.configs_path = Path(configs_path)
         self.configs_path.mkdir(parents=True, exist_ok=True)
+        self.registry = ConfigRegistry(self.configs_path)
         logger.info(f"Configuration service initialized with path: {self.configs_path}")
     
     def load_partner_config(self, partner_id: str) -> Dict[str, Any]:
         """
         Load configuration for a specific partner.
         
+        The file is validated once and cached until it changes; the returned
+        dictionary is shared between callers and must not be modified.
+        
         Args:
             partner_id: Partner identifier
             
         Returns:
             Partner configuration dictionary
         """
-        config_file = self.configs_path / f"{partner_id}.json"
-        
-        if not config_file.exists():
-            raise FileNotFoundError(f"Configuration file not found: {config_file}")
+        return self.get_compiled_config(partner_id).config
+    
+    def get_compiled_config(self, partner_id: str) -> CompiledConfig:
+        """
+        Get a partner's validated configuration with its derived artifacts.
         
-        try:
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
-            
-            # Validate configuration
-            validated_config = PartnerConfig(**config_data)
-            
-            logger.info(f"Loaded configuration for partner: {partner_id}")
-            return validated_config.dict()
+        Args:
+            partner_id: Partner identifier
             
+        Returns:
+            Compiled partner configuration
+        """
+        try:
+            return self.registry.get(partner_id)
         except (json.JSONDecodeError, ValidationError) as e:
             logger.error(f"Failed to load configuration for {partner_id}: {e}")
             raise
@@ -129,6 +133,7 @@ class ConfigService(IConfigService):
             
             with open(config_file, 'w', encoding='utf-8') as f:
                 json.dump(config, f, indent=2, ensure_ascii=False)
+            self.registry.invalidate(partner_id)
             
             logger.info(f"Saved configuration for partner: {partner_id}")
             return True
@@ -1,98 +1,1111 @@
 """Main data processing service."""
 
+import itertools
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
+import pandas as pd
 from loguru import logger
 
-from ..interfaces.data_interfaces import IConfigService, IDataTransformer, IDatabaseService
+from ..interfaces.data_interfaces import IConfigService, IDataTransformer, IDataValidator, IDatabaseService
 from ..interfaces.parser_interface import IParserFactory
+from ..parsers.arrow_handoff import discard_frames, parse_file_to_arrow, read_frame
+from ..parsers.string_storage import PYARROW, PYTHON
+from ..transformers.external import ExternalTransformation, is_whole_frame, pack_chunk, partition_count, unpack_chunk
+from ..transformers.keys import KeyOccurrences, occurrence_column, occurrence_sources
+from ..transformers.unpivot import unpivot_frame
+from ..validators.consistency import CrossTableValidator
+from ..validators.referential_integrity import ReferentialIntegrityChecker, get_table_order
+from .discovery_service import DiscoveryService
+from .fingerprint_service import FingerprintService
+from .instrumentation import NULL_RUN_METRICS, Instrumentation
+from .memory_planner import SPILL, WHOLE, FilePlan, MemoryPlanner
+from .pipeline_executor import PipelineExecutor, PipelineStage
+from .reject_service import (
+    METADATA_COLUMNS, PARTNER_ID, REJECT_FILE, SHEET_NAME, SOURCE_FILE, SOURCE_ROW, TARGET_TABLE,
+    RejectReason, RejectService, RowRejections
+)
+
+
+@dataclass
+class ProcessingRun:
+    """State shared by every file processed in one run."""
+    run_id: str
+    dry_run: bool
+    integrity: Optional[ReferentialIntegrityChecker] = None
+    consistency: Optional[CrossTableValidator] = None
+    # Loads commit in steps and resume from the progress of earlier runs
+    checkpoints: bool = False
+    # Checkpointed loads that failed; later chunks of them must wait for the resume
+    failed_loads: Set[Tuple[str, ...]] = field(default_factory=set)
+    # Stage timings (a no-op unless instrumentation is enabled)
+    metrics: Any = NULL_RUN_METRICS
+
+
+@dataclass
+class PreparedSheet:
+    """A transformed and validated sheet waiting to be loaded."""
+    source_df: pd.DataFrame
+    transformed_df: pd.DataFrame
+    sheet_config: Dict[str, Any]
+    source_file: str
+    rejections: RowRejections
+    warnings: List[str] = field(default_factory=list)
+    validation: Dict[str, Any] = field(default_factory=dict)
+    # Rows dropped because they were loaded by an earlier run
+    skipped: int = 0
+
+    @property
+    def target_table(self) -> str:
+        return self.sheet_config['target_table']
+
+    @property
+    def sheet_name(self) -> str:
+        return self.sheet_config['sheet_name']
+
+
+@dataclass
+class FileTask:
+    """A data file moving through the processing pipeline."""
+    file_path: Path
+    sheets: List[Tuple[pd.DataFrame, Dict[str, Any], str]] = field(default_factory=list)
+    prepared: List[PreparedSheet] = field(default_factory=list)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    # Position of the chunk in a streamed file; None for a file read whole
+    chunk: Optional[int] = None
+    # Sheets hold packed frames that are already transformed (see pack_chunk)
+    transformed: bool = False
+    # Partner config with source_config set to the source routed to this file
+    config: Optional[Dict[str, Any]] = None
 
 
 class DataProcessingService:
     """Main service for processing data from partners."""
-    
+
     def __init__(
         self,
         parser_factory: IParserFactory,
         data_transformer: IDataTransformer,
         database_service: IDatabaseService,
-        config_service: IConfigService
+        config_service: IConfigService,
+        data_validator: IDataValidator,
+        reject_service: RejectService,
+        batch_size: int = 1000,
+        insert_recovery: bool = True,
+        referential_checks: bool = True,
+        consistency_checks: bool = True,
+        consistency_tolerance: float = 0.01,
+        consistency_relative_tolerance: float = 0.001,
+        reader_workers: int = 2,
+        transform_workers: int = 2,
+        loader_workers: int = 1,
+        pipeline_queue_size: int = 2,
+        reader_processes: int = 0,
+        handoff_dir: Optional[str] = None,
+        string_storage: str = PYTHON,
+        memory_budget: int = 0,
+        spill_dir: Optional[str] = None,
+        fingerprint_service: Optional[FingerprintService] = None,
+        row_fingerprints: bool = False,
+        discovery_service: Optional[DiscoveryService] = None,
+        checkpoint_every: int = 0,
+        instrumentation: Optional[Instrumentation] = None
     ):
         """Initialize data processing service."""
         self.parser_factory = parser_factory
         self.data_transformer = data_transformer
         self.database_service = database_service
         self.config_service = config_service
+        self.data_validator = data_validator
+        self.reject_service = reject_service
+        self.batch_size = batch_size
+        self.insert_recovery = insert_recovery
+        self.referential_checks = referential_checks
+        self.consistency_checks = consistency_checks
+        self.consistency_tolerance = consistency_tolerance
+        self.consistency_relative_tolerance = consistency_relative_tolerance
+        self.reader_workers = reader_workers
+        self.transform_workers = transform_workers
+        self.loader_workers = loader_workers
+        self.pipeline_queue_size = pipeline_queue_size
+        self.reader_processes = reader_processes
+        self.handoff_dir = handoff_dir
+        self.string_storage = string_storage
+        self.fingerprint_service = fingerprint_service if row_fingerprints else None
+        self.discovery_service = discovery_service
+        self.checkpoint_every = checkpoint_every
+        self.instrumentation = instrumentation
+        self._reader_pool: Optional[ProcessPoolExecutor] = None
+        self._reader_pool_lock = threading.Lock()
+        self.memory_planner: Optional[MemoryPlanner] = None
+        if memory_budget:
+            # Every pipeline worker and channel slot may hold a frame at once
+            files_in_flight = reader_workers + transform_workers + loader_workers + 3 * pipeline_queue_size
+            self.memory_planner = MemoryPlanner(memory_budget, files_in_flight, spill_dir=spill_dir)
         logger.info("Data processing service initialized")
-    
-    def process_partner_data(self, partner_id: str, data_sources_path: str, dry_run: bool = False) -> Dict[str, Any]:
+
+    def process_partner_data(self, partner_id: str, data_sources_path: str, dry_run: bool = False,
+                             run: Optional[ProcessingRun] = None, new_only: bool = False) -> Dict[str, Any]:
         """
         Process data for a specific partner.
-        
+
         Args:
             partner_id: Partner identifier
             data_sources_path: Path to data sources directory
             dry_run: If True, only validate without inserting to database
-            
+            run: Run shared with other partners (a new run is started if omitted)
+            new_only: Only process files that are new or modified since the last successful run
+
         Returns:
             Processing results
         """
         logger.info(f"Processing data for partner: {partner_id}")
-        
-        result = {
-            'partner_id': partner_id,
-            'success': False,
-            'files_processed': 0,
-            'records_processed': 0,
-            'errors': [],
-            'warnings': []
-        }
-        
+
+        owns_run = run is None
+        run = run or self._new_run(dry_run)
+        result = self._new_result(partner_id, run.run_id)
+        discovered: List[Path] = []
+
         try:
             # Load partner configuration
             config = self.config_service.load_partner_config(partner_id)
-            
-            # Find partner data directory
-            partner_data_path = Path(data_sources_path) / partner_id
-            if not partner_data_path.exists():
-                # Try to find directory with case-insensitive match
-                partner_data_path = self._find_partner_directory(data_sources_path, partner_id)
-                if not partner_data_path:
-                    raise FileNotFoundError(f"Data directory not found for partner: {partner_id}")
-            
-            # Get all files in partner directory
-            data_files = self._get_data_files(partner_data_path)
-            
+
+            # Get all files in partner directory routed to their data source, parent tables first
+            all_files, discovered = self.discover_files(data_sources_path, partner_id)
+            data_files = self._route_files(discovered if new_only else all_files, config)
+
             if not data_files:
-                result['warnings'].append("No data files found")
+                result['warnings'].append("No new data files found" if new_only and all_files
+                                          else "No data files found")
+                result['success'] = new_only and bool(all_files)
                 return result
-            
-            # Process each file
-            for file_path in data_files:
-                try:
-                    file_result = self._process_file(file_path, config, dry_run)
-                    result['files_processed'] += 1
-                    result['records_processed'] += file_result['records_processed']
-                    result['warnings'].extend(file_result['warnings'])
-                    
-                except Exception as e:
-                    error_msg = f"Failed to process file {file_path}: {e}"
-                    logger.error(error_msg)
-                    result['errors'].append(error_msg)
-            
-            result['success'] = len(result['errors']) == 0
-            
-            if result['success']:
-                logger.info(f"Successfully processed {result['files_processed']} files "
-                           f"with {result['records_processed']} records for partner {partner_id}")
-            else:
-                logger.error(f"Processing completed with errors for partner {partner_id}")
-            
+
+            self._process_data_files(config, data_files, run, result)
+            return result
+
+        except Exception as e:
+            error_msg = f"Failed to process partner {partner_id}: {e}"
+            logger.error(error_msg)
+            result['errors'].append(error_msg)
+            result['failed_files'] = [str(file_path) for file_path in discovered]
             return result
-            
+
+        finally:
+            self._record_discovery(discovered, result, dry_run)
+            if owns_run:
+                self._finish_run(run, result)
+
+    def process_files(self, partner_id: str, data_files: List[Path], dry_run: bool = False,
+                      run: Optional[ProcessingRun] = None) -> Dict[str, Any]:
+        """
+        Process given data files of a partner.
+
+        Args:
+            partner_id: Partner identifier
+            data_files: Files to process; files no data source reads are skipped
+            dry_run: If True, only validate without inserting to database
+            run: Run shared with other files (a new run is started if omitted)
+
+        Returns:
+            Processing results
+        """
+        owns_run = run is None
+        run = run or self._new_run(dry_run)
+        result = self._new_result(partner_id, run.run_id)
+        try:
+            config = self.config_service.load_partner_config(partner_id)
+            routed = self._route_files(data_files, config)
+            if not routed:
+                result['warnings'].append("No data files found")
+                return result
+            self._process_data_files(config, routed, run, result)
         except Exception as e:
             error_msg = f"Failed to process partner {partner_id}: {e}"
             logger.error(error_msg)
             result['errors'].append(error_msg)
-            return result
\ No newline at end of file
+            result['failed_files'] = [str(file_path) for file_path in data_files]
+        finally:
+            if owns_run:
+                self._finish_run(run, result)
+        return result
+
+    def discover_files(self, data_sources_path: str, partner_id: str) -> Tuple[List[Path], List[Path]]:
+        """
+        Find the data files of a partner.
+
+        Returns:
+            All data files and those new or modified since the discovery
+            snapshot was saved (all of them without a discovery service)
+
+        Raises:
+            FileNotFoundError: No data directory for the partner
+        """
+        partner_data_path = Path(data_sources_path) / partner_id
+        if not partner_data_path.exists():
+            # Try to find directory with case-insensitive match
+            partner_data_path = self._find_partner_directory(data_sources_path, partner_id)
+            if not partner_data_path:
+                raise FileNotFoundError(f"Data directory not found for partner: {partner_id}")
+        return self._get_data_files(partner_data_path)
+
+    def plan_files(self, data_sources_path: str, partner_id: str,
+                   new_only: bool = False) -> List[Tuple[Path, int]]:
+        """
+        Data files of a partner that a data source reads, with their load stage.
+
+        Args:
+            data_sources_path: Path to data sources directory
+            partner_id: Partner identifier
+            new_only: Only files new or modified since the discovery snapshot was saved
+
+        Returns:
+            (file, stage) pairs, parent tables (lower stages) first
+        """
+        config = self.config_service.load_partner_config(partner_id)
+        all_files, changed = self.discover_files(data_sources_path, partner_id)
+        stage = self._file_stage(config)
+        return [(file_path, stage(file_path))
+                for file_path, _ in self._route_files(changed if new_only else all_files, config)]
+
+    def process_all_partners(self, data_sources_path: str, dry_run: bool = False,
+                             new_only: bool = False) -> List[Dict[str, Any]]:
+        """
+        Process data for all configured partners.
+
+        Args:
+            data_sources_path: Path to data sources directory
+            dry_run: If True, only validate without inserting to database
+            new_only: Only process files that are new or modified since the last successful run
+
+        Returns:
+            List of per-partner processing results
+        """
+        run = self._new_run(dry_run)
+        results = []
+        for partner_id in self.config_service.list_partners():
+            results.append(self.process_partner_data(partner_id, data_sources_path, dry_run, run, new_only))
+        self._finish_run(run, *results)
+        return results
+
+    def _process_data_files(self, config: Dict[str, Any], data_files: List[Tuple[Path, Dict[str, Any]]],
+                            run: ProcessingRun, result: Dict[str, Any]):
+        """Read, prepare and load routed files concurrently, collecting their results."""
+        partner_id = config['partner_id']
+        tasks = self._build_pipeline(config, run).run(self._iter_file_tasks(data_files, result, run))
+        failed_files = {}
+        for task in tasks:
+            if task.error:
+                result['errors'].append(task.error)
+            else:
+                self._merge_file_result(result, task.result, count_file=not task.chunk)
+            if task.error or task.result['errors']:
+                failed_files[str(task.file_path)] = None
+        result['failed_files'].extend(failed_files)
+
+        if run.consistency is not None:
+            for check in run.consistency.evaluate(partner_id):
+                result['consistency'].append(check)
+                if check['mismatches']:
+                    result['warnings'].append(f"{check['rule_id']}: {check['mismatches']} of "
+                                              f"{check['checked']} orders differ beyond tolerance")
+
+        result['success'] = len(result['errors']) == 0
+
+        if result['success']:
+            logger.info(f"Successfully processed {result['files_processed']} files "
+                       f"with {result['records_processed']} records for partner {partner_id}")
+        else:
+            logger.error(f"Processing completed with errors for partner {partner_id}")
+
+    def _record_discovery(self, discovered: List[Path], result: Dict[str, Any], dry_run: bool):
+        """Save the discovery snapshot, keeping files that failed or were only dry run reported as new."""
+        if self.discovery_service is None:
+            return
+        if dry_run:
+            self.discovery_service.retry(discovered)
+        elif result['failed_files']:
+            self.discovery_service.retry([Path(file_path) for file_path in result['failed_files']])
+        try:
+            self.discovery_service.save()
+        except OSError as e:
+            result['warnings'].append(f"Could not save discovery snapshot: {e}")
+
+    def reingest_rejects(self, run_id: str, dry_run: bool = False, force: bool = False) -> Dict[str, Any]:
+        """
+        Replay the (corrected) rejected rows of a previous run.
+
+        Only the quarantined rows are transformed, validated and loaded again;
+        rows that still fail are quarantined under a new run. The reject files
+        of every partner replayed without errors are marked as replayed, and
+        later replays of the run skip them, so a retry after a partly failed
+        replay only loads the partners that failed. A run whose rejects were
+        all replayed is refused unless forced.
+
+        Args:
+            run_id: Run whose rejects should be replayed
+            dry_run: If True, only validate without inserting to database
+            force: Replay reject files that were replayed before as well
+
+        Returns:
+            Processing results for the replay run
+        """
+        # Replayed rows are a partial view of their orders, so totals are not compared,
+        # and they are not at their source file's row offsets, so they are not checkpointed
+        run = self._new_run(dry_run, consistency=False, checkpoints=False)
+        result = self._new_result(None, run.run_id)
+        result['replayed_run_id'] = run_id
+
+        replayed = {} if force else self.reject_service.replayed_files(run_id)
+        rejects = self.reject_service.load(run_id, include_replayed=force)
+        if replayed:
+            replay_runs = ', '.join(sorted(set(replayed.values())))
+            if rejects.empty:
+                result['errors'].append(f"Rejects of run {run_id} were already replayed by run {replay_runs}; "
+                                        f"use --force to replay them again")
+                return result
+            result['warnings'].append(f"Skipped {len(replayed)} reject files already replayed by run {replay_runs}")
+        if rejects.empty:
+            result['warnings'].append(f"No rejected rows found for run {run_id}")
+            result['success'] = True
+            return result
+
+        for partner_id, partner_rejects in rejects.groupby(PARTNER_ID, sort=False):
+            errors = len(result['errors'])
+            try:
+                config = self.config_service.load_partner_config(partner_id)
+                # Sheets of each data source, replayed with that source's settings
+                sources: Dict[int, Tuple[Dict[str, Any], list]] = {}
+                group_columns = [SOURCE_FILE, SHEET_NAME, TARGET_TABLE]
+                for (source_file, sheet_name, target_table), group in partner_rejects.groupby(group_columns,
+                                                                                                sort=False):
+                    found = self._find_sheet_config(config, sheet_name, target_table)
+                    if found is None:
+                        raise ValueError(f"No sheet config '{sheet_name}' for table {target_table}")
+                    sheet_config, source_config = found
+                    source_df = group.drop(columns=METADATA_COLUMNS).set_index(
+                        pd.Index(group[SOURCE_ROW].astype('int64'))
+                    )
+                    sources.setdefault(id(source_config['source_config']), (source_config, []))[1].append(
+                        (source_df, sheet_config, source_file)
+                    )
+
+                for source_config, sheets in sources.values():
+                    self._merge_file_result(result, self._process_sheets(sheets, source_config, run))
+            except Exception as e:
+                error_msg = f"Failed to replay rejects of {partner_id}: {e}"
+                logger.error(error_msg)
+                result['errors'].append(error_msg)
+            if len(result['errors']) == errors and not dry_run:
+                self.reject_service.mark_replayed(run_id, partner_rejects[REJECT_FILE].unique().tolist(),
+                                                  run.run_id)
+
+        result['success'] = len(result['errors']) == 0
+        self._finish_run(run, result)
+        return result
+
+    def _build_pipeline(self, config: Dict[str, Any], run: ProcessingRun) -> PipelineExecutor:
+        """
+        Build the read -> prepare -> load pipeline for one partner's files.
+
+        Parsing, transformation and database writes of different files overlap.
+        The loader receives files in their (dependency) order, and a file only
+        starts loading once every file before it has finished, so parent keys
+        are registered before the child files that reference them are checked;
+        several loader workers only overlap the chunks of one streamed file.
+        Checkpointed chunks of a sheet must commit in order, so they are loaded
+        by one thread.
+        """
+        loader_workers = 1 if run.checkpoints else self.loader_workers
+        return PipelineExecutor([
+            PipelineStage('read', partial(self._run_file_step, self._read_step, config, run), self.reader_workers),
+            PipelineStage('prepare', partial(self._run_file_step, self._prepare_step, config, run),
+                          self.transform_workers),
+            PipelineStage('load', partial(self._run_file_step, self._load_step, config, run), loader_workers,
+                          ordered=True, group=lambda task: task.file_path),
+        ], queue_size=self.pipeline_queue_size)
+
+    def _run_file_step(self, step, config: Dict[str, Any], run: ProcessingRun, task: FileTask) -> FileTask:
+        """Run one pipeline step, recording a failure on the task instead of stopping the pipeline."""
+        if task.error is None:
+            try:
+                step(task, task.config or config, run)
+            except Exception as e:
+                task.error = f"Failed to process file {task.file_path}: {e}"
+                logger.error(task.error)
+        return task
+
+    def _read_step(self, task: FileTask, config: Dict[str, Any], run: ProcessingRun):
+        # Chunks of streamed files arrive already parsed
+        if task.chunk is None:
+            task.sheets = self._read_file(task.file_path, config, run)
+
+    def _prepare_step(self, task: FileTask, config: Dict[str, Any], run: ProcessingRun):
+        if run.checkpoints and task.chunk is not None and not task.transformed:
+            task.sheets = [sheet for sheet in task.sheets if not self._chunk_committed(*sheet, config, run)]
+        task.prepared = self._prepare_sheets(task.sheets, config, run, task.transformed)
+        task.sheets = []
+
+    def _chunk_committed(self, df: pd.DataFrame, sheet_config: Dict[str, Any], source_file: str,
+                         config: Dict[str, Any], run: ProcessingRun) -> bool:
+        """Whether an earlier run loaded and quarantined every row of a streamed chunk, so it need not be transformed."""
+        if df.empty:
+            return False
+        progress = self._load_progress(source_file, sheet_config, config, run)
+        if progress is None:
+            return False
+        # Offsets of unpivoted tables count child rows (see unpivot_frame)
+        rows_per_source_row = len(sheet_config['unpivot']['columns']) if sheet_config.get('unpivot') else 1
+        return (int(df.index.max()) + 1) * rows_per_source_row <= min(progress['offsets'])
+
+    def _load_step(self, task: FileTask, config: Dict[str, Any], run: ProcessingRun):
+        task.result = self._load_sheets(task.prepared, config, run)
+        task.prepared = []
+
+    def _iter_file_tasks(self, data_files: List[Tuple[Path, Dict[str, Any]]], result: Dict[str, Any],
+                         run: ProcessingRun) -> Iterator[FileTask]:
+        """
+        Produce pipeline tasks: one per file read whole, one per chunk of a streamed file.
+
+        With a memory budget every file is planned first; chunks of files
+        planned as chunked or spill are parsed here, as the pipeline has room
+        for them, so only a bounded number of chunks is in memory at once.
+        """
+        for file_path, config in data_files:
+            plan = self._plan_file(file_path, config)
+            if plan is None or plan.mode == WHOLE:
+                yield FileTask(file_path, config=config)
+                continue
+
+            result['plans'].append(plan.to_dict())
+            # Chunks of a spilled file arrive transformed, so their read time includes the transformations
+            chunks = run.metrics.iterate(
+                self._iter_file_chunks(file_path, config, plan), 'read',
+                rows=lambda sheets: len(sheets[0][0]) if sheets else 0,
+                bytes_read=file_path.stat().st_size if run.metrics.enabled else None,
+                partner_id=config['partner_id'], file=file_path.name
+            )
+            try:
+                for chunk, sheets in enumerate(chunks):
+                    yield FileTask(file_path, sheets=sheets, chunk=chunk, transformed=plan.mode == SPILL,
+                                   config=config)
+            except Exception as e:
+                error = f"Failed to process file {file_path}: {e}"
+                logger.error(error)
+                yield FileTask(file_path, error=error)
+
+    def _route_files(self, data_files: List[Path], config: Dict[str, Any]) -> List[Tuple[Path, Dict[str, Any]]]:
+        """
+        Route every file to the data source whose file_patterns match its name.
+
+        Returns:
+            (file, partner config with that source as source_config), parent tables first;
+            files no source reads are left out
+        """
+        compiled = self.config_service.get_compiled_config(config['partner_id'])
+        routed = []
+        for file_path in data_files:
+            source_config = compiled.route(file_path.name)
+            if source_config is None:
+                logger.info(f"Skipping {file_path.name}: it matches no file pattern of {config['partner_id']}")
+                continue
+            if source_config is not config['source_config']:
+                routed.append((file_path, {**config, 'source_config': source_config}))
+            else:
+                routed.append((file_path, config))
+        order = {path: position for position, path in enumerate(
+            self._order_data_files([file_path for file_path, _ in routed], config)
+        )}
+        return sorted(routed, key=lambda item: order[item[0]])
+
+    def _plan_file(self, file_path: Path, config: Dict[str, Any]) -> Optional[FilePlan]:
+        """Plan how a file is read; None without a memory budget or when planning fails."""
+        if self.memory_planner is None:
+            return None
+        parser = self.parser_factory.get_parser(file_path)
+        if parser is None:
+            return None
+        try:
+            plan = self.memory_planner.plan(file_path, parser, self._source_config(config))
+        except Exception as e:
+            logger.warning(f"Could not plan {file_path}, reading it whole: {e}")
+            return None
+        logger.info(f"Memory plan for {plan.describe()}")
+        return plan
+
+    def _iter_file_chunks(self, file_path: Path, config: Dict[str, Any],
+                          plan: FilePlan) -> Iterator[List[Tuple[pd.DataFrame, Dict[str, Any], str]]]:
+        """Stream a file as chunks of (frame, sheet config, source file)."""
+        logger.info(f"Processing file in {plan.mode} mode: {file_path}")
+        parser = self.parser_factory.get_parser(file_path)
+        sheet_configs = config['source_config'].get('sheets_config', [])
+
+        chunks = self._number_occurrences(
+            parser.iter_chunks(file_path, self._source_config(config), plan.chunk_rows), config
+        )
+        if plan.mode == SPILL:
+            yield from self._iter_transformed_chunks(file_path, chunks, config, plan)
+            return
+
+        for sheet_name, df in chunks:
+            sheets = [(df, sheet_config, str(file_path))
+                      for sheet_config in sheet_configs if sheet_config['sheet_name'] == sheet_name]
+            if sheets:
+                yield sheets
+
+    def _iter_transformed_chunks(self, file_path: Path, chunks: Iterator[Tuple[str, pd.DataFrame]],
+                                 config: Dict[str, Any],
+                                 plan: FilePlan) -> Iterator[List[Tuple[pd.DataFrame, Dict[str, Any], str]]]:
+        """
+        Transform streamed chunks, running sort and remove_duplicates out of core.
+
+        Every chunk of a sheet is mapped with the row-local transformations
+        and filters, which commute with sorting and duplicate removal, and
+        added to an ExternalTransformation with its source rows and coercion
+        flags packed alongside. Once the sheet is read, the sorted and
+        deduplicated rows are yielded as packed chunks, so the result matches
+        the in-memory path.
+        """
+        global_transformations = config['source_config'].get('global_transformations', [])
+        row_local = [transform for transform in global_transformations if not is_whole_frame(transform)]
+        # Like the chunks themselves, the operators get at least one chunk's working set
+        memory_limit = max(plan.budget_bytes,
+                           int(plan.chunk_rows * (plan.row_bytes or 0) * self.memory_planner.working_set_factor))
+        partitions = partition_count(plan.estimated_bytes, memory_limit)
+        sheet_configs = config['source_config'].get('sheets_config', [])
+
+        for sheet_name, group in itertools.groupby(chunks, key=lambda item: item[0]):
+            matching = [sheet_config for sheet_config in sheet_configs if sheet_config['sheet_name'] == sheet_name]
+            externals = [
+                ExternalTransformation(global_transformations, memory_limit // max(1, len(matching)),
+                                       self.memory_planner.spill_dir, partitions)
+                for _ in matching
+            ]
+            try:
+                for _, df in group:
+                    column_cache = {}
+                    for sheet_config, external in zip(matching, externals):
+                        transform_config = {**sheet_config, 'global_transformations': row_local}
+                        source_df, cache = df, column_cache
+                        if sheet_config.get('unpivot'):
+                            source_df, cache = unpivot_frame(df, sheet_config['unpivot']), None
+                        transformed_df, coercion_failures = self.data_transformer.transform_with_diagnostics(
+                            source_df, transform_config, cache
+                        )
+                        external.add(pack_chunk(transformed_df, source_df, coercion_failures))
+                for sheet_config, external in zip(matching, externals):
+                    for packed in external.results(plan.chunk_rows):
+                        yield [(packed, sheet_config, str(file_path))]
+            finally:
+                for external in externals:
+                    external.close()
+
+    def _number_occurrences(self, frames: Iterable[Tuple[str, pd.DataFrame]],
+                            config: Dict[str, Any]) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        Add the occurrence numbers of key_occurrence natural keys to the (sheet name, frame) pairs of one file.
+
+        Frames must come in file order. The numbers are source columns, so
+        they are quarantined with rejected rows and replayed with them.
+        """
+        numbered: Dict[str, Dict[str, List[str]]] = {}
+        for sheet_config in config['source_config'].get('sheets_config', []):
+            column_mappings = sheet_config.get('column_mappings', [])
+            for mapping in column_mappings:
+                if mapping.get('key_occurrence'):
+                    sources = occurrence_sources(mapping['key_columns'], column_mappings)
+                    if sources:
+                        numbered.setdefault(sheet_config['sheet_name'], {})[occurrence_column(sources)] = sources
+        occurrences = KeyOccurrences()
+        for sheet_name, df in frames:
+            for column, sources in numbered.get(sheet_name, {}).items():
+                if set(sources) <= set(df.columns):
+                    df[column] = occurrences.number((sheet_name, column), df[sources])
+            yield sheet_name, df
+
+    def _source_config(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Partner source configuration for parsing.
+
+        Sheets feeding several tables are listed once (the first config of a
+        sheet decides how it is read), so each sheet is parsed a single time
+        and every table mapped from it shares the parsed frame.
+        """
+        source_config = config['source_config']
+        sheets = {}
+        for sheet_config in source_config.get('sheets_config', []):
+            sheets.setdefault(sheet_config['sheet_name'], sheet_config)
+        return {
+            **source_config,
+            'sheets_config': list(sheets.values()),
+            'string_storage': source_config.get('string_storage') or self.string_storage
+        }
+
+    def _read_file(self, file_path: Path, config: Dict[str, Any],
+                   run: ProcessingRun) -> List[Tuple[pd.DataFrame, Dict[str, Any], str]]:
+        """Parse a file into (frame, sheet config, source file) for every configured sheet found in it."""
+        logger.info(f"Processing file: {file_path}")
+
+        parser = self.parser_factory.get_parser(file_path)
+        if parser is None:
+            raise ValueError(f"No parser available for file: {file_path}")
+
+        source_config = self._source_config(config)
+        with run.metrics.stage('read', partner_id=config['partner_id'], file=file_path.name,
+                               bytes_read=file_path.stat().st_size if run.metrics.enabled else None) as record:
+            if self.reader_processes > 0:
+                frames = self._parse_in_process(file_path, source_config)
+            else:
+                frames = parser.parse(file_path, source_config)
+            record.rows_out = sum(len(df) for df in frames.values())
+        frames = dict(self._number_occurrences(frames.items(), config))
+
+        sheets = []
+        for sheet_config in config['source_config'].get('sheets_config', []):
+            df = frames.get(sheet_config['sheet_name'])
+            if df is not None:
+                sheets.append((df, sheet_config, str(file_path)))
+        return sheets
+
+    def _parse_in_process(self, file_path: Path, source_config: Dict[str, Any]) -> Dict[str, pd.DataFrame]:
+        """
+        Parse a file in the reader process pool.
+
+        The worker writes each frame as an Arrow IPC file (in shared memory
+        where available) and returns only handles, which are memory mapped
+        here instead of unpickling whole frames.
+        """
+        handles = self._get_reader_pool().submit(
+            parse_file_to_arrow, str(file_path), source_config, self.handoff_dir
+        ).result()
+        arrow_strings = source_config['string_storage'] == PYARROW
+        frames = {}
+        try:
+            for position, handle in enumerate(handles):
+                frames[handle.sheet_name] = read_frame(handle, arrow_strings=arrow_strings)
+        except BaseException:
+            discard_frames(handles[position:])
+            raise
+        return frames
+
+    def _get_reader_pool(self) -> ProcessPoolExecutor:
+        """Get the reader process pool, starting it on first use."""
+        with self._reader_pool_lock:
+            if self._reader_pool is None:
+                self._reader_pool = ProcessPoolExecutor(max_workers=self.reader_processes)
+                logger.info(f"Started {self.reader_processes} reader processes")
+            return self._reader_pool
+
+    def close(self):
+        """Shut down the reader process pool, if one was started."""
+        with self._reader_pool_lock:
+            if self._reader_pool is not None:
+                self._reader_pool.shutdown()
+                self._reader_pool = None
+
+    def _process_sheets(self, sheets: List[Tuple[pd.DataFrame, Dict[str, Any], str]], config: Dict[str, Any],
+                        run: ProcessingRun) -> Dict[str, Any]:
+        """Prepare and load a set of sheets."""
+        return self._load_sheets(self._prepare_sheets(sheets, config, run), config, run)
+
+    def _prepare_sheets(self, sheets: List[Tuple[pd.DataFrame, Dict[str, Any], str]], config: Dict[str, Any],
+                        run: ProcessingRun, transformed: bool = False) -> List[PreparedSheet]:
+        """
+        Transform and validate sheets and register the keys they will load.
+
+        Args:
+            transformed: Sheets are packed frames transformed out of core
+
+        Returns:
+            Prepared sheets in dependency order (parent tables first)
+        """
+        # Tables mapped from the same parsed frame share its converted columns
+        column_caches: Dict[int, Dict[tuple, Any]] = {}
+        prepared = [
+            self._prepare_sheet(df, sheet_config, config, source_file, transformed,
+                                column_caches.setdefault(id(df), {}), run.metrics)
+            for df, sheet_config, source_file in sheets
+        ]
+        prepared.sort(key=lambda sheet: get_table_order(sheet.target_table))
+
+        if run.integrity is not None:
+            for sheet in prepared:
+                run.integrity.register(sheet.target_table, sheet.transformed_df[~sheet.rejections.mask])
+        return prepared
+
+    def _load_sheets(self, prepared: List[PreparedSheet], config: Dict[str, Any],
+                     run: ProcessingRun) -> Dict[str, Any]:
+        """
+        Check foreign keys of prepared sheets, then load them.
+
+        Keys of every sheet prepared so far are known before the first write,
+        so rows referencing a missing parent are quarantined up front instead
+        of failing the insert.
+        """
+        if run.integrity is not None:
+            for sheet in prepared:
+                violations = run.integrity.check(sheet.target_table, sheet.transformed_df)
+                for rule_id, mask in violations.items():
+                    sheet.rejections.add(mask, RejectReason.FOREIGN_KEY, rule_id)
+
+        if run.consistency is not None:
+            for sheet in prepared:
+                run.consistency.add(config['partner_id'], sheet.target_table,
+                                    sheet.transformed_df[~sheet.rejections.mask])
+
+        file_result = {
+            'records_processed': 0, 'records_rejected': 0, 'warnings': [], 'errors': [],
+            'records_skipped': sum(sheet.skipped for sheet in prepared),
+            'validation': [sheet.validation for sheet in prepared]
+        }
+        for sheet in prepared:
+            sheet_result = self._load_sheet(sheet, config, run)
+            for key in ('records_processed', 'records_rejected'):
+                file_result[key] += sheet_result[key]
+            file_result['warnings'].extend(sheet_result['warnings'])
+            file_result['errors'].extend(sheet_result['errors'])
+
+        return file_result
+
+    def _prepare_sheet(self, df: pd.DataFrame, sheet_config: Dict[str, Any], config: Dict[str, Any],
+                       source_file: str, transformed: bool = False,
+                       column_cache: Optional[Dict[tuple, Any]] = None,
+                       metrics: Any = NULL_RUN_METRICS) -> PreparedSheet:
+        """Transform and validate one sheet, recording rows that fail coercion or validation."""
+        labels = {'partner_id': config['partner_id'], 'file': Path(source_file).name,
+                  'sheet': sheet_config['sheet_name'], 'table': sheet_config['target_table']}
+        if transformed:
+            transformed_df, df, coercion_failures = unpack_chunk(df)
+        else:
+            with metrics.stage('header', rows_in=len(df), **labels) as record:
+                self._check_header(df, sheet_config, config)
+                record.rows_out = len(df)
+            with metrics.stage('transform', rows_in=len(df), **labels) as record:
+                if sheet_config.get('unpivot'):
+                    # Child rows are a different frame from the one other targets map
+                    df = unpivot_frame(df, sheet_config['unpivot'])
+                    column_cache = None
+                transform_config = {
+                    **sheet_config,
+                    'global_transformations': config['source_config'].get('global_transformations', [])
+                }
+                transformed_df, coercion_failures = self.data_transformer.transform_with_diagnostics(
+                    df, transform_config, column_cache
+                )
+                record.rows_out = len(transformed_df)
+
+        skipped = 0
+        if self.fingerprint_service is not None:
+            # Rows from overlapping reports that an earlier run loaded
+            seen = self.fingerprint_service.seen(config['partner_id'], sheet_config['target_table'], transformed_df)
+            skipped = int(seen.sum())
+            if skipped:
+                logger.info(f"{sheet_config['sheet_name']}: skipping {skipped} rows already loaded "
+                            f"into {sheet_config['target_table']}")
+                transformed_df = transformed_df[~seen]
+
+        rejections = RowRejections(transformed_df.index)
+        for column, mask in coercion_failures.items():
+            rejections.add(mask, RejectReason.TYPE_COERCION, column)
+
+        with metrics.stage('validate', rows_in=len(transformed_df), **labels) as record:
+            validation = self.data_validator.validate(transformed_df, sheet_config['target_table'])
+            for rule_id in validation['error_rules']:
+                rejections.add(validation['rule_masks'][rule_id], RejectReason.VALIDATION, rule_id)
+            record.rows_out = len(transformed_df) - len(rejections)
+
+        return PreparedSheet(
+            source_df=df,
+            transformed_df=transformed_df,
+            sheet_config=sheet_config,
+            source_file=source_file,
+            rejections=rejections,
+            warnings=[f"{sheet_config['sheet_name']}: {warning}" for warning in validation['warnings']],
+            validation={
+                'sheet_name': sheet_config['sheet_name'],
+                'target_table': sheet_config['target_table'],
+                'rows': len(transformed_df),
+                'mode': validation['mode'],
+                'sample_size': validation['sample_size'],
+                'escalated': validation['escalated']
+            },
+            skipped=skipped
+        )
+
+    def _check_header(self, df: pd.DataFrame, sheet_config: Dict[str, Any], config: Dict[str, Any]):
+        """Fail a sheet whose header lacks required source columns, naming all of them at once."""
+        compiled = self.config_service.get_compiled_config(config['partner_id'])
+        missing = compiled.missing_columns(sheet_config['sheet_name'], sheet_config['target_table'], df.columns)
+        if missing:
+            raise ValueError(f"Sheet '{sheet_config['sheet_name']}' lacks required columns for "
+                             f"{sheet_config['target_table']}: {', '.join(missing)}")
+
+    def _load_sheet(self, sheet: PreparedSheet, config: Dict[str, Any], run: ProcessingRun) -> Dict[str, Any]:
+        """
+        Load the valid rows of a prepared sheet.
+
+        Rejected rows are quarantined to the run's reject file. With insert
+        recovery, rows the database itself rejects are isolated and
+        quarantined as well.
+        """
+        target_table = sheet.target_table
+        rejections = sheet.rejections
+        sheet_result = {
+            'records_processed': 0, 'records_rejected': 0, 'warnings': list(sheet.warnings), 'errors': []
+        }
+
+        valid_df = sheet.transformed_df[~rejections.mask]
+        with run.metrics.stage('load', partner_id=config['partner_id'], file=Path(sheet.source_file).name,
+                               sheet=sheet.sheet_name, table=target_table, rows_in=len(valid_df)) as record:
+            sheet_result = self._load_valid_rows(sheet, config, run, valid_df, sheet_result)
+            record.rows_out = sheet_result['records_processed']
+        return sheet_result
+
+    def _load_valid_rows(self, sheet: PreparedSheet, config: Dict[str, Any], run: ProcessingRun,
+                         valid_df: pd.DataFrame, sheet_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert the valid rows of a sheet and quarantine its rejected rows."""
+        target_table = sheet.target_table
+        rejections = sheet.rejections
+        loaded_count = len(valid_df)
+        progress = self._load_progress(sheet.source_file, sheet.sheet_config, config, run) if run.checkpoints else None
+        if progress is not None:
+            return self._load_sheet_checkpointed(sheet, config, run, valid_df, progress, sheet_result)
+        if not run.dry_run and not valid_df.empty:
+            if self.insert_recovery:
+                insert_result = self.database_service.insert_data_with_recovery(
+                    valid_df, target_table, self.batch_size
+                )
+                failed_rows = insert_result['failed_rows']
+                rejections.add_rows(failed_rows.index, RejectReason.DATABASE, failed_rows['db_error'])
+                loaded_count = insert_result['rows_inserted']
+                load_failed = not insert_result['success']
+            else:
+                load_failed = not self.database_service.insert_data(valid_df, target_table, self.batch_size)
+            if load_failed:
+                sheet_result['errors'].append(f"Failed to insert {len(valid_df)} rows into {target_table}")
+                return sheet_result
+            if self.fingerprint_service is not None:
+                self.fingerprint_service.record(config['partner_id'], target_table,
+                                                sheet.transformed_df[~rejections.mask])
+
+        self._quarantine(sheet, config, run, sheet_result)
+        sheet_result['records_processed'] = loaded_count
+        return sheet_result
+
+    def _load_sheet_checkpointed(self, sheet: PreparedSheet, config: Dict[str, Any], run: ProcessingRun,
+                                 valid_df: pd.DataFrame, progress: Dict[str, Any],
+                                 sheet_result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Load a sheet committing every checkpoint_every batches, resuming where an earlier run stopped.
+
+        Rows below the committed row offset were loaded by an earlier run of
+        the same file version and are not inserted again; rejected rows below
+        the rejects offset were quarantined by it and are not written again.
+        """
+        target_table = sheet.target_table
+        rejections = sheet.rejections
+        load_key = (progress['source_file'], sheet.sheet_name, target_table)
+        if load_key in run.failed_loads:
+            # Committing a later chunk would move the offset past the rows that failed
+            sheet_result['errors'].append(f"Skipped {target_table} rows after an earlier chunk failed to load")
+            return sheet_result
+        row_offset, rejects_offset = progress.pop('offsets')
+        index = sheet.transformed_df.index
+        end_offset = max(row_offset, int(index.max()) + 1 if len(index) else 0)
+        if row_offset:
+            resumed = int((valid_df.index < row_offset).sum())
+            logger.info(f"{sheet.sheet_name}: resuming {target_table} after {resumed} committed rows")
+            sheet_result['warnings'].append(f"{sheet.sheet_name}: resumed {target_table} after "
+                                            f"{resumed} rows committed by an earlier run")
+            valid_df = valid_df[valid_df.index >= row_offset]
+
+        insert_result = self.database_service.insert_data_checkpointed(
+            valid_df, target_table, progress, end_offset, self.batch_size, self.checkpoint_every,
+            self.insert_recovery
+        )
+        failed_rows = insert_result['failed_rows']
+        rejections.add_rows(failed_rows.index, RejectReason.DATABASE, failed_rows['db_error'])
+        if not insert_result['success']:
+            run.failed_loads.add(load_key)
+            sheet_result['records_processed'] = insert_result['rows_inserted']
+            sheet_result['errors'].append(
+                f"Failed to insert {len(valid_df)} rows into {target_table}; "
+                f"{insert_result['rows_inserted']} committed, run again to resume"
+            )
+            committed_offset = insert_result['row_offset'] or row_offset
+            if self.fingerprint_service is not None:
+                committed = sheet.transformed_df[~rejections.mask & (index < committed_offset)]
+                self.fingerprint_service.record(config['partner_id'], target_table, committed)
+            if committed_offset > rejects_offset:
+                # Rows below the committed offset are not seen again on resume, so quarantine them now
+                rejections.discard_outside(rejects_offset, committed_offset)
+                self._quarantine(sheet, config, run, sheet_result)
+                self.database_service.set_rejects_offset(progress, committed_offset)
+            return sheet_result
+        if self.fingerprint_service is not None:
+            self.fingerprint_service.record(config['partner_id'], target_table, sheet.transformed_df[~rejections.mask])
+
+        rejections.discard_outside(rejects_offset)
+        self._quarantine(sheet, config, run, sheet_result)
+        self.database_service.set_rejects_offset(progress, end_offset)
+        sheet_result['records_processed'] = insert_result['rows_inserted']
+        return sheet_result
+
+    def _quarantine(self, sheet: PreparedSheet, config: Dict[str, Any], run: ProcessingRun,
+                    sheet_result: Dict[str, Any]):
+        """Write the rejected rows of a sheet to the run's reject file."""
+        rejected_count = len(sheet.rejections)
+        if rejected_count:
+            sheet_result['records_rejected'] = rejected_count
+            sheet_result['warnings'].append(
+                f"{sheet.sheet_name}: {rejected_count} of {len(sheet.transformed_df)} rows rejected"
+            )
+            if not run.dry_run:
+                self.reject_service.write(run.run_id, config['partner_id'], sheet.source_file, sheet.sheet_name,
+                                          sheet.target_table, sheet.source_df, sheet.rejections)
+
+    def _load_progress(self, source_file: str, sheet_config: Dict[str, Any], config: Dict[str, Any],
+                       run: ProcessingRun) -> Optional[Dict[str, Any]]:
+        """Progress key of a sheet's checkpointed load with the offsets committed so far."""
+        try:
+            stat = os.stat(source_file)
+        except OSError:
+            return None
+        progress = {
+            'partner_id': config['partner_id'],
+            'source_file': str(Path(source_file).resolve()),
+            'sheet_name': sheet_config['sheet_name'],
+            'target_table': sheet_config['target_table'],
+            'file_signature': f"{stat.st_size}:{stat.st_mtime_ns}",
+            'run_id': run.run_id
+        }
+        progress['offsets'] = self.database_service.get_load_progress(progress)
+        return progress
+
+    def _new_run(self, dry_run: bool, consistency: bool = True, checkpoints: bool = True) -> ProcessingRun:
+        """Start a processing run."""
+        run = ProcessingRun(run_id=self.reject_service.new_run_id(), dry_run=dry_run,
+                            checkpoints=checkpoints and self.checkpoint_every > 0 and not dry_run)
+        if self.instrumentation is not None:
+            run.metrics = self.instrumentation.start_run(run.run_id)
+        if self.referential_checks:
+            run.integrity = ReferentialIntegrityChecker(self.database_service)
+        if self.consistency_checks and consistency:
+            run.consistency = CrossTableValidator(self.consistency_tolerance, self.consistency_relative_tolerance)
+        return run
+
+    def _finish_run(self, run: ProcessingRun, *results: Dict[str, Any]):
+        """Export the stage timings of a finished run, noting the report in the results."""
+        if self.instrumentation is None:
+            return
+        try:
+            report_path = self.instrumentation.finish_run(run.metrics)
+        except OSError as e:
+            logger.warning(f"Could not write stage timings of run {run.run_id}: {e}")
+            return
+        if report_path is not None:
+            for result in results:
+                result['metrics_report'] = str(report_path)
+
+    def _find_sheet_config(self, config: Dict[str, Any], sheet_name: str,
+                           target_table: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Find the sheet config for a sheet name and target table, with its source's partner config."""
+        for source_config in [config['source_config']] + config.get('additional_sources', []):
+            for sheet_config in source_config.get('sheets_config', []):
+                if sheet_config['sheet_name'] == sheet_name and sheet_config['target_table'] == target_table:
+                    if source_config is not config['source_config']:
+                        config = {**config, 'source_config': source_config}
+                    return sheet_config, config
+        return None
+
+    def _find_partner_directory(self, data_sources_path: str, partner_id: str) -> Optional[Path]:
+        """Find a partner's data directory with a case-insensitive name match."""
+        root = Path(data_sources_path)
+        if self.discovery_service is not None:
+            return self.discovery_service.find_directory(root, partner_id)
+        if not root.is_dir():
+            return None
+        for entry in root.iterdir():
+            if entry.is_dir() and entry.name.lower() == partner_id.lower():
+                return entry
+        return None
+
+    def _order_data_files(self, data_files: List[Path], config: Dict[str, Any]) -> List[Path]:
+        """Order files so that those feeding parent tables come first."""
+        stage = self._file_stage(config)
+        return sorted(data_files, key=lambda path: (stage(path), str(path)))
+
+    def _file_stage(self, config: Dict[str, Any]) -> Callable[[Path], int]:
+        """
+        Load order of files by the table they feed (parents have lower stages).
+
+        A file named after a configured sheet (e.g. a CSV export) feeds that
+        sheet's table; other files may hold any sheet and get the stage of
+        the earliest configured table.
+        """
+        sheet_orders = {
+            sheet_config['sheet_name'].lower(): get_table_order(sheet_config['target_table'])
+            for source_config in [config['source_config']] + config.get('additional_sources', [])
+            for sheet_config in source_config.get('sheets_config', [])
+        }
+        default_order = min(sheet_orders.values(), default=0)
+
+        def stage(path: Path) -> int:
+            return sheet_orders.get(path.stem.lower(), sheet_orders.get(path.name.lower(), default_order))
+
+        return stage
+
+    def _get_data_files(self, partner_data_path: Path) -> Tuple[List[Path], List[Path]]:
+        """
+        Get the files with a supported extension under the partner directory.
+
+        Returns:
+            All data files and those new or modified since the discovery
+            snapshot was saved (all of them without a discovery service)
+        """
+        extensions = {extension.lower() for extension in self.parser_factory.get_supported_extensions()}
+
+        def is_data_file(path: Path) -> bool:
+            return path.suffix.lower() in extensions and not path.name.startswith('~$')
+
+        if self.discovery_service is not None:
+            scan = self.discovery_service.scan(partner_data_path)
+            return ([path for path in scan.files if is_data_file(path)],
+                    [path for path in scan.changed if is_data_file(path)])
+        data_files = sorted(path for path in partner_data_path.rglob('*') if path.is_file() and is_data_file(path))
+        return data_files, data_files
+
+    def _new_result(self, partner_id: Optional[str], run_id: str) -> Dict[str, Any]:
+        """Create an empty processing result."""
+        return {
+            'partner_id': partner_id,
+            'run_id': run_id,
+            'success': False,
+            'files_processed': 0,
+            'records_processed': 0,
+            'records_rejected': 0,
+            'records_skipped': 0,
+            'validation': [],
+            'consistency': [],
+            'plans': [],
+            'errors': [],
+            'warnings': [],
+            # Files that failed to process in full; only these need to be processed again
+            'failed_files': []
+        }
+
+    def _merge_file_result(self, result: Dict[str, Any], file_result: Dict[str, Any], count_file: bool = True):
+        """Add a file (or chunk) result to the overall result."""
+        if count_file:
+            result['files_processed'] += 1
+        result['records_processed'] += file_result['records_processed']
+        result['records_rejected'] += file_result['records_rejected']
+        result['records_skipped'] += file_result.get('records_skipped', 0)
+        result['warnings'].extend(file_result['warnings'])
+        result['validation'].extend(file_result.get('validation', []))
+        result['errors'].extend(file_result.get('errors', []))
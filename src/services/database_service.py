@@ -1,22 +1,35 @@
 """Database service implementation."""
 
-from typing import Any, Dict
+from typing import Any, Dict, List, Tuple
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 from loguru import logger
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import select
+from sqlalchemy.exc import DataError, IntegrityError, SQLAlchemyError, StatementError
 from sqlalchemy.orm import Session
 
 from ..database.connection import get_session
 from ..interfaces.data_interfaces import IDatabaseService
 
+# Key columns of load_progress
+_PROGRESS_KEY = ('partner_id', 'source_file', 'sheet_name', 'target_table')
+
 
 class DatabaseService(IDatabaseService):
     """Service for database operations."""
     
-    def __init__(self):
-        """Initialize database service."""
-        logger.info("Database service initialized")
+    def __init__(self, upsert: bool = False):
+        """
+        Initialize database service.
+        
+        Args:
+            upsert: Update rows whose primary key already exists instead of
+                failing on them (PostgreSQL and SQLite)
+        """
+        self.upsert = upsert
+        logger.info(f"Database service initialized{' in upsert mode' if upsert else ''}")
     
     def insert_data(self, df: pd.DataFrame, table_name: str, batch_size: int = 1000) -> bool:
         """
@@ -45,7 +58,7 @@ class DatabaseService(IDatabaseService):
                 batch_df = df.iloc[start_idx:end_idx]
                 
                 # Convert DataFrame to dictionary records
-                records = batch_df.to_dict('records')
+                records = self._frame_to_records(batch_df)
                 
                 # Insert batch
                 self._insert_batch(session, table_name, records)
@@ -63,6 +76,192 @@ class DatabaseService(IDatabaseService):
         finally:
             session.close()
     
+    def insert_data_with_recovery(self, df: pd.DataFrame, table_name: str, batch_size: int = 1000) -> Dict[str, Any]:
+        """
+        Insert data, isolating rows the database rejects instead of failing the load.
+        
+        Each batch runs inside a savepoint. When a batch fails on a row (FK
+        violation, value too long, duplicate key, ...) the savepoint is rolled
+        back and the batch is bisected recursively, so every good sub-batch is
+        still loaded and only the offending rows are returned, each with its
+        database error. Any other error (lost connection, missing table or
+        permission, ...) fails the whole load without bisecting.
+        
+        Args:
+            df: DataFrame to insert
+            table_name: Target table name
+            batch_size: Batch size for insertion
+            
+        Returns:
+            Dictionary with 'success', 'rows_inserted' and 'failed_rows' (the
+            rejected rows of df, index preserved, with a 'db_error' column)
+        """
+        result = {
+            'success': True,
+            'rows_inserted': 0,
+            'failed_rows': df.iloc[0:0].assign(db_error=pd.Series(dtype=object))
+        }
+        if df.empty:
+            logger.warning(f"No data to insert into table {table_name}")
+            return result
+        
+        logger.info(f"Inserting {len(df)} rows into table {table_name} with batch recovery")
+        
+        session: Session = get_session()
+        failures: List[Tuple[int, str]] = []
+        try:
+            table = self._get_table(table_name)
+            total_rows = len(df)
+            for start_idx in range(0, total_rows, batch_size):
+                end_idx = min(start_idx + batch_size, total_rows)
+                records = self._frame_to_records(df.iloc[start_idx:end_idx])
+                result['rows_inserted'] += self._insert_bisecting(
+                    session, table, records, start_idx, 0, len(records), failures
+                )
+            
+            session.commit()
+            
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Failed to insert data into {table_name}: {e}")
+            result['success'] = False
+            result['rows_inserted'] = 0
+            return result
+        finally:
+            session.close()
+        
+        if failures:
+            positions = np.array([position for position, _ in failures])
+            failed_rows = df.iloc[positions].copy()
+            failed_rows['db_error'] = [error for _, error in failures]
+            result['failed_rows'] = failed_rows
+            logger.warning(f"Isolated {len(failures)} rows rejected by the database in {table_name}")
+        
+        logger.info(f"Successfully inserted {result['rows_inserted']} rows into {table_name}")
+        return result
+    
+    def insert_data_checkpointed(self, df: pd.DataFrame, table_name: str, progress: Dict[str, Any],
+                                 end_offset: int, batch_size: int = 1000, commit_every: int = 10,
+                                 recovery: bool = True) -> Dict[str, Any]:
+        """
+        Insert data committing every commit_every batches, recording progress with each commit.
+        
+        The rows are inserted in index order. Each commit also stores, in the
+        same transaction, the index after the last committed row as the
+        row_offset of the load_progress row, so a load that dies loses only
+        the batches since the last commit and a resumed load (see
+        get_load_progress) neither skips nor repeats rows. The final commit
+        stores end_offset.
+        
+        Args:
+            df: DataFrame to insert, with an integer index (source row positions)
+            table_name: Target table name
+            progress: load_progress key columns plus file_signature and run_id
+            end_offset: row_offset once every row is committed (the end of the sheet)
+            batch_size: Batch size for insertion
+            commit_every: Batches per commit
+            recovery: Bisect failing batches like insert_data_with_recovery
+            
+        Returns:
+            Dictionary with 'success', 'rows_inserted' (committed rows),
+            'row_offset' (the last row_offset committed, None if nothing was)
+            and 'failed_rows' as returned by insert_data_with_recovery
+        """
+        result = {
+            'success': True,
+            'rows_inserted': 0,
+            'row_offset': None,
+            'failed_rows': df.iloc[0:0].assign(db_error=pd.Series(dtype=object))
+        }
+        df = df.sort_index()
+        logger.info(f"Inserting {len(df)} rows into table {table_name}, committing every {commit_every} batches")
+        
+        session: Session = get_session()
+        failures: List[Tuple[int, str]] = []
+        committed_failures = 0
+        pending_rows = 0
+        try:
+            table = self._get_table(table_name)
+            total_rows = len(df)
+            batch_starts = list(range(0, total_rows, batch_size))
+            for number, start_idx in enumerate(batch_starts, start=1):
+                end_idx = min(start_idx + batch_size, total_rows)
+                records = self._frame_to_records(df.iloc[start_idx:end_idx])
+                if recovery:
+                    pending_rows += self._insert_bisecting(
+                        session, table, records, start_idx, 0, len(records), failures
+                    )
+                else:
+                    self._insert_batch(session, table_name, records)
+                    pending_rows += len(records)
+                if number % commit_every == 0 and number < len(batch_starts):
+                    row_offset = int(df.index[end_idx - 1]) + 1
+                    self._save_progress(session, progress, row_offset=row_offset)
+                    session.commit()
+                    result['row_offset'] = row_offset
+                    result['rows_inserted'] += pending_rows
+                    committed_failures = len(failures)
+                    pending_rows = 0
+                    logger.debug(f"Committed {table_name} up to row {df.index[end_idx - 1]}")
+            
+            self._save_progress(session, progress, row_offset=end_offset)
+            session.commit()
+            result['row_offset'] = end_offset
+            result['rows_inserted'] += pending_rows
+            committed_failures = len(failures)
+            
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Failed to insert data into {table_name} after {result['rows_inserted']} "
+                         f"committed rows: {e}")
+            result['success'] = False
+        finally:
+            session.close()
+        
+        # Rows isolated in batches that were rolled back are not rejected yet
+        failures = failures[:committed_failures]
+        if failures:
+            positions = np.array([position for position, _ in failures])
+            failed_rows = df.iloc[positions].copy()
+            failed_rows['db_error'] = [error for _, error in failures]
+            result['failed_rows'] = failed_rows
+            logger.warning(f"Isolated {len(failures)} rows rejected by the database in {table_name}")
+        
+        return result
+    
+    def get_load_progress(self, progress: Dict[str, Any]) -> Tuple[int, int]:
+        """
+        Get how far a checkpointed load got.
+        
+        Args:
+            progress: load_progress key columns and the file_signature of the source file
+            
+        Returns:
+            (row_offset, rejects_offset); (0, 0) if the load never committed
+            or the source file changed since
+        """
+        from ..database.models import LoadProgress
+        session: Session = get_session()
+        try:
+            row = session.get(LoadProgress, tuple(progress[key] for key in _PROGRESS_KEY))
+            if row is None or row.file_signature != progress['file_signature']:
+                return 0, 0
+            return row.row_offset, row.rejects_offset
+        finally:
+            session.close()
+    
+    def set_rejects_offset(self, progress: Dict[str, Any], rejects_offset: int):
+        """Record that the rejected rows of a checkpointed load below rejects_offset are quarantined."""
+        session: Session = get_session()
+        try:
+            self._save_progress(session, progress, rejects_offset=rejects_offset)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    
     def get_existing_records(self, table_name: str, filters: Dict[str, Any]) -> pd.DataFrame:
         """
         Get existing records from table with filters.
@@ -101,6 +300,27 @@ class DatabaseService(IDatabaseService):
         finally:
             session.close()
     
+    def get_column_values(self, table_name: str, column_name: str) -> pd.Series:
+        """
+        Get all values of a single column, e.g. the existing keys of a parent table.
+        
+        Args:
+            table_name: Table to query
+            column_name: Column to read
+            
+        Returns:
+            Series with the column values
+        """
+        table = self._get_table(table_name)
+        session: Session = get_session()
+        try:
+            result = session.execute(select(table.c[column_name]).execution_options(yield_per=100000))
+            values = pd.Series(result.scalars().all(), dtype=object)
+            logger.debug(f"Retrieved {len(values)} values of {table_name}.{column_name}")
+            return values
+        finally:
+            session.close()
+    
     def create_tables(self) -> bool:
         """Create all required tables in database."""
         try:
@@ -111,22 +331,124 @@ class DatabaseService(IDatabaseService):
             logger.error(f"Failed to create tables: {e}")
             return False
     
+    def _save_progress(self, session: Session, progress: Dict[str, Any], **offsets: int):
+        """Create or update a load_progress row in the session's transaction."""
+        from ..database.models import LoadProgress
+        key = tuple(progress[column] for column in _PROGRESS_KEY)
+        row = session.get(LoadProgress, key)
+        if row is None or row.file_signature != progress['file_signature']:
+            if row is not None:
+                session.delete(row)
+                session.flush()
+            row = LoadProgress(**dict(zip(_PROGRESS_KEY, key)), file_signature=progress['file_signature'],
+                               row_offset=0, rejects_offset=0)
+            session.add(row)
+        for column, offset in offsets.items():
+            setattr(row, column, offset)
+        row.run_id = progress.get('run_id')
+        session.flush()
+    
+    def _insert_bisecting(self, session: Session, table, records: list, offset: int,
+                          start: int, end: int, failures: List[Tuple[int, str]]) -> int:
+        """Insert records[start:end] in a savepoint, bisecting on failure; returns rows inserted."""
+        savepoint = session.begin_nested()
+        try:
+            session.execute(self._insert_statement(session, table, records), records[start:end])
+            savepoint.commit()
+            return end - start
+        except SQLAlchemyError as e:
+            savepoint.rollback()
+            if not _is_row_error(e):
+                # Connection, permission or schema errors fail every row alike
+                raise
+            if end - start == 1:
+                failures.append((offset + start, self._error_message(e)))
+                return 0
+        
+        middle = (start + end) // 2
+        return (self._insert_bisecting(session, table, records, offset, start, middle, failures) +
+                self._insert_bisecting(session, table, records, offset, middle, end, failures))
+    
+    def _error_message(self, error: SQLAlchemyError) -> str:
+        """Get the driver's error message without SQL and parameters."""
+        message = str(getattr(error, 'orig', None) or error)
+        return message.strip().splitlines()[0] if message.strip() else error.__class__.__name__
+    
+    def _frame_to_records(self, df: pd.DataFrame) -> list:
+        """
+        Convert a DataFrame to insert records, turning NaN/NaT into NULL.
+
+        Columns are read through Arrow, which takes Arrow-backed (string) columns
+        as they are instead of boxing every cell into a Python object first.
+        """
+        try:
+            return pa.Table.from_pandas(df, preserve_index=False).to_pylist()
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            # Mixed-type object columns
+            return df.astype(object).where(df.notna(), None).to_dict('records')
+    
+    def _get_table(self, table_name: str):
+        """Get table object from metadata."""
+        from ..database.models import Base
+        table = Base.metadata.tables.get(table_name)
+        
+        if table is None:
+            raise ValueError(f"Table {table_name} not found in metadata")
+        return table
+    
+    def _insert_statement(self, session: Session, table, records: list):
+        """
+        INSERT statement for a batch, as an upsert on the primary key in upsert mode.
+        
+        Only the columns present in the records are updated, so columns a
+        sheet does not map keep their stored values.
+        """
+        if not self.upsert:
+            return table.insert()
+        
+        dialect = session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            raise ValueError(f"Upserts are not supported on {dialect}")
+        
+        statement = insert(table)
+        key_columns = [column.name for column in table.primary_key.columns]
+        loaded = set(records[0]) if records else set()
+        updates = {
+            column.name: statement.excluded[column.name]
+            for column in table.columns if column.name in loaded and not column.primary_key
+        }
+        for column in table.columns:
+            # ON CONFLICT updates skip Column(onupdate=...), e.g. updated_at
+            if column.onupdate is not None and column.name not in loaded and updates:
+                updates[column.name] = column.onupdate.arg
+        if not updates:
+            return statement.on_conflict_do_nothing(index_elements=key_columns)
+        return statement.on_conflict_do_update(index_elements=key_columns, set_=updates)
+    
     def _insert_batch(self, session: Session, table_name: str, records: list):
         """Insert a batch of records into the database."""
         try:
             # Get table object from metadata
-            from ..database.models import Base
-            table = Base.metadata.tables.get(table_name)
-            
-            if table is None:
-                raise ValueError(f"Table {table_name} not found in metadata")
+            table = self._get_table(table_name)
             
             # Insert records
-            session.execute(table.insert(), records)
+            session.execute(self._insert_statement(session, table, records), records)
             
         except SQLAlchemyError as e:
             logger.error(f"SQLAlchemy error inserting batch into {table_name}: {e}")
             raise
         except Exception as e:
             logger.error(f"Error inserting batch into {table_name}: {e}")
-            raise
\ No newline at end of file
+            raise
+
+
+def _is_row_error(error: SQLAlchemyError) -> bool:
+    """Whether an insert failed because of the rows' values rather than the database or schema."""
+    if isinstance(error, (IntegrityError, DataError)):
+        return True
+    # Raised before reaching the database, when a value cannot be bound to its column type
+    return type(error) is StatementError
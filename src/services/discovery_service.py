@@ -0,0 +1,203 @@
+"""Incremental discovery of data files from a persisted directory snapshot."""
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+
+from loguru import logger
+
+# Directories modified this recently are listed again on the next scan: a
+# file created within the same mtime tick would not change the mtime again
+_RACY_WINDOW_NS = 2_000_000_000
+
+_SNAPSHOT_VERSION = 1
+
+
+@dataclass
+class DiscoveryResult:
+    """
+    Files found under a directory.
+
+    Attributes:
+        files: Every file under the directory, sorted
+        changed: Files that are new or whose size or mtime changed since the last saved snapshot
+        directories: Directories visited
+        directories_listed: Directories whose entries were listed again (the rest came from the snapshot)
+    """
+    files: List[Path] = field(default_factory=list)
+    changed: List[Path] = field(default_factory=list)
+    directories: int = 0
+    directories_listed: int = 0
+
+
+class DiscoveryService:
+    """
+    Lists data files by re-listing only the directories that changed.
+
+    The snapshot records, per directory, its mtime, its subdirectories and
+    the size and mtime of its files, and is saved as JSON between runs.
+    Creating, deleting or renaming an entry changes the mtime of its
+    directory, so a scan stats every directory and lists (with os.scandir)
+    only those whose mtime moved; a mostly static tree costs one stat per
+    directory however many files it holds. A file rewritten in place does
+    not change its directory's mtime and is only seen as modified once its
+    directory changes; drops written under a temporary name and renamed
+    are always seen.
+    """
+
+    def __init__(self, snapshot_path: str = "discovery_snapshot.json"):
+        """
+        Initialize discovery service.
+
+        Args:
+            snapshot_path: JSON file keeping the directory snapshot between runs
+        """
+        self.snapshot_path = Path(snapshot_path)
+        self._lock = threading.RLock()
+        self._directories: Dict[str, Dict[str, Any]] = self._load()
+        self._dirty = False
+        self._saved_unseen: FrozenSet[str] = frozenset()
+        logger.info(f"Discovery service initialized with snapshot: {self.snapshot_path}")
+
+    def scan(self, root: Path) -> DiscoveryResult:
+        """
+        List the files under a directory, reporting those that are new or modified.
+
+        Args:
+            root: Directory to scan
+
+        Returns:
+            Files under root and the changes since the snapshot
+        """
+        result = DiscoveryResult()
+        with self._lock:
+            pending = [Path(root)]
+            while pending:
+                directory = pending.pop()
+                subdirectories = self._scan_directory(directory, result)
+                pending.extend(directory / name for name in subdirectories)
+        result.files.sort()
+        result.changed.sort()
+        logger.debug(f"Scanned {root}: {len(result.files)} files, {len(result.changed)} changed, "
+                     f"{result.directories_listed} of {result.directories} directories listed")
+        return result
+
+    def find_directory(self, root: Path, name: str) -> Optional[Path]:
+        """Find a subdirectory of root by case-insensitive name, from the snapshot where possible."""
+        root = Path(root)
+        if not root.is_dir():
+            return None
+        with self._lock:
+            for subdirectory in self._scan_directory(root, DiscoveryResult()):
+                if subdirectory.lower() == name.lower():
+                    return root / subdirectory
+        return None
+
+    def retry(self, paths: List[Path]):
+        """Report files as new again on the next scan (e.g. after they failed to load)."""
+        with self._lock:
+            for path in paths:
+                entry = self._directories.get(str(Path(path).parent.resolve()))
+                if entry is not None and entry['files'].pop(Path(path).name, None) is not None:
+                    # Listing the directory again finds the file missing from the snapshot
+                    entry['mtime_ns'] = -1
+                    self._dirty = True
+
+    def save(self, unseen: Iterable[Path] = ()):
+        """
+        Persist the snapshot if it changed.
+
+        Args:
+            unseen: Files left out of the saved snapshot, so the next process
+                reports them as new; the snapshot in memory keeps them
+        """
+        with self._lock:
+            unseen_files = frozenset(str(Path(path).resolve()) for path in unseen)
+            if not self._dirty and unseen_files == self._saved_unseen:
+                return
+            directories = dict(self._directories) if unseen_files else self._directories
+            for path in unseen_files:
+                parent, name = os.path.split(path)
+                entry = directories.get(parent)
+                if entry is not None and name in entry['files']:
+                    # Listing the directory again finds the file missing from the snapshot
+                    files = {other: signature for other, signature in entry['files'].items() if other != name}
+                    directories[parent] = {**entry, 'mtime_ns': -1, 'files': files}
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.snapshot_path.with_name(f".{self.snapshot_path.name}.tmp")
+            with open(temporary, 'w', encoding='utf-8') as f:
+                json.dump({'version': _SNAPSHOT_VERSION, 'directories': directories}, f)
+            os.replace(temporary, self.snapshot_path)
+            self._dirty = False
+            self._saved_unseen = unseen_files
+
+    def _scan_directory(self, directory: Path, result: DiscoveryResult) -> List[str]:
+        """Record the files of one directory in result and return its subdirectory names."""
+        key = str(directory.resolve())
+        result.directories += 1
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except FileNotFoundError:
+            self._forget(key)
+            return []
+
+        entry = self._directories.get(key)
+        if entry is None or entry['mtime_ns'] != mtime_ns:
+            entry = self._list_directory(directory, key, mtime_ns, entry, result)
+        result.files.extend(directory / name for name in entry['files'])
+        return entry['directories']
+
+    def _list_directory(self, directory: Path, key: str, mtime_ns: int, previous: Optional[Dict[str, Any]],
+                        result: DiscoveryResult) -> Dict[str, Any]:
+        """List a changed directory and record which of its files are new or modified."""
+        result.directories_listed += 1
+        files: Dict[str, List[int]] = {}
+        directories: List[str] = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        directories.append(entry.name)
+                    elif entry.is_file():
+                        stat = entry.stat()
+                        files[entry.name] = [stat.st_size, stat.st_mtime_ns]
+                except OSError:
+                    # Removed while listing
+                    continue
+
+        known = previous['files'] if previous else {}
+        result.changed.extend(directory / name for name, signature in files.items() if known.get(name) != signature)
+        for removed in set(previous['directories'] if previous else []) - set(directories):
+            self._forget(str((directory / removed).resolve()))
+
+        if time.time_ns() - mtime_ns < _RACY_WINDOW_NS:
+            mtime_ns = -1
+        entry = {'mtime_ns': mtime_ns, 'files': files, 'directories': sorted(directories)}
+        self._directories[key] = entry
+        self._dirty = True
+        return entry
+
+    def _forget(self, key: str):
+        """Drop a directory and everything below it from the snapshot."""
+        prefix = key.rstrip(os.sep) + os.sep
+        for stale in [path for path in self._directories if path == key or path.startswith(prefix)]:
+            del self._directories[stale]
+            self._dirty = True
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Load the saved snapshot; a missing or unreadable one starts empty."""
+        if not self.snapshot_path.exists():
+            return {}
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == _SNAPSHOT_VERSION:
+                return data['directories']
+            logger.info(f"Discarding discovery snapshot of version {data.get('version')}")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not read discovery snapshot {self.snapshot_path}: {e}")
+        return {}
@@ -0,0 +1,183 @@
+"""Persistent row fingerprints for skipping rows that were already loaded."""
+
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from ..transformers.external import row_hashes
+
+_FINGERPRINT_DTYPE = np.dtype('<u8')
+_BASE_FILE = 'fingerprints.u64'
+_SEGMENT_SUFFIX = '.segment.u64'
+
+
+def row_fingerprints(df: pd.DataFrame) -> np.ndarray:
+    """
+    64-bit fingerprint of every row over its mapped columns.
+
+    Columns are hashed in name order, so the order of the column mappings
+    does not matter; the hash is seeded with a fixed key and therefore the
+    same in every process and run.
+    """
+    return row_hashes(df[sorted(df.columns, key=str)]).astype(_FINGERPRINT_DTYPE, copy=False)
+
+
+class FingerprintStore:
+    """
+    Fingerprints of the rows loaded into one table for one partner.
+
+    The store is a directory of sorted uint64 files: a base file and small
+    segments appended by each load. Files are memory mapped and probed with
+    np.searchsorted, so checking a million rows touches only the pages it
+    needs. Once compact_after segments have accumulated they are merged into
+    a new base file.
+    """
+
+    def __init__(self, path: Path, compact_after: int = 8):
+        """
+        Initialize fingerprint store.
+
+        Args:
+            path: Directory of the store (created on first write)
+            compact_after: Segments kept before they are merged into the base file
+        """
+        self.path = Path(path)
+        self.compact_after = compact_after
+        self._lock = threading.RLock()
+        self._arrays: List[np.ndarray] = []
+        self._loaded = False
+
+    def contains(self, fingerprints: np.ndarray) -> np.ndarray:
+        """
+        Check which fingerprints are in the store.
+
+        Args:
+            fingerprints: Fingerprints to look up
+
+        Returns:
+            Boolean mask aligned with fingerprints
+        """
+        fingerprints = np.asarray(fingerprints, dtype=_FINGERPRINT_DTYPE)
+        found = np.zeros(len(fingerprints), dtype=bool)
+        if not len(fingerprints):
+            return found
+        # Probing in sorted order walks each mapped file front to back
+        order = np.argsort(fingerprints, kind='stable')
+        probes = fingerprints[order]
+        for array in self._get_arrays():
+            if not len(array):
+                continue
+            positions = np.searchsorted(array, probes)
+            np.minimum(positions, len(array) - 1, out=positions)
+            found[order] |= np.asarray(array[positions]) == probes
+        return found
+
+    def add(self, fingerprints: np.ndarray):
+        """Record fingerprints as a new segment, compacting when enough segments have accumulated."""
+        fingerprints = np.unique(np.asarray(fingerprints, dtype=_FINGERPRINT_DTYPE))
+        if not len(fingerprints):
+            return
+        with self._lock:
+            fingerprints = fingerprints[~self.contains(fingerprints)]
+            if not len(fingerprints):
+                return
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._write(self.path / f"{uuid.uuid4().hex}{_SEGMENT_SUFFIX}", fingerprints)
+            self._loaded = False
+            if len(self._segment_paths()) >= self.compact_after:
+                self.compact()
+
+    def compact(self):
+        """Merge all segments into the base file."""
+        with self._lock:
+            segments = self._segment_paths()
+            if not segments:
+                return
+            parts = [np.fromfile(path, dtype=_FINGERPRINT_DTYPE) for path in [self.path / _BASE_FILE] + segments
+                     if path.exists()]
+            merged = np.unique(np.concatenate(parts))
+            self._arrays = []
+            self._write(self.path / _BASE_FILE, merged)
+            for path in segments:
+                path.unlink()
+            self._loaded = False
+            logger.debug(f"Compacted {len(segments)} fingerprint segments of {self.path} ({len(merged)} rows)")
+
+    def __len__(self) -> int:
+        return sum(len(array) for array in self._get_arrays())
+
+    def _get_arrays(self) -> List[np.ndarray]:
+        """Memory-mapped base file and segments, opened on first use after a change."""
+        with self._lock:
+            if not self._loaded:
+                paths = [self.path / _BASE_FILE] + self._segment_paths()
+                self._arrays = [
+                    np.memmap(path, dtype=_FINGERPRINT_DTYPE, mode='r')
+                    for path in paths if path.exists() and path.stat().st_size
+                ]
+                self._loaded = True
+            return list(self._arrays)
+
+    def _segment_paths(self) -> List[Path]:
+        if not self.path.is_dir():
+            return []
+        return sorted(self.path.glob(f'*{_SEGMENT_SUFFIX}'))
+
+    def _write(self, path: Path, fingerprints: np.ndarray):
+        """Write a sorted file atomically, so readers never see a partial file."""
+        temporary = path.with_name(f".{path.name}.tmp")
+        fingerprints.astype(_FINGERPRINT_DTYPE, copy=False).tofile(temporary)
+        os.replace(temporary, path)
+
+
+class FingerprintService:
+    """Service keeping one fingerprint store per partner and table."""
+
+    def __init__(self, fingerprints_path: str = "fingerprints"):
+        """Initialize fingerprint service."""
+        self.fingerprints_path = Path(fingerprints_path)
+        self._stores: Dict[Tuple[str, str], FingerprintStore] = {}
+        self._lock = threading.Lock()
+        logger.info(f"Fingerprint service initialized with path: {self.fingerprints_path}")
+
+    def seen(self, partner_id: str, table_name: str, df: pd.DataFrame) -> np.ndarray:
+        """
+        Find rows that were already loaded into a table.
+
+        Args:
+            partner_id: Partner the rows belong to
+            table_name: Target table
+            df: Mapped rows
+
+        Returns:
+            Boolean mask of rows whose fingerprint is stored
+        """
+        if df.empty:
+            return np.zeros(0, dtype=bool)
+        return self.get_store(partner_id, table_name).contains(row_fingerprints(df))
+
+    def record(self, partner_id: str, table_name: str, df: pd.DataFrame):
+        """
+        Store the fingerprints of rows loaded into a table.
+
+        Args:
+            partner_id: Partner the rows belong to
+            table_name: Target table
+            df: Mapped rows that were loaded
+        """
+        if not df.empty:
+            self.get_store(partner_id, table_name).add(row_fingerprints(df))
+
+    def get_store(self, partner_id: str, table_name: str) -> FingerprintStore:
+        """Get the store of a partner's table."""
+        with self._lock:
+            key = (partner_id, table_name)
+            if key not in self._stores:
+                self._stores[key] = FingerprintStore(self.fingerprints_path / partner_id / table_name)
+            return self._stores[key]
@@ -0,0 +1,344 @@
+"""Per-stage timing and throughput of processing runs, exported as JSON and Prometheus text."""
+
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+try:
+    import resource
+except ImportError:  # No getrusage on Windows; peak RSS is not reported
+    resource = None
+
+# Stages in pipeline order
+STAGES = ('read', 'header', 'transform', 'validate', 'load')
+
+_METRIC_PREFIX = 'data_parser'
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process so far."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@dataclass
+class StageRecord:
+    """One timed stage of a file, sheet or chunk."""
+    stage: str
+    partner_id: Optional[str] = None
+    file: Optional[str] = None
+    sheet: Optional[str] = None
+    table: Optional[str] = None
+    chunk: Optional[int] = None
+    seconds: float = 0.0
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    bytes_read: Optional[int] = None
+    # Peak of the whole process when the stage ended
+    peak_rss_bytes: Optional[int] = None
+
+
+# Thread ident -> record of the stage that thread is in (read by the sampling profiler)
+ACTIVE_STAGES: Dict[int, StageRecord] = {}
+
+
+class _Stage:
+    """Context timing one stage; the record is added to the run when it exits."""
+
+    __slots__ = ('_metrics', '_record', '_start', '_outer')
+
+    def __init__(self, metrics: 'RunMetrics', record: StageRecord):
+        self._metrics = metrics
+        self._record = record
+
+    def __enter__(self) -> StageRecord:
+        self._outer = _activate(self._record)
+        self._start = time.perf_counter()
+        return self._record
+
+    def __exit__(self, *exc_info):
+        self._record.seconds = time.perf_counter() - self._start
+        _activate(self._outer)
+        self._metrics.add(self._record)
+        return False
+
+
+class RunMetrics:
+    """Stage records of one processing run."""
+
+    enabled = True
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.started_at = time.time()
+        self.records: List[StageRecord] = []
+        self._lock = threading.Lock()
+
+    def stage(self, stage: str, **labels: Any) -> _Stage:
+        """
+        Time a stage; set rows_out (and any other field) on the record it yields.
+
+        Args:
+            stage: Stage name (see STAGES)
+            labels: StageRecord fields known up front (partner_id, file, sheet, rows_in, ...)
+        """
+        return _Stage(self, StageRecord(stage, **labels))
+
+    def iterate(self, items: Iterable[Any], stage: str, rows: Callable[[Any], int],
+                bytes_read: Optional[int] = None, **labels: Any) -> Iterator[Any]:
+        """
+        Yield from items, recording the time spent producing each one as a stage of its own.
+
+        Args:
+            items: Items produced lazily (e.g. chunks parsed from a file)
+            stage: Stage name
+            rows: Rows out of an item
+            bytes_read: Bytes read for the whole iteration, recorded on the first item
+            labels: StageRecord fields shared by every item
+        """
+        iterator = iter(items)
+        chunk = 0
+        while True:
+            record = StageRecord(stage, chunk=chunk, bytes_read=bytes_read if chunk == 0 else None, **labels)
+            outer = _activate(record)
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                record.seconds = time.perf_counter() - start
+                _activate(outer)
+            record.rows_out = rows(item)
+            self.add(record)
+            chunk += 1
+            yield item
+
+    def add(self, record: StageRecord):
+        """Add a finished stage record."""
+        record.peak_rss_bytes = peak_rss_bytes()
+        with self._lock:
+            self.records.append(record)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Totals per stage: calls, seconds, rows in and out, bytes read and rows per second."""
+        with self._lock:
+            records = list(self.records)
+        return summarize(records)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Run report: per-stage totals and every stage record."""
+        with self._lock:
+            records = [asdict(record) for record in self.records]
+        return {
+            'run_id': self.run_id,
+            'started_at': self.started_at,
+            'finished_at': time.time(),
+            'peak_rss_bytes': peak_rss_bytes(),
+            'stages': self.summary(),
+            'records': records
+        }
+
+
+def summarize(records: Iterable[StageRecord]) -> Dict[str, Dict[str, Any]]:
+    """Totals per stage of records: calls, seconds, rows in and out, bytes read and rows per second."""
+    stages: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        totals = stages.setdefault(record.stage, {
+            'calls': 0, 'seconds': 0.0, 'rows_in': 0, 'rows_out': 0, 'bytes_read': 0
+        })
+        totals['calls'] += 1
+        totals['seconds'] += record.seconds
+        totals['rows_in'] += record.rows_in or 0
+        totals['rows_out'] += record.rows_out or 0
+        totals['bytes_read'] += record.bytes_read or 0
+    for totals in stages.values():
+        rows = totals['rows_out'] or totals['rows_in']
+        totals['rows_per_second'] = rows / totals['seconds'] if totals['seconds'] > 0 else None
+    order = {stage: position for position, stage in enumerate(STAGES)}
+    return dict(sorted(stages.items(), key=lambda item: order.get(item[0], len(order))))
+
+
+def _activate(record: Optional[StageRecord]) -> Optional[StageRecord]:
+    """Mark the stage the current thread is in, returning the one it was in before."""
+    ident = threading.get_ident()
+    outer = ACTIVE_STAGES.get(ident)
+    if record is None:
+        ACTIVE_STAGES.pop(ident, None)
+    else:
+        ACTIVE_STAGES[ident] = record
+    return outer
+
+
+class _NullStage:
+    """Stage context of disabled instrumentation."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> '_NullRecord':
+        return _NULL_RECORD
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _NullRecord:
+    """Record of disabled instrumentation; whatever is set on it is dropped."""
+
+    __slots__ = ()
+
+    def __setattr__(self, name: str, value: Any):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+_NULL_RECORD = _NullRecord()
+
+
+class NullRunMetrics:
+    """Metrics of a run with instrumentation disabled: every call is a no-op."""
+
+    enabled = False
+    records: Tuple[StageRecord, ...] = ()
+
+    def stage(self, stage: str, **labels: Any) -> _NullStage:
+        return _NULL_STAGE
+
+    def iterate(self, items: Iterable[Any], stage: str, rows: Callable[[Any], int],
+                bytes_read: Optional[int] = None, **labels: Any) -> Iterable[Any]:
+        return items
+
+
+NULL_RUN_METRICS = NullRunMetrics()
+
+
+class Instrumentation:
+    """
+    Times the pipeline stages of processing runs and exports the results.
+
+    Each run records, per file, sheet and target table (and chunk of a
+    streamed file), the wall time, rows in and out, bytes read and the
+    process's peak RSS of the read, header check, transform, validate and
+    load stages. When a run finishes, its report is written as JSON to
+    metrics_path/<run_id>.json, and metrics_path/<prometheus_file> is
+    rewritten with counters per partner and stage accumulated over every
+    run of this process, in the Prometheus text format (e.g. for the node
+    exporter's textfile collector). Disabled instrumentation hands out
+    no-op metrics, so the stages cost one method call each, unless a
+    listener (such as the profiler) asked for the stage records; those
+    runs are recorded but not exported.
+    """
+
+    def __init__(self, enabled: bool = False, metrics_path: str = "metrics",
+                 prometheus_file: str = "data_parser.prom"):
+        """
+        Initialize instrumentation.
+
+        Args:
+            enabled: Record and export stage timings
+            metrics_path: Directory of the run reports and the Prometheus file
+            prometheus_file: Name of the Prometheus text file in metrics_path
+        """
+        self.enabled = enabled
+        self.metrics_path = Path(metrics_path)
+        self.prometheus_file = prometheus_file
+        self._lock = threading.Lock()
+        # (partner, stage) -> calls, seconds, rows in, rows out, bytes read
+        self._totals: Dict[Tuple[str, str], List[float]] = {}
+        self._runs = 0
+        self._listeners: List[Callable[[RunMetrics], None]] = []
+
+    def add_listener(self, listener: Callable[[RunMetrics], None]):
+        """Record the stages of every following run and hand its metrics to listener when it finishes."""
+        self._listeners.append(listener)
+
+    def start_run(self, run_id: str):
+        """Metrics to record a run's stages in (no-op metrics when disabled)."""
+        return RunMetrics(run_id) if self.enabled or self._listeners else NULL_RUN_METRICS
+
+    def finish_run(self, metrics) -> Optional[Path]:
+        """
+        Write the report of a finished run and update the Prometheus file.
+
+        Returns:
+            Path of the JSON report, or None when disabled
+        """
+        if not metrics.enabled:
+            return None
+        for listener in self._listeners:
+            listener(metrics)
+        if not self.enabled:
+            return None
+        report = metrics.to_dict()
+        with self._lock:
+            self._runs += 1
+            for record in metrics.records:
+                totals = self._totals.setdefault((record.partner_id or '', record.stage), [0, 0.0, 0, 0, 0])
+                totals[0] += 1
+                totals[1] += record.seconds
+                totals[2] += record.rows_in or 0
+                totals[3] += record.rows_out or 0
+                totals[4] += record.bytes_read or 0
+            self.metrics_path.mkdir(parents=True, exist_ok=True)
+            _write_atomic(self.metrics_path / self.prometheus_file,
+                          self._prometheus_text(report['finished_at'], report['peak_rss_bytes']))
+
+        report_path = self.metrics_path / f"{metrics.run_id}.json"
+        _write_atomic(report_path, json.dumps(report, indent=2, default=str))
+        logger.info(f"Stage timings of run {metrics.run_id} written to {report_path}")
+        return report_path
+
+    def _prometheus_text(self, finished_at: float, peak_rss: Optional[int]) -> str:
+        """Accumulated counters in the Prometheus text exposition format."""
+        families = [
+            ('stage_calls_total', 'Stage executions (files, sheets or chunks)', 0),
+            ('stage_seconds_total', 'Wall time spent in a stage', 1),
+            ('stage_rows_in_total', 'Rows entering a stage', 2),
+            ('stage_rows_out_total', 'Rows leaving a stage', 3),
+            ('stage_read_bytes_total', 'Bytes of source files read', 4),
+        ]
+        lines = []
+        for name, help_text, position in families:
+            lines.append(f"# HELP {_METRIC_PREFIX}_{name} {help_text}.")
+            lines.append(f"# TYPE {_METRIC_PREFIX}_{name} counter")
+            for (partner, stage), totals in sorted(self._totals.items()):
+                lines.append(f'{_METRIC_PREFIX}_{name}{{partner="{_escape(partner)}",stage="{_escape(stage)}"}} '
+                             f'{totals[position]:g}')
+        lines += [
+            f"# HELP {_METRIC_PREFIX}_runs_total Processing runs finished.",
+            f"# TYPE {_METRIC_PREFIX}_runs_total counter",
+            f"{_METRIC_PREFIX}_runs_total {self._runs}",
+            f"# HELP {_METRIC_PREFIX}_last_run_timestamp_seconds End of the last processing run.",
+            f"# TYPE {_METRIC_PREFIX}_last_run_timestamp_seconds gauge",
+            f"{_METRIC_PREFIX}_last_run_timestamp_seconds {finished_at:.3f}",
+        ]
+        if peak_rss is not None:
+            lines += [
+                f"# HELP {_METRIC_PREFIX}_peak_rss_bytes Peak resident set size of the process.",
+                f"# TYPE {_METRIC_PREFIX}_peak_rss_bytes gauge",
+                f"{_METRIC_PREFIX}_peak_rss_bytes {peak_rss}",
+            ]
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _write_atomic(path: Path, content: str):
+    """Write a file through a temporary file, so readers never see it half written."""
+    temporary = path.with_name(f".{path.name}.tmp")
+    with open(temporary, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(temporary, path)
@@ -0,0 +1,588 @@
+"""Durable queue of file ingestion jobs."""
+
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import (
+    BigInteger, Column, Float, Index, Integer, MetaData, String, Table, Text, and_, create_engine, event,
+    exists, func, insert, inspect, or_, select, text, update
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+# Longest wait between two attempts of a job
+_MAX_RETRY_DELAY = 3600.0
+
+metadata = MetaData()
+
+jobs_table = Table(
+    'ingest_jobs', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('partner_id', String(100), nullable=False),
+    Column('file_path', Text, nullable=False),
+    Column('size_bytes', BigInteger, nullable=False, default=0),
+    # Load order of the file's table within the partner (parents first)
+    Column('stage', Integer, nullable=False, default=0),
+    Column('priority', Integer, nullable=False, default=0),
+    Column('status', String(20), nullable=False, default=QUEUED),
+    Column('attempts', Integer, nullable=False, default=0),
+    Column('max_attempts', Integer, nullable=False, default=3),
+    # Epoch seconds; a queued job is not claimed before available_at
+    Column('available_at', Float, nullable=False),
+    Column('enqueued_at', Float, nullable=False),
+    Column('started_at', Float),
+    Column('finished_at', Float),
+    Column('last_error', Text),
+    Column('run_id', String(64)),
+    Column('records_processed', Integer),
+    # Size and mtime of the file when it was queued
+    Column('file_signature', String(100)),
+    # Node running the job and the epoch seconds its claim lasts without a heartbeat
+    Column('lease_owner', String(255)),
+    Column('lease_expires_at', Float),
+    Column('heartbeat_at', Float),
+    Index('ix_ingest_jobs_status', 'status', 'available_at'),
+    Index('ix_ingest_jobs_partner', 'partner_id', 'status'),
+)
+
+# One queued or running job per file, even when several nodes queue the same drop at once
+Index('ux_ingest_jobs_active_file', jobs_table.c.partner_id, jobs_table.c.file_path, unique=True,
+      postgresql_where=jobs_table.c.status.in_(ACTIVE_STATUSES),
+      sqlite_where=jobs_table.c.status.in_(ACTIVE_STATUSES))
+
+
+class LeaseLostError(Exception):
+    """A job's lease expired and the job was handed to another node before its result was recorded."""
+
+
+@dataclass
+class Job:
+    """A file of a partner to ingest."""
+    id: int
+    partner_id: str
+    file_path: str
+    size_bytes: int
+    stage: int
+    priority: int
+    status: str
+    attempts: int
+    max_attempts: int
+    available_at: float
+    enqueued_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    last_error: Optional[str] = None
+    run_id: Optional[str] = None
+    records_processed: Optional[int] = None
+    file_signature: Optional[str] = None
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[float] = None
+    heartbeat_at: Optional[float] = None
+
+    @classmethod
+    def from_row(cls, row: Any) -> 'Job':
+        return cls(**dict(row._mapping))
+
+
+@dataclass
+class DrainStats:
+    """Counters of a drain."""
+    succeeded: int = 0
+    retried: int = 0
+    failed: int = 0
+    # Jobs whose lease passed to another node before they finished
+    lost: int = 0
+    records_processed: int = 0
+    results: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class JobQueue:
+    """
+    Durable queue of ingestion jobs, one per partner file.
+
+    Jobs live in a SQL table (a local SQLite file by default), so they
+    survive restarts and several drains, on one machine or many, can share
+    the queue. The next job is the queued, due job with the highest
+    priority and then the smallest size, so small files are not held up by
+    large annexures; a job's size counts as aging_rate bytes smaller for
+    every second it has waited, so large files still get their turn. A job
+    is not claimed while a job of the same partner feeding a parent table
+    (lower stage) is queued or running, nor while its partner has
+    partner_concurrency jobs running. A failed job is retried after
+    retry_delay seconds, doubling with every attempt, until it has run
+    max_attempts times.
+
+    Claiming a job leases it to this node for lease_seconds. A drain renews
+    the leases of its running jobs every heartbeat_interval seconds; a job
+    whose lease ran out (its node died or lost the database) is queued
+    again, as a failed attempt, by the next claim on any node. Results are
+    only recorded by the lease owner, so a node that lost a job to another
+    cannot overwrite its outcome. On PostgreSQL a claim locks its candidate
+    with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent nodes take
+    different jobs without waiting on each other, and serializes claims of
+    one partner with an advisory lock to keep the partner and stage limits;
+    on SQLite every transaction takes the database write lock up front.
+    """
+
+    def __init__(self, url: str = "sqlite:///jobs.sqlite", partner_concurrency: int = 1,
+                 max_attempts: int = 3, retry_delay: float = 30.0, aging_rate: float = 100_000.0,
+                 lease_seconds: float = 300.0, heartbeat_interval: float = 60.0, node_id: Optional[str] = None):
+        """
+        Initialize job queue.
+
+        Args:
+            url: SQLAlchemy URL of the queue database
+            partner_concurrency: Jobs of one partner running at once
+            max_attempts: Attempts of a job before it is marked failed
+            retry_delay: Seconds before the first retry; doubled on each further attempt
+            aging_rate: Bytes a waiting job's size is reduced by per second of waiting
+            lease_seconds: Seconds a claimed job stays leased to this node without a heartbeat
+            heartbeat_interval: Seconds between lease renewals of a drain's running jobs
+            node_id: Name of this node in leases (host, process and a random suffix if omitted)
+        """
+        self.url = url
+        self.partner_concurrency = max(1, partner_concurrency)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.aging_rate = aging_rate
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = min(heartbeat_interval, lease_seconds / 2)
+        self.node_id = node_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._engine: Optional[Engine] = None
+        self._engine_lock = threading.Lock()
+
+    @property
+    def engine(self) -> Engine:
+        """Engine of the queue database, creating the jobs table on first use."""
+        if self._engine is None:
+            with self._engine_lock:
+                if self._engine is None:
+                    engine = create_engine(self.url)
+                    if engine.dialect.name == 'sqlite':
+                        _configure_sqlite(engine)
+                    metadata.create_all(engine)
+                    _upgrade_schema(engine)
+                    self._engine = engine
+        return self._engine
+
+    def enqueue(self, partner_id: str, files: List[Tuple[Path, int]], priority: int = 0,
+                skip_done: bool = False) -> List[int]:
+        """
+        Add jobs for files of a partner.
+
+        Files that already have a queued or running job are skipped.
+
+        Args:
+            partner_id: Partner identifier
+            files: (file, stage) pairs
+            priority: Higher priorities are claimed first
+            skip_done: Also skip files done without changing since they were queued
+                (e.g. when several nodes queue the same drop)
+
+        Returns:
+            IDs of the jobs added
+        """
+        now = time.time()
+        job_ids = []
+        with self.engine.begin() as connection:
+            for file_path, stage in files:
+                file_path = str(Path(file_path).resolve())
+                try:
+                    stat = Path(file_path).stat()
+                except FileNotFoundError:
+                    logger.warning(f"Not queueing {file_path}: file not found")
+                    continue
+                signature = f"{stat.st_size}:{stat.st_mtime_ns}"
+                statuses = ACTIVE_STATUSES + (DONE,) if skip_done else ACTIVE_STATUSES
+                existing = connection.execute(
+                    select(jobs_table.c.id, jobs_table.c.status).where(
+                        jobs_table.c.partner_id == partner_id,
+                        jobs_table.c.file_path == file_path,
+                        jobs_table.c.status.in_(statuses),
+                        or_(jobs_table.c.status != DONE, jobs_table.c.file_signature == signature)
+                    ).limit(1)
+                ).first()
+                if existing is not None:
+                    logger.debug(f"{file_path} already {existing.status} as job {existing.id}")
+                    continue
+                try:
+                    # Another node may queue the same file at the same time
+                    with connection.begin_nested():
+                        result = connection.execute(insert(jobs_table).values(
+                            partner_id=partner_id, file_path=file_path, size_bytes=stat.st_size, stage=stage,
+                            priority=priority, status=QUEUED, attempts=0, max_attempts=self.max_attempts,
+                            available_at=now, enqueued_at=now, file_signature=signature
+                        ))
+                except IntegrityError:
+                    logger.debug(f"{file_path} was queued by another node")
+                    continue
+                job_ids.append(result.inserted_primary_key[0])
+        logger.info(f"Queued {len(job_ids)} jobs for {partner_id}")
+        return job_ids
+
+    def claim(self) -> Optional[Job]:
+        """Lease the next job to run to this node, or None if no job can run now."""
+        now = time.time()
+        with self.engine.begin() as connection:
+            self._release_expired(connection, now)
+            if connection.dialect.name == 'postgresql':
+                row = self._claim_skip_locked(connection, now)
+            else:
+                # The transaction holds the write lock, so the chosen job cannot be claimed meanwhile
+                candidate = jobs_table.alias('candidate')
+                next_job = self._claimable(select(candidate.c.id), candidate, now).limit(1).scalar_subquery()
+                row = connection.execute(
+                    self._lease(update(jobs_table).where(jobs_table.c.id == next_job, jobs_table.c.status == QUEUED),
+                                now)
+                ).first()
+        if row is None:
+            return None
+        job = Job.from_row(row)
+        logger.debug(f"Job {job.id} leased to {self.node_id} until {job.lease_expires_at:.0f}")
+        return job
+
+    def heartbeat(self) -> int:
+        """Renew the leases of the jobs this node is running; returns the number renewed."""
+        now = time.time()
+        with self.engine.begin() as connection:
+            result = connection.execute(update(jobs_table).where(
+                jobs_table.c.status == RUNNING,
+                jobs_table.c.lease_owner == self.node_id
+            ).values(lease_expires_at=now + self.lease_seconds, heartbeat_at=now))
+        return result.rowcount
+
+    def release_expired(self) -> int:
+        """Queue again (or fail) running jobs whose lease ran out; returns the number released."""
+        with self.engine.begin() as connection:
+            return self._release_expired(connection, time.time())
+
+    def _claimable(self, query, candidate, now: float):
+        """Restrict a select from the jobs alias candidate to the jobs that may run now, in claim order."""
+        running = jobs_table.alias('running')
+        blocking = jobs_table.alias('blocking')
+        running_for_partner = select(func.count()).select_from(running).where(
+            running.c.partner_id == candidate.c.partner_id,
+            running.c.status == RUNNING
+        ).scalar_subquery()
+        parent_pending = exists().where(
+            blocking.c.partner_id == candidate.c.partner_id,
+            blocking.c.status.in_(ACTIVE_STATUSES),
+            blocking.c.stage < candidate.c.stage
+        )
+        # Shortest job first, with waiting time shrinking a job's effective size
+        effective_size = candidate.c.size_bytes - self.aging_rate * (now - candidate.c.enqueued_at)
+        return query.where(
+            candidate.c.status == QUEUED,
+            candidate.c.available_at <= now,
+            running_for_partner < self.partner_concurrency,
+            ~parent_pending
+        ).order_by(
+            candidate.c.priority.desc(), effective_size.asc(), candidate.c.id.asc()
+        )
+
+    def _claim_skip_locked(self, connection: Connection, now: float) -> Optional[Any]:
+        """Claim on PostgreSQL, skipping candidates other nodes are claiming."""
+        candidate = jobs_table.alias('candidate')
+        row = connection.execute(
+            self._claimable(select(candidate.c.id, candidate.c.partner_id), candidate, now)
+            .limit(1).with_for_update(skip_locked=True, of=candidate)
+        ).first()
+        if row is None:
+            return None
+        # Two nodes may lock different jobs of one partner; the second to get the partner's lock sees the
+        # first's claim (each statement reads what is committed) and backs off if a limit is reached
+        connection.execute(select(func.pg_advisory_xact_lock(func.hashtext(row.partner_id))))
+        still_claimable = self._claimable(select(candidate.c.id), candidate, now).where(candidate.c.id == row.id)
+        if connection.execute(still_claimable).first() is None:
+            return None
+        return connection.execute(
+            self._lease(update(jobs_table).where(jobs_table.c.id == row.id, jobs_table.c.status == QUEUED), now)
+        ).first()
+
+    def _lease(self, statement, now: float):
+        """Complete an UPDATE of a queued job into a claim by this node."""
+        return statement.values(
+            status=RUNNING, attempts=jobs_table.c.attempts + 1, started_at=now, finished_at=None,
+            lease_owner=self.node_id, lease_expires_at=now + self.lease_seconds, heartbeat_at=now
+        ).returning(*jobs_table.c)
+
+    def _release_expired(self, connection: Connection, now: float) -> int:
+        """Queue again running jobs whose lease ran out, or fail those out of attempts."""
+        expired = and_(
+            jobs_table.c.status == RUNNING,
+            # Jobs claimed before leases existed have none
+            or_(jobs_table.c.lease_expires_at.is_(None), jobs_table.c.lease_expires_at < now)
+        )
+        error = func.coalesce('Lease of ' + jobs_table.c.lease_owner + ' expired', 'Lease expired')
+        released = {'last_error': error, 'finished_at': now, 'lease_owner': None, 'lease_expires_at': None}
+        retried = connection.execute(update(jobs_table).where(
+            expired, jobs_table.c.attempts < jobs_table.c.max_attempts
+        ).values(status=QUEUED, available_at=now, **released)).rowcount
+        failed = connection.execute(update(jobs_table).where(expired).values(status=FAILED, **released)).rowcount
+        if retried or failed:
+            logger.warning(f"Released {retried + failed} jobs with expired leases: "
+                           f"{retried} queued again, {failed} failed")
+        return retried + failed
+
+    def complete(self, job: Job, result: Dict[str, Any]):
+        """
+        Mark a job done with its processing result.
+
+        Raises:
+            LeaseLostError: If the job is no longer leased to this node
+        """
+        self._record(job, status=DONE, finished_at=time.time(), last_error=None, run_id=result.get('run_id'),
+                     records_processed=result.get('records_processed', 0))
+
+    def fail(self, job: Job, error: str, run_id: Optional[str] = None) -> bool:
+        """
+        Record a failed attempt of a job.
+
+        Returns:
+            True if the job will be retried, False if it is marked failed
+
+        Raises:
+            LeaseLostError: If the job is no longer leased to this node
+        """
+        now = time.time()
+        retry = job.attempts < job.max_attempts
+        values = {'finished_at': now, 'last_error': error, 'run_id': run_id}
+        if retry:
+            delay = min(self.retry_delay * 2 ** (job.attempts - 1), _MAX_RETRY_DELAY)
+            values.update(status=QUEUED, available_at=now + delay)
+            logger.warning(f"Job {job.id} ({Path(job.file_path).name}) failed, retrying in {delay:.0f}s: {error}")
+        else:
+            values.update(status=FAILED)
+            logger.error(f"Job {job.id} ({Path(job.file_path).name}) failed after {job.attempts} attempts: {error}")
+        self._record(job, **values)
+        return retry
+
+    def _record(self, job: Job, **values: Any):
+        """Record the outcome of a job this node holds the lease of."""
+        with self.engine.begin() as connection:
+            result = connection.execute(update(jobs_table).where(
+                jobs_table.c.id == job.id,
+                jobs_table.c.status == RUNNING,
+                jobs_table.c.lease_owner == self.node_id
+            ).values(lease_owner=None, lease_expires_at=None, **values))
+        if result.rowcount == 0:
+            raise LeaseLostError(f"Job {job.id} is no longer leased to {self.node_id}")
+
+    def requeue(self, job_ids: Optional[List[int]] = None, statuses: Tuple[str, ...] = (FAILED,)) -> int:
+        """
+        Queue jobs again with a fresh set of attempts.
+
+        Args:
+            job_ids: Jobs to requeue (all jobs in the given statuses if omitted)
+            statuses: Statuses of the jobs to requeue; include RUNNING to
+                recover jobs of a drain that died (only jobs whose lease ran
+                out, so a job another node is running is never run twice)
+
+        Returns:
+            Number of jobs requeued
+        """
+        now = time.time()
+        active = jobs_table.alias('active')
+        conditions = [
+            jobs_table.c.status.in_(statuses),
+            or_(jobs_table.c.status != RUNNING, jobs_table.c.lease_expires_at.is_(None),
+                jobs_table.c.lease_expires_at < now),
+            # A file queued again since keeps its newer job
+            ~exists().where(
+                active.c.partner_id == jobs_table.c.partner_id,
+                active.c.file_path == jobs_table.c.file_path,
+                active.c.status.in_(ACTIVE_STATUSES),
+                active.c.id != jobs_table.c.id
+            )
+        ]
+        if job_ids is not None:
+            conditions.append(jobs_table.c.id.in_(job_ids))
+        with self.engine.begin() as connection:
+            result = connection.execute(update(jobs_table).where(*conditions).values(
+                status=QUEUED, attempts=0, available_at=now, finished_at=None,
+                lease_owner=None, lease_expires_at=None
+            ))
+        return result.rowcount
+
+    def jobs(self, status: Optional[str] = None, partner_id: Optional[str] = None,
+             limit: Optional[int] = None) -> List[Job]:
+        """Jobs in claim order of status, priority and age, optionally filtered."""
+        query = select(jobs_table).order_by(
+            jobs_table.c.status, jobs_table.c.priority.desc(), jobs_table.c.enqueued_at, jobs_table.c.id
+        )
+        if status is not None:
+            query = query.where(jobs_table.c.status == status)
+        if partner_id is not None:
+            query = query.where(jobs_table.c.partner_id == partner_id)
+        if limit is not None:
+            query = query.limit(limit)
+        with self.engine.connect() as connection:
+            return [Job.from_row(row) for row in connection.execute(query)]
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """Number of jobs per partner and status."""
+        query = select(jobs_table.c.partner_id, jobs_table.c.status, func.count()).group_by(
+            jobs_table.c.partner_id, jobs_table.c.status
+        )
+        counts: Dict[str, Dict[str, int]] = {}
+        with self.engine.connect() as connection:
+            for partner_id, status, count in connection.execute(query):
+                counts.setdefault(partner_id, {})[status] = count
+        return counts
+
+    def next_available_at(self) -> Optional[float]:
+        """Earliest time a queued job becomes due, or None if nothing is queued."""
+        with self.engine.connect() as connection:
+            return connection.execute(
+                select(func.min(jobs_table.c.available_at)).where(jobs_table.c.status == QUEUED)
+            ).scalar()
+
+    def drain(self, process: Callable[[Job], Dict[str, Any]], workers: int = 2,
+              stop: Optional[threading.Event] = None, wait_for_retries: bool = True,
+              poll_interval: float = 1.0, on_result: Optional[Callable[[Job, Dict[str, Any]], None]] = None
+              ) -> DrainStats:
+        """
+        Run jobs until the queue is empty.
+
+        Leases of the running jobs are renewed by a heartbeat thread. Jobs
+        blocked by jobs running on other nodes are waited for; they run once
+        those finish or their leases expire.
+
+        Args:
+            process: Processes a job and returns its processing result
+            workers: Jobs run at once
+            stop: Event ending the drain once the jobs running are finished
+            wait_for_retries: Wait for jobs whose retry is not yet due (otherwise stop when
+                no job is due)
+            poll_interval: Longest sleep between checks for due jobs
+            on_result: Called with every job and its processing result
+
+        Returns:
+            Counters of the drain
+        """
+        stop = stop or threading.Event()
+        stats = DrainStats()
+        in_flight: Dict[Future, Job] = {}
+        heartbeat_stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(heartbeat_stop,), name='queue-heartbeat',
+                                     daemon=True)
+        heartbeat.start()
+        try:
+            self._drain(process, workers, stop, wait_for_retries, poll_interval, on_result, stats, in_flight)
+        finally:
+            heartbeat_stop.set()
+            heartbeat.join()
+        return stats
+
+    def _drain(self, process: Callable[[Job], Dict[str, Any]], workers: int, stop: threading.Event,
+               wait_for_retries: bool, poll_interval: float,
+               on_result: Optional[Callable[[Job, Dict[str, Any]], None]], stats: DrainStats,
+               in_flight: Dict[Future, Job]):
+        """Claim and run jobs until none is left for this node."""
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='queue') as pool:
+            while True:
+                while not stop.is_set() and len(in_flight) < workers:
+                    job = self.claim()
+                    if job is None:
+                        break
+                    logger.info(f"Running job {job.id}: {job.partner_id} {Path(job.file_path).name} "
+                                f"(attempt {job.attempts} of {job.max_attempts})")
+                    in_flight[pool.submit(process, job)] = job
+
+                if in_flight:
+                    done, _ = wait(list(in_flight), timeout=poll_interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._finish(in_flight.pop(future), future, stats, on_result)
+                    continue
+
+                next_due = self.next_available_at()
+                if stop.is_set() or next_due is None:
+                    break
+                # Jobs already due wait for running jobs of their partner on other nodes
+                delay = next_due - time.time()
+                if not wait_for_retries:
+                    if delay <= 0:
+                        logger.info("Queued jobs are waiting for jobs running on other nodes")
+                    break
+                stop.wait(min(poll_interval, delay) if delay > 0 else poll_interval)
+
+    def _heartbeat_loop(self, stop: threading.Event):
+        """Renew the leases of this node's running jobs until stopped."""
+        while not stop.wait(self.heartbeat_interval):
+            try:
+                self.heartbeat()
+            except Exception as e:
+                # A missed heartbeat is retried; the lease only lapses after lease_seconds
+                logger.warning(f"Could not renew job leases of {self.node_id}: {e}")
+
+    def _finish(self, job: Job, future: Future, stats: DrainStats,
+                on_result: Optional[Callable[[Job, Dict[str, Any]], None]]):
+        """Record the outcome of a job."""
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {'partner_id': job.partner_id, 'success': False, 'records_processed': 0,
+                      'errors': [str(e)], 'warnings': []}
+        stats.records_processed += result.get('records_processed', 0)
+        try:
+            if result['success']:
+                self.complete(job, result)
+                stats.succeeded += 1
+            elif self.fail(job, '; '.join(result['errors']) or 'Processing failed', result.get('run_id')):
+                stats.retried += 1
+            else:
+                stats.failed += 1
+        except LeaseLostError as e:
+            logger.error(f"{e}; its result was not recorded (raise the lease time if this node was alive)")
+            stats.lost += 1
+        stats.results.append(result)
+        if on_result is not None:
+            on_result(job, result)
+
+
+def _configure_sqlite(engine: Engine):
+    """Let concurrent drains share a SQLite queue file."""
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        # Transactions are begun below instead of by the driver
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA busy_timeout=30000')
+        cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def begin_immediate(connection):
+        # Take the write lock up front: a claim reading a snapshot another process changes before
+        # its write would fail instead of waiting for the lock
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+def _upgrade_schema(engine: Engine):
+    """Add the columns and indexes of newer versions to a jobs table created by an older one."""
+    existing = {column['name'] for column in inspect(engine).get_columns(jobs_table.name)}
+    missing = [column for column in jobs_table.columns if column.name not in existing]
+    if missing:
+        with engine.begin() as connection:
+            for column in missing:
+                connection.execute(text(
+                    f"ALTER TABLE {jobs_table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+                ))
+        logger.info(f"Added columns {[column.name for column in missing]} to {jobs_table.name}")
+    for index in jobs_table.indexes:
+        index.create(engine, checkfirst=True)
@@ -0,0 +1,259 @@
+"""Memory-budget planning: decide how each data file is read before reading it."""
+
+import posixpath
+import re
+import tempfile
+import zipfile
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from xml.etree import ElementTree
+
+from loguru import logger
+
+from ..interfaces.parser_interface import IFileParser
+from ..transformers.external import is_whole_frame
+
+# Processing modes
+WHOLE = 'whole'
+CHUNKED = 'chunked'
+SPILL = 'spill'
+
+# Files the parsers can stream in chunks
+_STREAMING_SUFFIXES = frozenset({'.csv', '.xlsx', '.xlsm'})
+
+# Decoded bytes per file byte assumed when nothing can be sampled (e.g. .xls)
+_DEFAULT_EXPANSION = 4.0
+
+# Bytes read from the head of a CSV to measure its line length
+_CSV_HEAD_BYTES = 1 << 20
+
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PACKAGE_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+_CELL_REF = re.compile(r'([A-Z]+)(\d+)')
+
+
+def format_memory_size(size: float) -> str:
+    """Format a byte count for logs."""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(size) < 1024:
+            return f"{size:.0f}{unit}" if unit == 'B' else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}TB"
+
+
+def xlsx_sheet_dimensions(file_path: Path) -> Dict[str, Tuple[int, int]]:
+    """
+    Read each worksheet's used range (rows, columns) without loading any cells.
+
+    The range comes from the <dimension> element at the top of the sheet XML,
+    so only a few hundred bytes of each sheet are decompressed. Sheets whose
+    writer omitted the element are left out.
+    """
+    dimensions = {}
+    with zipfile.ZipFile(file_path) as archive:
+        workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+        rels = ElementTree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+        targets = {rel.get('Id'): rel.get('Target') for rel in rels.iter(f'{_PACKAGE_REL_NS}Relationship')}
+        for sheet in workbook.iter(f'{_MAIN_NS}sheet'):
+            target = targets.get(sheet.get(f'{_REL_NS}id'))
+            if not target:
+                continue
+            member = target.lstrip('/') if target.startswith('/') else posixpath.normpath(f'xl/{target}')
+            try:
+                with archive.open(member) as stream:
+                    ref = _read_dimension(stream)
+            except KeyError:
+                continue
+            if ref:
+                dimensions[sheet.get('name')] = ref
+    return dimensions
+
+
+def _read_dimension(stream) -> Optional[Tuple[int, int]]:
+    """Parse the dimension ref of a sheet XML stream, stopping before the cell data."""
+    for _, element in ElementTree.iterparse(stream, events=('start',)):
+        if element.tag == f'{_MAIN_NS}dimension':
+            cells = _CELL_REF.findall(element.get('ref', ''))
+            if len(cells) == 2:
+                (first_col, first_row), (last_col, last_row) = cells
+                return (int(last_row) - int(first_row) + 1,
+                        _column_number(last_col) - _column_number(first_col) + 1)
+            return None
+        if element.tag == f'{_MAIN_NS}sheetData':
+            return None
+    return None
+
+
+def _column_number(letters: str) -> int:
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord('A') + 1
+    return number
+
+
+@dataclass(frozen=True)
+class FilePlan:
+    """
+    How a file will be read.
+
+    Attributes:
+        file_path: Planned file
+        mode: whole (one frame per sheet), chunked (streamed in chunks) or
+            spill (streamed chunks whose sort/remove_duplicates run out of core)
+        estimated_bytes: Estimated decoded size of the configured sheets
+        budget_bytes: Memory available to this file
+        rows: Estimated data rows
+        row_bytes: Sampled decoded bytes per row
+        chunk_rows: Rows per chunk in chunked and spill mode
+        reason: Why the mode was chosen
+    """
+    file_path: str
+    mode: str
+    estimated_bytes: int
+    budget_bytes: int
+    rows: Optional[int] = None
+    row_bytes: Optional[float] = None
+    chunk_rows: Optional[int] = None
+    reason: str = ''
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def describe(self) -> str:
+        chunks = f", {self.chunk_rows} rows per chunk" if self.chunk_rows else ''
+        return (f"{Path(self.file_path).name}: {self.mode} (estimated {format_memory_size(self.estimated_bytes)} "
+                f"for budget {format_memory_size(self.budget_bytes)}{chunks}; {self.reason})")
+
+
+class MemoryPlanner:
+    """
+    Chooses whole-frame, chunked or spill processing for each file from a memory budget.
+
+    The decoded size of a file is estimated before it is read: rows come
+    from the xlsx sheet dimensions (or, for CSV, the file size divided by the
+    average line length of its head) and the width of a row from a parsed
+    sample of each configured sheet, in the configured string storage. The
+    working set of a frame (source, transformed copy and validation masks) is
+    taken as working_set_factor times its decoded size, and the budget is
+    shared by every file the pipeline can hold at once.
+    """
+
+    def __init__(self, budget_bytes: int, files_in_flight: int = 1, working_set_factor: float = 3.0,
+                 sample_rows: int = 500, min_chunk_rows: int = 1000, spill_dir: Optional[str] = None):
+        """
+        Initialize memory planner.
+
+        Args:
+            budget_bytes: Memory available to processing
+            files_in_flight: Files (or chunks) the pipeline holds at once
+            working_set_factor: Peak memory of processing a frame relative to its decoded size
+            sample_rows: Rows parsed from each sheet to measure row width
+            min_chunk_rows: Smallest chunk used however tight the budget
+            spill_dir: Directory for spilled chunks (temp directory if unset)
+        """
+        self.budget_bytes = budget_bytes
+        self.files_in_flight = max(1, files_in_flight)
+        self.working_set_factor = working_set_factor
+        self.sample_rows = sample_rows
+        self.min_chunk_rows = min_chunk_rows
+        self.spill_dir = Path(spill_dir) if spill_dir else Path(tempfile.gettempdir())
+
+    @property
+    def file_budget(self) -> int:
+        """Memory available to one file."""
+        return self.budget_bytes // self.files_in_flight
+
+    def plan(self, file_path: Path, parser: IFileParser, source_config: Dict[str, Any]) -> FilePlan:
+        """
+        Plan how a file is read.
+
+        Args:
+            file_path: File to plan
+            parser: Parser that will read the file
+            source_config: Partner source configuration
+
+        Returns:
+            Plan for the file
+        """
+        rows, row_bytes, estimated = self._estimate(file_path, parser, source_config)
+        budget = self.file_budget
+        working_set = estimated * self.working_set_factor
+        base = dict(file_path=str(file_path), estimated_bytes=int(estimated), budget_bytes=budget,
+                    rows=rows, row_bytes=row_bytes)
+
+        if working_set <= budget:
+            return FilePlan(mode=WHOLE, reason='fits in budget', **base)
+        if file_path.suffix.lower() not in _STREAMING_SUFFIXES:
+            return FilePlan(mode=WHOLE, reason=f'over budget but {file_path.suffix} files cannot be streamed',
+                            **base)
+
+        per_row = (row_bytes or 1.0) * self.working_set_factor
+        chunk_rows = max(self.min_chunk_rows, int(budget // per_row))
+        global_transforms = self._whole_frame_transforms(source_config)
+        if global_transforms:
+            return FilePlan(mode=SPILL, chunk_rows=chunk_rows,
+                            reason=f"over budget with whole-frame transforms ({', '.join(global_transforms)})",
+                            **base)
+        return FilePlan(mode=CHUNKED, chunk_rows=chunk_rows, reason='over budget', **base)
+
+    def _estimate(self, file_path: Path, parser: IFileParser,
+                  source_config: Dict[str, Any]) -> Tuple[Optional[int], Optional[float], float]:
+        """Estimate (rows, bytes per row, decoded bytes) of the configured sheets."""
+        file_size = file_path.stat().st_size
+        suffix = file_path.suffix.lower()
+        if suffix not in _STREAMING_SUFFIXES:
+            return None, None, file_size * _DEFAULT_EXPANSION
+
+        row_bytes = self._sample_row_bytes(file_path, parser, source_config)
+        if suffix == '.csv':
+            rows = self._csv_rows(file_path, file_size)
+            width = max(row_bytes.values(), default=0.0)
+            if not width:
+                return rows, None, file_size * _DEFAULT_EXPANSION
+            return rows, width, rows * width
+
+        dimensions = xlsx_sheet_dimensions(file_path)
+        rows = 0
+        estimated = 0.0
+        for sheet_name, width in row_bytes.items():
+            sheet_rows = dimensions.get(sheet_name, (0, 0))[0]
+            rows += sheet_rows
+            estimated += sheet_rows * width
+        if not estimated:
+            return None, None, file_size * _DEFAULT_EXPANSION
+        return rows, estimated / rows, estimated
+
+    def _sample_row_bytes(self, file_path: Path, parser: IFileParser,
+                          source_config: Dict[str, Any]) -> Dict[str, float]:
+        """Decoded bytes per row of the first sample_rows rows of every configured sheet."""
+        row_bytes: Dict[str, float] = {}
+        sheet_configs = source_config.get('sheets_config', [])
+        sheet_names = list(dict.fromkeys(sheet_config['sheet_name'] for sheet_config in sheet_configs))
+        for sheet_name in sheet_names:
+            sheet_source_config = {
+                **source_config,
+                'sheets_config': [sc for sc in sheet_configs if sc['sheet_name'] == sheet_name]
+            }
+            try:
+                for name, sample in parser.iter_chunks(file_path, sheet_source_config, self.sample_rows):
+                    if len(sample):
+                        row_bytes[name] = float(sample.memory_usage(deep=True).sum()) / len(sample)
+                    break
+            except Exception as e:
+                logger.debug(f"Could not sample sheet '{sheet_name}' of {file_path}: {e}")
+        return row_bytes
+
+    def _csv_rows(self, file_path: Path, file_size: int) -> int:
+        """Estimate CSV rows from the average line length of the head of the file."""
+        with open(file_path, 'rb') as stream:
+            head = stream.read(_CSV_HEAD_BYTES)
+        lines = max(head.count(b'\n'), 1)
+        return max(int(file_size / (len(head) / lines)), 1)
+
+    def _whole_frame_transforms(self, source_config: Dict[str, Any]) -> List[str]:
+        """Configured global transformations that need a whole sheet at once."""
+        types = [transform['type'] for transform in source_config.get('global_transformations', [])
+                 if is_whole_frame(transform)]
+        return list(dict.fromkeys(types))
@@ -0,0 +1,274 @@
+"""Staged concurrent pipeline with bounded hand-off between stages."""
+
+import heapq
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence
+
+from loguru import logger
+
+# Marker returned by a channel once it is closed and drained
+_DONE = object()
+
+# Seconds between cancellation checks while blocked
+_POLL_INTERVAL = 0.1
+
+
+class PipelineCancelled(Exception):
+    """Raised when a pipeline run is cancelled before completion."""
+
+
+@dataclass
+class PipelineStage:
+    """
+    One stage of a pipeline.
+
+    Attributes:
+        name: Stage name used in logs and errors
+        func: Function applied to every item; its return value is passed on
+        workers: Number of threads running the stage
+        ordered: Deliver items to this stage in input order (e.g. to load
+            parent tables before child tables)
+        group: Key of an item's group in an ordered stage; an item starts only
+            once every earlier item of another group has finished, so workers
+            overlap items of one group but never an item and its predecessors
+            (e.g. chunks of one file, but not a child file and its parent)
+    """
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+    ordered: bool = False
+    group: Optional[Callable[[Any], Hashable]] = None
+
+
+class _Channel:
+    """Bounded buffer between two stages, optionally releasing items in sequence order."""
+
+    def __init__(self, maxsize: int, ordered: bool, cancelled: threading.Event):
+        self._maxsize = max(1, maxsize)
+        self._ordered = ordered
+        self._cancelled = cancelled
+        self._condition = threading.Condition()
+        self._items: Any = [] if ordered else deque()
+        self._next_seq = 0
+        self._closed = False
+
+    def put(self, seq: int, item: Any):
+        """Add an item, blocking while the buffer is full."""
+        with self._condition:
+            # The next expected item of an ordered channel is always admitted,
+            # otherwise a full buffer of later items would never drain
+            while len(self._items) >= self._maxsize and not (self._ordered and seq == self._next_seq):
+                self._check_cancelled()
+                self._condition.wait(_POLL_INTERVAL)
+            self._check_cancelled()
+            if self._ordered:
+                heapq.heappush(self._items, (seq, item))
+            else:
+                self._items.append((seq, item))
+            self._condition.notify_all()
+
+    def get(self) -> Any:
+        """Take the next item, or _DONE once the channel is closed and drained."""
+        with self._condition:
+            while True:
+                self._check_cancelled()
+                if self._items and (not self._ordered or self._items[0][0] == self._next_seq):
+                    if self._ordered:
+                        entry = heapq.heappop(self._items)
+                        self._next_seq += 1
+                    else:
+                        entry = self._items.popleft()
+                    self._condition.notify_all()
+                    return entry
+                if self._closed and not self._items:
+                    return _DONE
+                self._condition.wait(_POLL_INTERVAL)
+
+    def close(self):
+        """Signal that no more items will be put."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def _check_cancelled(self):
+        if self._cancelled.is_set():
+            raise PipelineCancelled()
+
+
+class _GroupBarrier:
+    """Holds back items of an ordered stage until the earlier items of other groups have finished."""
+
+    def __init__(self, cancelled: threading.Event):
+        self._cancelled = cancelled
+        self._condition = threading.Condition()
+        self._next_seq = 0
+        # seq -> group of the items started and not yet finished
+        self._running: Dict[int, Hashable] = {}
+
+    def enter(self, seq: int, group: Hashable):
+        """Wait until the item may start."""
+        with self._condition:
+            # Register in sequence order, so no earlier item can be missed
+            while self._next_seq != seq:
+                self._wait()
+            self._next_seq += 1
+            self._running[seq] = group
+            self._condition.notify_all()
+            while any(other < seq and other_group != group for other, other_group in self._running.items()):
+                self._wait()
+
+    def leave(self, seq: int):
+        """Mark the item as finished."""
+        with self._condition:
+            self._running.pop(seq, None)
+            self._condition.notify_all()
+
+    def _wait(self):
+        if self._cancelled.is_set():
+            raise PipelineCancelled()
+        self._condition.wait(_POLL_INTERVAL)
+
+
+class PipelineExecutor:
+    """
+    Runs items through a sequence of stages, each in its own worker threads.
+
+    Stages are connected by bounded channels, so a fast stage blocks instead
+    of buffering unboundedly ahead of a slow one (backpressure) and at most
+    about queue_size items per stage plus one per worker are in flight. The
+    first exception raised by any stage cancels the run and is re-raised by
+    run(); cancel() stops a run from another thread.
+    """
+
+    def __init__(self, stages: Sequence[PipelineStage], queue_size: int = 2):
+        """
+        Initialize pipeline executor.
+
+        Args:
+            stages: Stages in processing order
+            queue_size: Capacity of each channel between stages
+        """
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        for stage in stages:
+            if stage.group is not None and not stage.ordered:
+                raise ValueError(f"Stage '{stage.name}' groups items, so it must be ordered")
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self._cancelled = threading.Event()
+        self._error_lock = threading.Lock()
+        self._error: Optional[BaseException] = None
+        self._error_stage: Optional[str] = None
+
+    def run(self, items: Iterable[Any]) -> List[Any]:
+        """
+        Run items through all stages.
+
+        Args:
+            items: Input items; consumed lazily as the first stage has capacity
+
+        Returns:
+            Output of the last stage for each item, in input order
+        """
+        self._cancelled.clear()
+        self._error = None
+        self._error_stage = None
+
+        channels = [_Channel(self.queue_size, stage.ordered, self._cancelled) for stage in self.stages]
+        output = _Channel(self.queue_size, False, self._cancelled)
+        channels.append(output)
+
+        threads = [threading.Thread(target=self._feed, args=(items, channels[0]), name="pipeline-feed", daemon=True)]
+        for index, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            lock = threading.Lock()
+            barrier = _GroupBarrier(self._cancelled) if stage.group is not None else None
+            for worker in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._work,
+                    args=(stage, channels[index], channels[index + 1], remaining, lock, barrier),
+                    name=f"pipeline-{stage.name}-{worker}",
+                    daemon=True
+                ))
+        for thread in threads:
+            thread.start()
+
+        results: Dict[int, Any] = {}
+        try:
+            while True:
+                entry = output.get()
+                if entry is _DONE:
+                    break
+                seq, result = entry
+                results[seq] = result
+        except PipelineCancelled:
+            pass
+        except BaseException:
+            # e.g. KeyboardInterrupt in the calling thread
+            self.cancel()
+            raise
+        finally:
+            for thread in threads:
+                thread.join()
+
+        if self._error is not None:
+            raise self._error
+        if self._cancelled.is_set():
+            raise PipelineCancelled()
+        return [results[seq] for seq in sorted(results)]
+
+    def cancel(self):
+        """Stop the current run; blocked workers notice within a poll interval."""
+        self._cancelled.set()
+
+    def _feed(self, items: Iterable[Any], channel: _Channel):
+        """Put input items into the first channel."""
+        try:
+            for seq, item in enumerate(items):
+                channel.put(seq, item)
+        except PipelineCancelled:
+            return
+        except BaseException as e:
+            self._fail("input", e)
+            return
+        channel.close()
+
+    def _work(self, stage: PipelineStage, source: _Channel, target: _Channel, remaining: List[int],
+              lock: threading.Lock, barrier: Optional[_GroupBarrier] = None):
+        """Worker loop of a stage; the last worker to finish closes the next channel."""
+        try:
+            while True:
+                entry = source.get()
+                if entry is _DONE:
+                    break
+                seq, item = entry
+                if barrier is None:
+                    target.put(seq, stage.func(item))
+                    continue
+                barrier.enter(seq, stage.group(item))
+                try:
+                    result = stage.func(item)
+                finally:
+                    barrier.leave(seq)
+                target.put(seq, result)
+        except PipelineCancelled:
+            return
+        except BaseException as e:
+            self._fail(stage.name, e)
+            return
+
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                target.close()
+
+    def _fail(self, stage_name: str, error: BaseException):
+        """Record the first error and cancel the run."""
+        with self._error_lock:
+            if self._error is None:
+                self._error = error
+                self._error_stage = stage_name
+                logger.error(f"Pipeline stage '{stage_name}' failed: {error}")
+        self._cancelled.set()
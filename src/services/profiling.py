@@ -0,0 +1,271 @@
+"""On-demand CPU and memory profiling of CLI commands."""
+
+import cProfile
+import json
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from .instrumentation import ACTIVE_STAGES, RunMetrics, StageRecord, summarize
+
+DETERMINISTIC = 'deterministic'
+SAMPLING = 'sampling'
+MODES = (DETERMINISTIC, SAMPLING)
+
+# (file, first line, function), the key pstats uses
+_FunctionKey = Tuple[str, int, str]
+
+# From 3.12 cProfile is built on sys.monitoring, which allows one active profiler per interpreter
+_PER_THREAD_PROFILERS = sys.version_info < (3, 12)
+
+
+class Profiler:
+    """
+    Profiles a command and writes where its time and memory went.
+
+    The deterministic mode runs cProfile in the thread that starts the
+    profiler and in every thread started while it runs (the pipeline's
+    reader, transform and loader threads), and merges their statistics.
+    The sampling mode instead walks the stack of every thread each
+    sample_interval seconds; its overhead does not grow with the number of
+    function calls, and each sample is attributed to the pipeline stage its
+    thread is in, so it also ranks the hotspots of every stage. Neither mode
+    sees inside reader processes, whose time shows up in the read stage.
+    From Python 3.12 only one cProfile profiler can be active at a time, so
+    the deterministic mode falls back to sampling there.
+
+    While profiling, the stage timings of every processing run are recorded
+    (whether or not instrumentation is enabled), so the report breaks the
+    command's time down per stage and per file. With memory profiling,
+    tracemalloc traces allocations and the report lists the top allocation
+    sites still holding memory when the command ends, and the traced peak.
+    """
+
+    def __init__(self, profile_path: str = "profiles", mode: str = DETERMINISTIC, memory: bool = False,
+                 top: int = 20, sample_interval: float = 0.005, memory_frames: int = 1):
+        """
+        Initialize profiler.
+
+        Args:
+            profile_path: Directory of the profile reports
+            mode: deterministic (cProfile) or sampling
+            memory: Trace allocations with tracemalloc
+            top: Hotspots and allocation sites reported
+            sample_interval: Seconds between stack samples (sampling mode)
+            memory_frames: Frames of traceback stored per allocation
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode {mode!r}; expected one of {', '.join(MODES)}")
+        if mode == DETERMINISTIC and not _PER_THREAD_PROFILERS:
+            logger.warning("Deterministic profiling of every thread needs Python < 3.12; sampling instead")
+            mode = SAMPLING
+        self.profile_path = Path(profile_path)
+        self.mode = mode
+        self.memory = memory
+        self.top = top
+        self.sample_interval = sample_interval
+        self.memory_frames = memory_frames
+        self.records: List[StageRecord] = []
+        self._lock = threading.Lock()
+        self._profiles: List[cProfile.Profile] = []
+        self._self_seconds: Dict[_FunctionKey, float] = defaultdict(float)
+        self._total_seconds: Dict[_FunctionKey, float] = defaultdict(float)
+        self._stage_seconds: Dict[str, Dict[_FunctionKey, float]] = defaultdict(lambda: defaultdict(float))
+        self._samples = 0
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._traced_peak: Optional[int] = None
+        self._started_at: Optional[float] = None
+        self._start = 0.0
+        self._seconds = 0.0
+
+    def start(self):
+        """Start profiling."""
+        if self.memory:
+            tracemalloc.start(self.memory_frames)
+        self._started_at = time.time()
+        self._start = time.perf_counter()
+        if self.mode == DETERMINISTIC:
+            threading.setprofile(self._profile_thread)
+            self._profile_thread()
+        else:
+            self._sampler = threading.Thread(target=self._sample_loop, name='profiler', daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        """Stop profiling and take the allocation snapshot."""
+        self._seconds = time.perf_counter() - self._start
+        if self.mode == DETERMINISTIC:
+            threading.setprofile(None)
+            for profile in self._profiles:
+                profile.disable()
+        else:
+            self._stop.set()
+            self._sampler.join()
+        if self.memory:
+            self._snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+            ])
+            self._traced_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    def add_run(self, metrics: RunMetrics):
+        """Keep the stage records of a finished processing run (an instrumentation listener)."""
+        with self._lock:
+            self.records.extend(metrics.records)
+
+    def hotspots(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Functions ranked by the time spent in their own code."""
+        limit = limit or self.top
+        if self.mode == DETERMINISTIC:
+            stats = self._stats()
+            if stats is None:
+                return []
+            ranked = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+            return [{'function': _describe(key), 'calls': calls, 'self_seconds': self_seconds,
+                     'total_seconds': total_seconds}
+                    for key, (_, calls, self_seconds, total_seconds, _) in ranked[:limit]]
+        ranked = sorted(self._self_seconds.items(), key=lambda item: item[1], reverse=True)
+        return [{'function': _describe(key), 'calls': None, 'self_seconds': self_seconds,
+                 'total_seconds': self._total_seconds[key]}
+                for key, self_seconds in ranked[:limit]]
+
+    def allocations(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Source lines holding the most traced memory when profiling stopped."""
+        if self._snapshot is None:
+            return []
+        return [{'site': f"{_short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                 'size_bytes': stat.size, 'count': stat.count}
+                for stat in self._snapshot.statistics('lineno')[:limit or self.top]]
+
+    def report(self, command: str) -> Dict[str, Any]:
+        """Profile report: time per stage and per file, hotspots and allocation sites."""
+        with self._lock:
+            records = list(self.records)
+        files: Dict[str, List[StageRecord]] = defaultdict(list)
+        for record in records:
+            files[f"{record.partner_id}/{record.file}"].append(record)
+        per_file = {
+            name: {'seconds': sum(record.seconds for record in file_records), 'stages': summarize(file_records)}
+            for name, file_records in files.items()
+        }
+        report = {
+            'command': command,
+            'mode': self.mode,
+            'started_at': self._started_at,
+            'seconds': self._seconds,
+            'stages': summarize(records),
+            'files': dict(sorted(per_file.items(), key=lambda item: item[1]['seconds'], reverse=True)),
+            'hotspots': self.hotspots(),
+        }
+        if self.mode == SAMPLING:
+            report['samples'] = self._samples
+            report['stage_hotspots'] = {
+                stage: [{'function': _describe(key), 'self_seconds': seconds}
+                        for key, seconds in sorted(functions.items(), key=lambda item: item[1],
+                                                   reverse=True)[:self.top]]
+                for stage, functions in self._stage_seconds.items()
+            }
+        if self.memory:
+            report['traced_peak_bytes'] = self._traced_peak
+            report['allocations'] = self.allocations()
+        return report
+
+    def write(self, command: str) -> Tuple[Path, Dict[str, Any]]:
+        """
+        Write the profile report of a stopped profiler.
+
+        The JSON report goes to profile_path/<timestamp>-<command>.json; in the
+        deterministic mode the merged cProfile statistics are dumped next to
+        it (.prof), for pstats or snakeviz.
+
+        Returns:
+            Path of the JSON report and the report
+        """
+        report = self.report(command)
+        self.profile_path.mkdir(parents=True, exist_ok=True)
+        stem = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{command}"
+        report_path = self.profile_path / f"{stem}.json"
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, default=str)
+        stats = self._stats() if self.mode == DETERMINISTIC else None
+        if stats is not None:
+            stats.dump_stats(self.profile_path / f"{stem}.prof")
+        logger.info(f"Profile of {command} written to {report_path}")
+        return report_path, report
+
+    def _profile_thread(self, *args):
+        """Start a cProfile profiler in the calling thread (the profile hook of new threads)."""
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+
+    def _stats(self) -> Optional[pstats.Stats]:
+        """cProfile statistics merged across threads."""
+        profiles = [profile for profile in self._profiles if profile.getstats()]
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+    def _sample_loop(self):
+        """Sample the stacks of all other threads until stopped."""
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.sample_interval):
+            now = time.perf_counter()
+            # Weigh each sample by the time since the last one; the interval is only approximate
+            weight, last = now - last, now
+            self._samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                leaf = _function_key(frame)
+                self._self_seconds[leaf] += weight
+                record = ACTIVE_STAGES.get(thread_id)
+                if record is not None:
+                    self._stage_seconds[record.stage][leaf] += weight
+                # Recursive functions count once per stack
+                on_stack = set()
+                while frame is not None:
+                    on_stack.add(_function_key(frame))
+                    frame = frame.f_back
+                for key in on_stack:
+                    self._total_seconds[key] += weight
+
+
+def _function_key(frame) -> _FunctionKey:
+    code = frame.f_code
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+
+def _describe(key: _FunctionKey) -> str:
+    """Readable name of a function key; built-ins have no file."""
+    filename, line, name = key
+    if filename == '~':
+        return name
+    return f"{name} ({_short_path(filename)}:{line})"
+
+
+def _short_path(filename: str) -> str:
+    """Path relative to the working directory or site-packages, when it is under either."""
+    if 'site-packages' in filename:
+        return filename.split('site-packages', 1)[1].lstrip('/\\')
+    try:
+        return str(Path(filename).resolve().relative_to(Path.cwd()))
+    except ValueError:
+        return filename
@@ -0,0 +1,225 @@
+"""Reject quarantine for rows that cannot be loaded."""
+
+import threading
+import uuid
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+# Metadata columns stored alongside the original source values
+PARTNER_ID = '_partner_id'
+SOURCE_FILE = '_source_file'
+SHEET_NAME = '_sheet_name'
+TARGET_TABLE = '_target_table'
+SOURCE_ROW = '_source_row'
+REJECT_REASON = '_reject_reason'
+REJECT_DETAIL = '_reject_detail'
+# Added on load: name of the reject file a row was read from
+REJECT_FILE = '_reject_file'
+
+METADATA_COLUMNS = [PARTNER_ID, SOURCE_FILE, SHEET_NAME, TARGET_TABLE, SOURCE_ROW, REJECT_REASON, REJECT_DETAIL,
+                    REJECT_FILE]
+
+# Suffix of the marker a replayed reject file gets; it holds the replay run ID
+REPLAYED_SUFFIX = '.replayed'
+
+
+class RejectReason(str, Enum):
+    """Reason codes for rejected rows."""
+    VALIDATION = "validation"
+    TYPE_COERCION = "type_coercion"
+    FOREIGN_KEY = "foreign_key"
+    DATABASE = "database"
+
+
+class RowRejections:
+    """Accumulates reject reasons for the rows of one frame, vectorized."""
+
+    def __init__(self, index: pd.Index):
+        """Initialize with the index of the frame being checked."""
+        self.index = index
+        self.reason = np.full(len(index), None, dtype=object)
+        self.detail = np.full(len(index), '', dtype=object)
+
+    def add(self, mask: Any, reason: RejectReason, code: str):
+        """
+        Mark rows as rejected.
+
+        Args:
+            mask: Boolean mask (array or Series aligned with the index)
+            reason: Reason code; the first reason recorded for a row is kept
+            code: Detail code appended to the row's detail (e.g. rule id)
+        """
+        if isinstance(mask, pd.Series):
+            mask = mask.reindex(self.index, fill_value=False)
+        mask = np.asarray(mask, dtype=bool)
+        if not mask.any():
+            return
+        self.reason[mask & (self.reason == None)] = reason.value  # noqa: E711
+        self.detail[mask] = self.detail[mask] + (code + ';')
+
+    def add_rows(self, labels: pd.Index, reason: RejectReason, codes: Any):
+        """
+        Mark rows as rejected by index label, each with its own detail code.
+
+        Args:
+            labels: Index labels of the rejected rows
+            reason: Reason code; the first reason recorded for a row is kept
+            codes: Detail codes, one per label (e.g. database error messages)
+        """
+        if len(labels) == 0:
+            return
+        positions = self.index.get_indexer(labels)
+        codes = np.asarray(codes, dtype=object)
+        unset = positions[self.reason[positions] == None]  # noqa: E711
+        self.reason[unset] = reason.value
+        self.detail[positions] = self.detail[positions] + codes + ';'
+
+    def discard_outside(self, start: int, end: Optional[int] = None):
+        """Forget the reasons of rows whose index is outside [start, end) (e.g. already quarantined)."""
+        index = np.asarray(self.index)
+        outside = (index < start) if end is None else (index < start) | (index >= end)
+        self.reason[outside] = None
+        self.detail[outside] = ''
+
+    @property
+    def mask(self) -> np.ndarray:
+        """Rows with at least one reject reason."""
+        return self.reason != None  # noqa: E711
+
+    def __len__(self) -> int:
+        return int(self.mask.sum())
+
+
+class RejectService:
+    """Service writing rejected rows to per-run columnar files and reading them back."""
+
+    def __init__(self, rejects_path: str = "rejects"):
+        """Initialize reject service."""
+        self.rejects_path = Path(rejects_path)
+        self._write_lock = threading.Lock()
+        logger.info(f"Reject service initialized with path: {self.rejects_path}")
+
+    def new_run_id(self) -> str:
+        """Generate an identifier for a processing run."""
+        return f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+    def write(self, run_id: str, partner_id: str, source_file: str, sheet_name: str, target_table: str,
+              source_df: pd.DataFrame, rejections: RowRejections) -> Optional[Path]:
+        """
+        Write rejected rows of a sheet to the run's reject directory.
+
+        The original source values are kept (as text) so that corrected rows
+        can be replayed through the same transformation path.
+
+        Args:
+            run_id: Processing run identifier
+            partner_id: Partner identifier
+            source_file: File the rows were read from
+            sheet_name: Sheet (or CSV) config name
+            target_table: Target database table
+            source_df: Source rows as parsed, aligned with the rejections index
+            rejections: Accumulated reject reasons
+
+        Returns:
+            Path of the written reject file, or None if nothing was rejected
+        """
+        mask = rejections.mask
+        if not mask.any():
+            return None
+
+        rejected_index = rejections.index[mask]
+        source_rows = source_df.loc[rejected_index]
+        reject_df = source_rows.astype(str).where(source_rows.notna())
+        reject_df.columns = [str(column) for column in reject_df.columns]
+        reject_df[PARTNER_ID] = partner_id
+        reject_df[SOURCE_FILE] = str(source_file)
+        reject_df[SHEET_NAME] = sheet_name
+        reject_df[TARGET_TABLE] = target_table
+        reject_df[SOURCE_ROW] = np.asarray(rejected_index, dtype='int64')
+        reject_df[REJECT_REASON] = rejections.reason[mask]
+        reject_df[REJECT_DETAIL] = rejections.detail[mask]
+
+        run_dir = self.rejects_path / run_id
+        run_dir.mkdir(parents=True, exist_ok=True)
+        with self._write_lock:
+            part = len(list(run_dir.glob(f"{partner_id}__{target_table}__*.parquet")))
+            reject_file = run_dir / f"{partner_id}__{target_table}__{part:04d}.parquet"
+            reject_df.reset_index(drop=True).to_parquet(reject_file, index=False)
+
+        logger.warning(f"Quarantined {len(reject_df)} rejected rows of {target_table} to {reject_file}")
+        return reject_file
+
+    def load(self, run_id: str, include_replayed: bool = True) -> pd.DataFrame:
+        """
+        Load rejected rows of a run.
+
+        A corrected CSV saved next to a reject file (same name, .csv suffix)
+        takes precedence over the original parquet file.
+
+        Args:
+            run_id: Processing run identifier
+            include_replayed: Also load reject files marked as replayed
+
+        Returns:
+            DataFrame with source values and reject metadata columns
+        """
+        run_dir = self.rejects_path / run_id
+        if not run_dir.exists():
+            raise FileNotFoundError(f"Reject run not found: {run_dir}")
+
+        frames = []
+        for reject_file in sorted(run_dir.glob("*.parquet")):
+            if not include_replayed and self._replayed_marker(reject_file).exists():
+                continue
+            corrected_file = reject_file.with_suffix('.csv')
+            if corrected_file.exists():
+                frame = pd.read_csv(corrected_file, dtype=str)
+            else:
+                frame = pd.read_parquet(reject_file)
+            frame[REJECT_FILE] = reject_file.name
+            frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame(columns=METADATA_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    def list_runs(self) -> List[Dict[str, Any]]:
+        """List reject runs with their file counts and replay state."""
+        if not self.rejects_path.exists():
+            return []
+        runs = []
+        for run_dir in sorted(self.rejects_path.iterdir()):
+            if run_dir.is_dir():
+                files = len(list(run_dir.glob("*.parquet")))
+                replayed = len(self.replayed_files(run_dir.name))
+                runs.append({
+                    'run_id': run_dir.name,
+                    'files': files,
+                    'replayed_files': replayed,
+                    'replayed': files > 0 and replayed == files
+                })
+        return runs
+
+    def replayed_files(self, run_id: str) -> Dict[str, str]:
+        """Reject files of a run that were replayed, with the run that replayed each."""
+        return {
+            reject_file.name: self._replayed_marker(reject_file).read_text(encoding='utf-8').strip()
+            for reject_file in sorted((self.rejects_path / run_id).glob("*.parquet"))
+            if self._replayed_marker(reject_file).exists()
+        }
+
+    def mark_replayed(self, run_id: str, reject_files: List[str], replay_run_id: str):
+        """Record that reject files of a run were replayed, so they are not replayed again."""
+        for name in reject_files:
+            marker = self._replayed_marker(self.rejects_path / run_id / name)
+            marker.write_text(f"{replay_run_id}\n", encoding='utf-8')
+
+    @staticmethod
+    def _replayed_marker(reject_file: Path) -> Path:
+        return reject_file.with_suffix(REPLAYED_SUFFIX)
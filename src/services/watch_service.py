@@ -0,0 +1,256 @@
+"""Continuous ingestion of partner drops as they arrive."""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from ..interfaces.data_interfaces import IConfigService
+from .data_processing_service import DataProcessingService
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # OS notifications are optional; polling alone finds every file
+    FileSystemEventHandler = object
+    Observer = None
+
+
+@dataclass
+class _PendingFile:
+    """A file seen but not yet processed, or one that failed."""
+    partner_id: str
+    signature: Tuple[int, int]
+    # Monotonic time the signature was first observed
+    since: float
+
+
+@dataclass
+class WatchStats:
+    """Counters of a watch session."""
+    polls: int = 0
+    batches: int = 0
+    files_processed: int = 0
+    files_failed: int = 0
+    records_processed: int = 0
+    results: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class _WakeHandler(FileSystemEventHandler):
+    """Wakes the poll loop on any file system event."""
+
+    def __init__(self, wake: threading.Event):
+        self._wake = wake
+
+    def on_any_event(self, event):
+        self._wake.set()
+
+
+class WatchService:
+    """
+    Watches partner data directories and loads files once they are fully written.
+
+    Every poll scans the partner directories through the discovery snapshot,
+    so only directories that changed are listed. A new or modified file is
+    processed once its size and mtime have not changed for settle_seconds,
+    which keeps partially copied files out. Stable files of a partner are
+    handed to DataProcessingService.process_files as one batch, on a pool of
+    workers bounded by workers; a partner has at most one batch in flight, so
+    its parent files still load before child files. The process, and with it
+    the parsed configurations, reader processes and database connection pool,
+    stays up between batches.
+
+    If the watchdog package is installed, file system events wake the poll
+    loop early; otherwise directories are polled every interval seconds.
+    A failed file is not retried until its size or mtime changes. Files seen
+    but not processed or failed are kept out of the saved snapshot, so the
+    next watch or --new-only run picks them up; a dry run saves nothing.
+    """
+
+    def __init__(self, data_processing_service: DataProcessingService, config_service: IConfigService,
+                 interval: float = 2.0, settle_seconds: float = 2.0, workers: int = 2):
+        """
+        Initialize watch service.
+
+        Args:
+            data_processing_service: Service processing the files; needs a discovery service
+            config_service: Configuration service listing the partners
+            interval: Seconds between polls
+            settle_seconds: Seconds a file's size and mtime must stay unchanged before it is processed
+            workers: Partner batches processed at once
+        """
+        if data_processing_service.discovery_service is None:
+            raise ValueError("Watching requires a data processing service with a discovery service")
+        self.data_processing_service = data_processing_service
+        self.config_service = config_service
+        self.discovery_service = data_processing_service.discovery_service
+        self.interval = interval
+        self.settle_seconds = settle_seconds
+        self.workers = max(1, workers)
+        self.stats = WatchStats()
+        self._pending: Dict[Path, _PendingFile] = {}
+        self._failed: Dict[Path, _PendingFile] = {}
+        self._in_flight: Dict[str, Tuple[Future, List[Path]]] = {}
+        self._wake = threading.Event()
+        self._dry_run = False
+
+    def run(self, data_sources_path: str, partner_ids: Optional[List[str]] = None, dry_run: bool = False,
+            stop: Optional[threading.Event] = None, max_polls: Optional[int] = None,
+            on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> WatchStats:
+        """
+        Watch until stopped.
+
+        Args:
+            data_sources_path: Path to data sources directory
+            partner_ids: Partners to watch (all configured partners if omitted)
+            dry_run: If True, only validate without inserting to database
+            stop: Event ending the watch; batches in flight are finished first
+            max_polls: Stop after this many polls (runs until stopped if omitted)
+            on_result: Called with the processing result of every batch
+
+        Returns:
+            Counters of the session
+        """
+        stop = stop or threading.Event()
+        self._dry_run = dry_run
+        observer = self._start_observer(data_sources_path)
+        logger.info(f"Watching {data_sources_path} every {self.interval}s "
+                    f"({'file system events' if observer else 'polling'}, {self.workers} workers)")
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='watch') as pool:
+                while not stop.is_set():
+                    self._collect(on_result)
+                    self.poll(data_sources_path, partner_ids, dry_run, pool)
+                    if max_polls is not None and self.stats.polls >= max_polls:
+                        break
+                    self._wake.wait(self.interval)
+                    self._wake.clear()
+                for future, _ in list(self._in_flight.values()):
+                    future.result()
+                self._collect(on_result)
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+            self._save_snapshot()
+        logger.info(f"Watch stopped after {self.stats.polls} polls: {self.stats.files_processed} files "
+                    f"with {self.stats.records_processed} records processed, {self.stats.files_failed} failed")
+        return self.stats
+
+    def poll(self, data_sources_path: str, partner_ids: Optional[List[str]], dry_run: bool,
+             pool: ThreadPoolExecutor):
+        """Scan the partner directories once and dispatch the files that have settled."""
+        self.stats.polls += 1
+        now = time.monotonic()
+        for partner_id in partner_ids or self.config_service.list_partners():
+            try:
+                _, changed = self.data_processing_service.discover_files(data_sources_path, partner_id)
+            except FileNotFoundError:
+                continue
+            for path in changed:
+                self._observe(path, partner_id, now)
+        self._recheck_failed(now)
+
+        ready: Dict[str, List[Path]] = {}
+        for path, pending in list(self._pending.items()):
+            signature = _signature(path)
+            if signature is None:
+                # Removed or renamed before it settled
+                del self._pending[path]
+            elif signature != pending.signature:
+                self._pending[path] = _PendingFile(pending.partner_id, signature, now)
+            elif now - pending.since >= self.settle_seconds and pending.partner_id not in self._in_flight:
+                ready.setdefault(pending.partner_id, []).append(path)
+
+        # Files of partners beyond the free workers keep waiting and join their partner's next batch
+        free_workers = self.workers - len(self._in_flight)
+        for partner_id, paths in list(ready.items())[:max(0, free_workers)]:
+            for path in paths:
+                del self._pending[path]
+            logger.info(f"Dispatching {len(paths)} files of {partner_id}")
+            future = pool.submit(self.data_processing_service.process_files, partner_id, paths, dry_run)
+            self._in_flight[partner_id] = (future, paths)
+        self._save_snapshot()
+
+    def _observe(self, path: Path, partner_id: str, now: float):
+        """Track a new or modified file until it settles."""
+        if path in self._pending or any(path in paths for _, paths in self._in_flight.values()):
+            return
+        signature = _signature(path)
+        if signature is not None:
+            self._failed.pop(path, None)
+            self._pending[path] = _PendingFile(partner_id, signature, now)
+
+    def _recheck_failed(self, now: float):
+        """Retry failed files rewritten since they failed (a rewrite in place does not change the directory)."""
+        for path, failed in list(self._failed.items()):
+            signature = _signature(path)
+            if signature is None:
+                del self._failed[path]
+            elif signature != failed.signature:
+                del self._failed[path]
+                self._pending[path] = _PendingFile(failed.partner_id, signature, now)
+
+    def _collect(self, on_result: Optional[Callable[[Dict[str, Any]], None]]):
+        """Record the results of finished batches."""
+        for partner_id, (future, paths) in list(self._in_flight.items()):
+            if not future.done():
+                continue
+            del self._in_flight[partner_id]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'partner_id': partner_id, 'success': False, 'files_processed': 0,
+                          'records_processed': 0, 'errors': [str(e)], 'warnings': [],
+                          'failed_files': [str(path) for path in paths]}
+            self.stats.batches += 1
+            self.stats.records_processed += result['records_processed']
+            # Files of the batch that loaded in full are done, even if others failed
+            failed_files = set(result['failed_files'])
+            failed = [path for path in paths if str(path) in failed_files]
+            self.stats.files_processed += len(paths) - len(failed)
+            self.stats.files_failed += len(failed)
+            for path in failed:
+                signature = _signature(path)
+                if signature is not None:
+                    self._failed[path] = _PendingFile(partner_id, signature, time.monotonic())
+            if not result['success']:
+                logger.error(f"Batch of {partner_id} failed: {result['errors']}")
+            self.stats.results.append(result)
+            if on_result is not None:
+                on_result(result)
+
+    def _save_snapshot(self):
+        """Save the discovery snapshot, keeping unprocessed and failed files reported as new."""
+        if self._dry_run:
+            return
+        unprocessed = list(self._pending) + list(self._failed)
+        unprocessed += [path for _, paths in self._in_flight.values() for path in paths]
+        try:
+            self.discovery_service.save(unseen=unprocessed)
+        except OSError as e:
+            logger.warning(f"Could not save discovery snapshot: {e}")
+
+    def _start_observer(self, data_sources_path: str):
+        """Start a watchdog observer waking the poll loop, if watchdog is installed."""
+        if Observer is None or not Path(data_sources_path).is_dir():
+            return None
+        observer = Observer()
+        observer.schedule(_WakeHandler(self._wake), str(data_sources_path), recursive=True)
+        observer.daemon = True
+        observer.start()
+        return observer
+
+
+def _signature(path: Path) -> Optional[Tuple[int, int]]:
+    """(size, mtime) of a file, or None if it no longer exists."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
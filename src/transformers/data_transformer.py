@@ -1,12 +1,15 @@
 """Data transformation implementation."""
 
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
 
 import pandas as pd
 from loguru import logger
 
+from ..database.introspection import infer_column_type
 from ..interfaces.data_interfaces import IDataTransformer
+from .expressions import ExpressionError, compile_expression
+from .keys import OCCURRENCE_PREFIX, occurrence_column, occurrence_numbers, occurrence_sources, surrogate_keys
 
 
 class DataTransformer(IDataTransformer):
@@ -23,15 +26,36 @@ class DataTransformer(IDataTransformer):
         Returns:
             Transformed DataFrame
         """
+        transformed_df, _ = self.transform_with_diagnostics(df, config)
+        return transformed_df
+    
+    def transform_with_diagnostics(self, df: pd.DataFrame, config: Dict[str, Any],
+                                   column_cache: Optional[Dict[tuple, Any]] = None
+                                   ) -> Tuple[pd.DataFrame, Dict[str, pd.Series]]:
+        """
+        Transform data and report values that could not be converted.
+        
+        Args:
+            df: Input DataFrame
+            config: Transformation configuration
+            column_cache: Converted columns of df shared by the tables mapped
+                from it, so each is converted once (df must not change)
+            
+        Returns:
+            Tuple of the transformed DataFrame and, per system column, a boolean
+            Series (aligned with the result) marking rows whose non-null source
+            value failed type coercion
+        """
         logger.debug(f"Transforming DataFrame with {len(df)} rows")
         
         try:
-            # Create a copy to avoid modifying original
-            transformed_df = df.copy()
+            coercion_failures: Dict[str, pd.Series] = {}
             
-            # Apply column mappings
+            # Apply column mappings (df is only read, so tables mapped from the same frame share it)
             column_mappings = config.get('column_mappings', [])
-            transformed_df = self._apply_column_mappings(transformed_df, column_mappings)
+            transformed_df = self._apply_column_mappings(
+                df, column_mappings, config.get('target_table'), coercion_failures, column_cache
+            )
             
             # Apply global transformations
             global_transformations = config.get('global_transformations', [])
@@ -41,25 +65,52 @@ class DataTransformer(IDataTransformer):
             filters = config.get('filters', {})
             transformed_df = self._apply_filters(transformed_df, filters)
             
+            coercion_failures = {
+                column: mask.reindex(transformed_df.index, fill_value=False)
+                for column, mask in coercion_failures.items() if mask.any()
+            }
+            
             logger.debug(f"Transformation complete. Result: {len(transformed_df)} rows")
-            return transformed_df
+            return transformed_df, coercion_failures
             
         except Exception as e:
             logger.error(f"Transformation failed: {e}")
             raise
     
-    def _apply_column_mappings(self, df: pd.DataFrame, column_mappings: list) -> pd.DataFrame:
+    def _apply_column_mappings(self, df: pd.DataFrame, column_mappings: list, target_table: str = None,
+                               coercion_failures: Optional[Dict[str, pd.Series]] = None,
+                               column_cache: Optional[Dict[tuple, Any]] = None) -> pd.DataFrame:
         """Apply column mappings and transformations."""
-        result_df = pd.DataFrame()
+        result_df = pd.DataFrame(index=df.index)
         
         for mapping in column_mappings:
-            source_column = mapping['source_column']
+            source_column = mapping.get('source_column')
+            expression = mapping.get('expression')
+            key_columns = mapping.get('key_columns')
             system_column = mapping['system_column']
-            column_type = mapping['column_type']
+            column_type = mapping.get('column_type') or infer_column_type(target_table, system_column) or 'string'
             default_value = mapping.get('default_value')
             transformations = mapping.get('transformations', [])
             required = mapping.get('required', True)
             
+            if key_columns:
+                occurrences = column_mappings if mapping.get('key_occurrence') else None
+                keys = self._generate_keys(df, result_df, key_columns, mapping.get('key_prefix') or '', required,
+                                           occurrences)
+                if keys is not None:
+                    result_df[system_column] = keys
+                continue
+            
+            if expression:
+                derived = self._evaluate_expression(df, result_df, expression, column_type, required)
+                if derived is None:
+                    continue
+                result_df[system_column] = self._apply_column_transformations(derived, transformations)
+                result_df[system_column] = self._convert_data_type(
+                    result_df[system_column], column_type, default_value, coercion_failures, system_column
+                )
+                continue
+            
             logger.debug(f"Mapping {source_column} -> {system_column}")
             
             # Check if source column exists
@@ -75,21 +126,93 @@ class DataTransformer(IDataTransformer):
                     logger.debug(f"Optional column '{source_column}' not found, skipping")
                     continue
             else:
-                # Copy the column
-                result_df[system_column] = df[source_column].copy()
-                
-                # Apply column-specific transformations
-                result_df[system_column] = self._apply_column_transformations(
-                    result_df[system_column], transformations
-                )
-                
-                # Apply data type conversion
-                result_df[system_column] = self._convert_data_type(
-                    result_df[system_column], column_type, default_value
+                converted, failures = self._map_source_column(
+                    df, source_column, transformations, column_type, default_value, column_cache
                 )
+                result_df[system_column] = converted
+                if failures is not None and coercion_failures is not None:
+                    coercion_failures[system_column] = failures
         
         return result_df
     
+    def _map_source_column(self, df: pd.DataFrame, source_column: str, transformations: list, column_type: str,
+                           default_value: Any, column_cache: Optional[Dict[tuple, Any]] = None
+                           ) -> Tuple[pd.Series, Optional[pd.Series]]:
+        """
+        Transform and convert a source column, returning it with its coercion failures.
+        
+        With a column_cache shared by the targets of one parsed frame, a
+        column mapped the same way for several tables is converted once.
+        """
+        cache_key = (source_column, repr(transformations), column_type, repr(default_value))
+        if column_cache is not None and cache_key in column_cache:
+            converted, failures = column_cache[cache_key]
+            return converted.copy(), failures
+        
+        # Copy the column and apply column-specific transformations
+        converted = self._apply_column_transformations(df[source_column].copy(), transformations)
+        
+        # Apply data type conversion
+        recorded: Dict[str, pd.Series] = {}
+        converted = self._convert_data_type(converted, column_type, default_value, recorded, source_column)
+        failures = recorded.get(source_column)
+        if column_cache is not None:
+            column_cache[cache_key] = (converted, failures)
+            converted = converted.copy()
+        return converted, failures
+    
+    def _evaluate_expression(self, df: pd.DataFrame, result_df: pd.DataFrame, expression: str,
+                             column_type: str, required: bool) -> pd.Series:
+        """Evaluate a derived-column expression; mapped system columns shadow source columns."""
+        logger.debug(f"Deriving column from expression: {expression}")
+        compiled = compile_expression(expression)
+        try:
+            return compiled.evaluate([result_df, df], result_type=column_type)
+        except ExpressionError as e:
+            if required:
+                logger.error(f"Failed to evaluate expression '{expression}': {e}")
+                raise
+            logger.debug(f"Optional expression '{expression}' skipped: {e}")
+            return None
+    
+    def _generate_keys(self, df: pd.DataFrame, result_df: pd.DataFrame, key_columns: list,
+                       prefix: str, required: bool,
+                       occurrences: Optional[list] = None) -> Optional[pd.Series]:
+        """
+        Hash natural-key columns into surrogate keys; mapped system columns shadow source columns.
+        
+        Given the sheet's column mappings as occurrences, the occurrence
+        number of the natural key is hashed as well, so rows repeating a
+        natural key get keys of their own. The number is taken from the
+        column the processing service adds while reading the file (see
+        KeyOccurrences); without it, rows are numbered within the frame.
+        """
+        logger.debug(f"Generating keys from {key_columns}")
+        columns = {}
+        for column in key_columns:
+            if column in result_df.columns:
+                columns[column] = result_df[column]
+            elif column in df.columns:
+                columns[column] = df[column]
+            elif required:
+                logger.error(f"Key column '{column}' not found")
+                raise ValueError(f"Key column '{column}' not found")
+            else:
+                logger.debug(f"Optional key over missing column '{column}' skipped")
+                return None
+        key_columns = list(key_columns)
+        key_df = pd.DataFrame(columns, index=df.index)
+        if occurrences is not None:
+            sources = occurrence_sources(key_columns, occurrences)
+            numbered = occurrence_column(sources) if sources else None
+            if numbered in df.columns:
+                # Replayed rejects hold the numbers as text
+                key_df[OCCURRENCE_PREFIX] = pd.to_numeric(df[numbered]).to_numpy(dtype='int64')
+            else:
+                key_df[OCCURRENCE_PREFIX] = occurrence_numbers(key_df[key_columns])
+            key_columns.append(OCCURRENCE_PREFIX)
+        return surrogate_keys(key_df, key_columns, prefix)
+    
     def _apply_column_transformations(self, series: pd.Series, transformations: list) -> pd.Series:
         """Apply transformations to a specific column."""
         result = series.copy()
@@ -98,15 +221,15 @@ class DataTransformer(IDataTransformer):
             transform_type = transform.get('type')
             
             if transform_type == 'uppercase':
-                result = result.astype(str).str.upper()
+                result = self._to_str(result).str.upper()
             elif transform_type == 'lowercase':
-                result = result.astype(str).str.lower()
+                result = self._to_str(result).str.lower()
             elif transform_type == 'strip':
-                result = result.astype(str).str.strip()
+                result = self._to_str(result).str.strip()
             elif transform_type == 'replace':
                 old_value = transform.get('old_value', '')
                 new_value = transform.get('new_value', '')
-                result = result.astype(str).str.replace(old_value, new_value)
+                result = self._to_str(result).str.replace(old_value, new_value)
             elif transform_type == 'date_format':
                 input_format = transform.get('input_format')
                 result = self._parse_dates(result, input_format)
@@ -115,31 +238,43 @@ class DataTransformer(IDataTransformer):
             elif transform_type == 'split':
                 delimiter = transform.get('delimiter', ',')
                 index = transform.get('index', 0)
-                result = result.astype(str).str.split(delimiter).str[index]
+                result = self._to_str(result).str.split(delimiter).str[index]
+            elif transform_type == 'map':
+                # Whole values are replaced; values without a mapping are kept
+                mapped = result.map(transform.get('values', {}))
+                result = mapped.where(mapped.notna(), result)
             elif transform_type == 'concat':
                 suffix = transform.get('suffix', '')
                 prefix = transform.get('prefix', '')
-                result = prefix + result.astype(str) + suffix
+                result = prefix + self._to_str(result) + suffix
             else:
                 logger.warning(f"Unknown transformation type: {transform_type}")
         
         return result
     
-    def _convert_data_type(self, series: pd.Series, column_type: str, default_value: Any) -> pd.Series:
-        """Convert series to specified data type."""
+    def _convert_data_type(self, series: pd.Series, column_type: str, default_value: Any,
+                           coercion_failures: Optional[Dict[str, pd.Series]] = None,
+                           column_name: str = None) -> pd.Series:
+        """Convert series to specified data type, recording values that fail to convert."""
         try:
             if column_type == 'string':
-                return series.astype(str)
+                return self._to_str(series)
             elif column_type == 'integer':
-                return pd.to_numeric(series, errors='coerce').fillna(default_value or 0).astype(int)
+                numeric = self._record_failures(series, pd.to_numeric(series, errors='coerce'),
+                                                coercion_failures, column_name)
+                return numeric.fillna(default_value or 0).astype(int)
             elif column_type == 'float':
-                return pd.to_numeric(series, errors='coerce').fillna(default_value or 0.0)
+                numeric = self._record_failures(series, pd.to_numeric(series, errors='coerce'),
+                                                coercion_failures, column_name)
+                return numeric.fillna(default_value or 0.0)
             elif column_type == 'decimal':
-                return pd.to_numeric(series, errors='coerce').fillna(default_value or 0.0)
+                numeric = self._record_failures(series, pd.to_numeric(series, errors='coerce'),
+                                                coercion_failures, column_name)
+                return numeric.fillna(default_value or 0.0)
             elif column_type == 'boolean':
                 return series.astype(bool)
             elif column_type in ['date', 'datetime']:
-                return self._parse_dates(series)
+                return self._record_failures(series, self._parse_dates(series), coercion_failures, column_name)
             else:
                 logger.warning(f"Unknown column type: {column_type}, treating as string")
                 return series.astype(str)
@@ -147,6 +282,19 @@ class DataTransformer(IDataTransformer):
             logger.warning(f"Failed to convert column to {column_type}: {e}, treating as string")
             return series.astype(str)
     
+    def _record_failures(self, original: pd.Series, converted: pd.Series,
+                         coercion_failures: Optional[Dict[str, pd.Series]], column_name: str) -> pd.Series:
+        """Record non-null values that became null during conversion."""
+        if coercion_failures is not None and column_name:
+            coercion_failures[column_name] = original.notna() & converted.isna()
+        return converted
+    
+    def _to_str(self, series: pd.Series) -> pd.Series:
+        """Convert values to strings, keeping missing values missing (and Arrow-backed strings as they are)."""
+        if isinstance(series.dtype, pd.StringDtype):
+            return series
+        return series.astype(str).where(series.notna())
+    
     def _parse_dates(self, series: pd.Series, date_format: str = None) -> pd.Series:
         """Parse dates with optional format."""
         try:
@@ -173,7 +321,8 @@ class DataTransformer(IDataTransformer):
                 columns = transform.get('columns', [])
                 ascending = transform.get('ascending', True)
                 if columns:
-                    result_df = result_df.sort_values(by=columns, ascending=ascending)
+                    # Stable, so ties keep their order (as in the out-of-core sort)
+                    result_df = result_df.sort_values(by=columns, ascending=ascending, kind='mergesort')
             else:
                 logger.warning(f"Unknown global transformation type: {transform_type}")
         
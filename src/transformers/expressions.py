@@ -0,0 +1,239 @@
+"""Derived-column expressions compiled into vectorized evaluators."""
+
+import ast
+import operator
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Column names containing spaces or symbols are quoted with backticks, e.g. `Order Date`
+_QUOTED_COLUMN = re.compile(r'`([^`]+)`')
+_PLACEHOLDER_PREFIX = '__col_'
+
+_ARITHMETIC_OPERATORS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+
+_DATE_TYPES = ('date', 'datetime')
+
+Evaluator = Callable[[Sequence[pd.DataFrame], pd.Index, Optional[str]], Any]
+
+
+class ExpressionError(ValueError):
+    """Raised when an expression cannot be compiled or evaluated."""
+
+
+class CompiledExpression:
+    """
+    Expression compiled once into a tree of whole-column operations.
+
+    Supported syntax: column references (bare identifiers or `quoted names`),
+    numeric/string literals, + - * / // % **, unary minus and the functions
+    abs, round, coalesce, concat, to_number and to_datetime. Evaluation works
+    on whole Series, so no Python code runs per row.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self._names: Dict[str, str] = {}
+        self.columns: Tuple[str, ...] = ()
+        self._evaluator = self._compile(expression)
+
+    def evaluate(self, frames: Sequence[pd.DataFrame], result_type: Optional[str] = None) -> pd.Series:
+        """
+        Evaluate the expression over whole columns.
+
+        Args:
+            frames: DataFrames searched in order when resolving column names
+            result_type: Target column type, used to disambiguate '+' for dates
+
+        Returns:
+            Series aligned with the first frame's index
+        """
+        index = frames[0].index
+        value = self._evaluator(frames, index, result_type)
+        if not isinstance(value, pd.Series):
+            value = pd.Series(value, index=index)
+        return value
+
+    def _compile(self, expression: str) -> Evaluator:
+        def quote(match: re.Match) -> str:
+            placeholder = f"{_PLACEHOLDER_PREFIX}{len(self._names)}"
+            self._names[placeholder] = match.group(1)
+            return placeholder
+
+        source = _QUOTED_COLUMN.sub(quote, expression.strip())
+        try:
+            tree = ast.parse(source, mode='eval')
+        except SyntaxError as e:
+            raise ExpressionError(f"Invalid expression '{expression}': {e.msg}") from e
+
+        columns: List[str] = []
+        evaluator = self._compile_node(tree.body, columns)
+        self.columns = tuple(dict.fromkeys(columns))
+        return evaluator
+
+    def _compile_node(self, node: ast.AST, columns: List[str]) -> Evaluator:
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str)):
+            value = node.value
+            return lambda frames, index, result_type: value
+
+        if isinstance(node, ast.Name):
+            name = self._names.get(node.id, node.id)
+            columns.append(name)
+            return lambda frames, index, result_type: _resolve_column(frames, name)
+
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            operand = self._compile_node(node.operand, columns)
+            sign = -1 if isinstance(node.op, ast.USub) else 1
+            return lambda frames, index, result_type: sign * _as_numeric(operand(frames, index, result_type))
+
+        if isinstance(node, ast.BinOp):
+            left = self._compile_node(node.left, columns)
+            right = self._compile_node(node.right, columns)
+            if isinstance(node.op, ast.Add):
+                return lambda frames, index, result_type: _add(
+                    left(frames, index, result_type), right(frames, index, result_type), result_type
+                )
+            op = _ARITHMETIC_OPERATORS.get(type(node.op))
+            if op is None:
+                raise ExpressionError(f"Unsupported operator in '{self.expression}'")
+            return lambda frames, index, result_type: op(
+                _as_numeric(left(frames, index, result_type)), _as_numeric(right(frames, index, result_type))
+            )
+
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            function = _FUNCTIONS.get(node.func.id)
+            if function is None:
+                raise ExpressionError(f"Unknown function '{node.func.id}' in '{self.expression}'")
+            args = [self._compile_node(arg, columns) for arg in node.args]
+            kwargs = {}
+            for keyword in node.keywords:
+                if not isinstance(keyword.value, ast.Constant):
+                    raise ExpressionError(f"Keyword arguments must be literals in '{self.expression}'")
+                kwargs[keyword.arg] = keyword.value.value
+            return lambda frames, index, result_type: function(
+                *[arg(frames, index, result_type) for arg in args], **kwargs
+            )
+
+        raise ExpressionError(f"Unsupported syntax '{ast.dump(node)}' in '{self.expression}'")
+
+
+@lru_cache(maxsize=None)
+def compile_expression(expression: str) -> CompiledExpression:
+    """Compile an expression, reusing the compiled form for repeated expressions."""
+    return CompiledExpression(expression)
+
+
+def _resolve_column(frames: Sequence[pd.DataFrame], name: str) -> pd.Series:
+    """Look up a column in the first frame that contains it."""
+    for frame in frames:
+        if name in frame.columns:
+            return frame[name]
+    raise ExpressionError(f"Column '{name}' not found")
+
+
+def _as_numeric(value: Any) -> Any:
+    """Coerce an operand to numbers for arithmetic."""
+    if isinstance(value, pd.Series):
+        if pd.api.types.is_numeric_dtype(value) or pd.api.types.is_bool_dtype(value):
+            return value
+        return pd.to_numeric(value, errors='coerce')
+    if isinstance(value, str):
+        return pd.to_numeric(value, errors='coerce')
+    return value
+
+
+def _is_text(value: Any) -> bool:
+    if isinstance(value, str):
+        return True
+    return isinstance(value, pd.Series) and not (
+        pd.api.types.is_numeric_dtype(value) or pd.api.types.is_datetime64_any_dtype(value)
+    )
+
+
+def _is_datetime(value: Any) -> bool:
+    return isinstance(value, pd.Series) and pd.api.types.is_datetime64_any_dtype(value)
+
+
+def _as_text(value: Any) -> Any:
+    if isinstance(value, pd.Series):
+        return value.astype(str).where(value.notna())
+    return str(value)
+
+
+def _add(left: Any, right: Any, result_type: Optional[str]) -> Any:
+    """
+    '+' is overloaded: a date plus a time (or a date/datetime target) combines
+    into a timestamp, text operands concatenate, anything else adds numerically.
+    """
+    if _is_datetime(left) or _is_datetime(right) or result_type in _DATE_TYPES:
+        return _combine_datetime(left, right)
+    if _is_text(left) or _is_text(right):
+        left_numeric, right_numeric = _as_numeric(left), _as_numeric(right)
+        if _fully_numeric(left, left_numeric) and _fully_numeric(right, right_numeric):
+            return left_numeric + right_numeric
+        return _as_text(left) + _as_text(right)
+    return left + right
+
+
+def _fully_numeric(original: Any, converted: Any) -> bool:
+    """Check that numeric coercion did not lose any non-null value."""
+    if isinstance(original, pd.Series):
+        return not bool((original.notna() & converted.isna()).any())
+    return not pd.isna(converted)
+
+
+def _combine_datetime(left: Any, right: Any) -> pd.Series:
+    """Combine a date and a time of day (either may be text) into a timestamp."""
+    if _is_datetime(left) and isinstance(right, pd.Series) and pd.api.types.is_timedelta64_dtype(right):
+        return left + right
+    if _is_datetime(left) and not _is_datetime(right):
+        offset = pd.to_timedelta(_as_text(right), errors='coerce')
+        return left.dt.normalize() + offset.fillna(pd.Timedelta(0))
+    combined = _as_text(_date_part(left)) + ' ' + _as_text(_time_part(right))
+    return pd.to_datetime(combined, errors='coerce')
+
+
+def _date_part(value: Any) -> Any:
+    return value.dt.strftime('%Y-%m-%d') if _is_datetime(value) else value
+
+
+def _time_part(value: Any) -> Any:
+    return value.dt.strftime('%H:%M:%S') if _is_datetime(value) else value
+
+
+def _coalesce(*values: Any) -> Any:
+    result = values[0]
+    for value in values[1:]:
+        result = result.fillna(value) if isinstance(result, pd.Series) else (value if pd.isna(result) else result)
+    return result
+
+
+def _concat(*values: Any, sep: str = '') -> Any:
+    result = _as_text(values[0])
+    for value in values[1:]:
+        result = result + sep + _as_text(value)
+    return result
+
+
+def _round(value: Any, digits: int = 0) -> Any:
+    return np.round(_as_numeric(value), digits)
+
+
+_FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    'abs': lambda value: np.abs(_as_numeric(value)),
+    'round': _round,
+    'coalesce': _coalesce,
+    'concat': _concat,
+    'to_number': _as_numeric,
+    'to_datetime': lambda value, format=None: pd.to_datetime(value, format=format, errors='coerce'),
+}
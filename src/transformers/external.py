@@ -0,0 +1,490 @@
+"""Out-of-core global transformations over a stream of DataFrame chunks."""
+
+import math
+import shutil
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from loguru import logger
+from pandas.util import hash_array
+
+from ..parsers.arrow_handoff import frame_to_arrow
+
+# Arrival order of rows inside an operator; breaks ties so merges are stable
+_SEQUENCE = '__sequence__'
+
+# Prefixes of the columns carried alongside the transformed columns
+_SOURCE_PREFIX = '__source__:'
+_COERCION_PREFIX = '__coercion__:'
+
+# Runs merged at once; more runs are merged in several passes
+_MERGE_FAN_IN = 8
+
+# 16-character keys for hash_array, one per repartitioning level
+_HASH_KEYS = ('0123456789123456', 'partition-key-01', 'partition-key-02', 'partition-key-03')
+
+# Combines column hashes into a row hash (64-bit FNV prime)
+_HASH_MULTIPLIER = np.uint64(0x100000001B3)
+
+
+def pack_chunk(transformed_df: pd.DataFrame, source_df: pd.DataFrame,
+               coercion_failures: Dict[str, pd.Series]) -> pd.DataFrame:
+    """
+    Combine transformed rows with their source rows and coercion flags.
+
+    The packed frame can be sorted and deduplicated on its transformed
+    columns while keeping what rejects need for every row.
+    """
+    source = source_df.loc[transformed_df.index]
+    carried = {f'{_SOURCE_PREFIX}{column}': source[column] for column in source.columns}
+    carried.update({
+        f'{_COERCION_PREFIX}{column}': mask.reindex(transformed_df.index, fill_value=False)
+        for column, mask in coercion_failures.items()
+    })
+    return pd.concat([transformed_df, pd.DataFrame(carried, index=transformed_df.index)], axis=1)
+
+
+def unpack_chunk(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, pd.Series]]:
+    """Split a packed frame into (transformed rows, source rows, coercion failures)."""
+    columns = [str(column) for column in df.columns]
+    transformed = [column for column in columns if not column.startswith((_SOURCE_PREFIX, _COERCION_PREFIX))]
+    source = [column for column in columns if column.startswith(_SOURCE_PREFIX)]
+    source_df = df[source]
+    source_df.columns = [column[len(_SOURCE_PREFIX):] for column in source]
+    coercion_failures = {
+        column[len(_COERCION_PREFIX):]: df[column].astype(bool)
+        for column in columns if column.startswith(_COERCION_PREFIX) and df[column].any()
+    }
+    return df[transformed], source_df, coercion_failures
+
+
+def data_columns(df: pd.DataFrame) -> List[str]:
+    """Columns of a (possibly packed) frame that global transformations compare."""
+    return [column for column in df.columns
+            if not str(column).startswith((_SOURCE_PREFIX, _COERCION_PREFIX)) and column != _SEQUENCE]
+
+
+def _frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True).sum())
+
+
+def _rechunk(frames: Iterable[pd.DataFrame], chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Regroup a stream of frames into frames of chunk_rows rows (the last may be shorter)."""
+    pending: List[pd.DataFrame] = []
+    pending_rows = 0
+    for frame in frames:
+        if frame.empty:
+            continue
+        pending.append(frame)
+        pending_rows += len(frame)
+        if pending_rows >= chunk_rows:
+            combined = pd.concat(pending)
+            full = len(combined) - len(combined) % chunk_rows
+            for start in range(0, full, chunk_rows):
+                yield combined.iloc[start:start + chunk_rows]
+            pending = [combined.iloc[full:]] if full < len(combined) else []
+            pending_rows = len(combined) - full
+    if pending_rows:
+        yield pd.concat(pending)
+
+
+class _RunReader:
+    """Reads a run (one or more sorted files in sequence) one record batch at a time."""
+
+    def __init__(self, paths: List[Path]):
+        self._paths = list(paths)
+        self._source = None
+        self._reader = None
+        self._next_batch = 0
+        self._open_next()
+
+    def _open_next(self):
+        # Skip to the next file that still has batches
+        while (self._reader is None or self._next_batch >= self._reader.num_record_batches) and self._paths:
+            self.close()
+            self._source = pa.memory_map(str(self._paths.pop(0)), 'r')
+            self._reader = pa.ipc.open_file(self._source)
+            self._next_batch = 0
+
+    @property
+    def exhausted(self) -> bool:
+        return self._reader is None or self._next_batch >= self._reader.num_record_batches
+
+    def next_block(self) -> Optional[pd.DataFrame]:
+        if self.exhausted:
+            return None
+        batch = self._reader.get_batch(self._next_batch)
+        self._next_batch += 1
+        block = pa.Table.from_batches([batch]).to_pandas()
+        self._open_next()
+        return block
+
+    def close(self):
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+
+
+class _ExternalOperator:
+    """
+    Base of the out-of-core operators.
+
+    Rows are added chunk by chunk and get a sequence number in arrival
+    order. While they fit in half the memory limit they stay in memory;
+    beyond that they are written to Arrow IPC files in a private directory
+    under spill_dir, which is removed by close().
+    """
+
+    def __init__(self, memory_limit: int, spill_dir: Optional[str] = None):
+        self.memory_limit = max(1, memory_limit)
+        self.spill_dir = Path(spill_dir) if spill_dir else Path(tempfile.gettempdir())
+        self._directory: Optional[Path] = None
+        self._buffer: List[pd.DataFrame] = []
+        self._buffered_bytes = 0
+        self._rows = 0
+        self._row_bytes = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, df: pd.DataFrame):
+        """Add a chunk of rows."""
+        if df.empty:
+            return
+        df = df.assign(**{_SEQUENCE: np.arange(self._rows, self._rows + len(df), dtype='int64')})
+        self._rows += len(df)
+        nbytes = _frame_bytes(df)
+        self._row_bytes = max(self._row_bytes, nbytes / len(df))
+        self._buffer.append(df)
+        self._buffered_bytes += nbytes
+        if self._buffered_bytes > self.memory_limit // 2:
+            self._spill(self._take_buffer())
+
+    def results(self, chunk_rows: int) -> Iterator[pd.DataFrame]:
+        """Yield the transformed rows in chunks of chunk_rows rows."""
+        raise NotImplementedError
+
+    def close(self):
+        """Remove the spill files."""
+        self._buffer = []
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+
+    def _spill(self, df: pd.DataFrame):
+        raise NotImplementedError
+
+    def _take_buffer(self) -> pd.DataFrame:
+        frame = pd.concat(self._buffer) if len(self._buffer) > 1 else self._buffer[0]
+        self._buffer = []
+        self._buffered_bytes = 0
+        return frame
+
+    def _new_file(self, prefix: str) -> Path:
+        if self._directory is None:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            self._directory = Path(tempfile.mkdtemp(prefix=f'{type(self).__name__.lower()}-', dir=self.spill_dir))
+        return self._directory / f'{prefix}-{uuid.uuid4().hex}.arrow'
+
+    def _batch_rows(self) -> int:
+        """Rows per record batch, so that a merge of _MERGE_FAN_IN runs stays within the limit."""
+        return max(1, int(self.memory_limit // (4 * _MERGE_FAN_IN * max(self._row_bytes, 1.0))))
+
+    def _write(self, df: pd.DataFrame, prefix: str) -> Path:
+        path = self._new_file(prefix)
+        table = frame_to_arrow(df)
+        with pa.OSFile(str(path), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table, max_chunksize=self._batch_rows())
+        return path
+
+    def _merge(self, runs: List[List[Path]], sort_frame: Callable[[pd.DataFrame], pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """
+        K-way merge of sorted runs, block by block.
+
+        Each round sorts the rows loaded so far; rows up to the earliest
+        last-loaded row of the runs with unread batches are final (everything
+        unread sorts after it), and the run owning that row is refilled.
+        """
+        while len(runs) > _MERGE_FAN_IN:
+            merged = []
+            for start in range(0, len(runs), _MERGE_FAN_IN):
+                group = runs[start:start + _MERGE_FAN_IN]
+                merged.append([self._write(frame, 'merge') for frame in self._merge_pass(group, sort_frame)
+                               if len(frame)])
+            logger.debug(f"Merged {len(runs)} runs into {len(merged)}")
+            runs = merged
+        yield from self._merge_pass(runs, sort_frame)
+
+    def _merge_pass(self, runs: List[List[Path]], sort_frame: Callable[[pd.DataFrame], pd.DataFrame]
+                    ) -> Iterator[pd.DataFrame]:
+        readers = [_RunReader(path) for path in runs]
+        try:
+            frames = []
+            # Sequence number of the last loaded row of every run with unread batches
+            last_loaded: Dict[int, int] = {}
+            for index, reader in enumerate(readers):
+                block = reader.next_block()
+                if block is not None:
+                    frames.append(block)
+                    if not reader.exhausted:
+                        last_loaded[index] = int(block[_SEQUENCE].iat[-1])
+
+            while frames:
+                candidates = sort_frame(pd.concat(frames) if len(frames) > 1 else frames[0])
+                if not last_loaded:
+                    yield candidates
+                    break
+                bounds = np.flatnonzero(candidates[_SEQUENCE].isin(list(last_loaded.values())).to_numpy())
+                cut = int(bounds[0]) + 1
+                bound_sequence = int(candidates[_SEQUENCE].iat[cut - 1])
+                yield candidates.iloc[:cut]
+                frames = [candidates.iloc[cut:]] if cut < len(candidates) else []
+
+                run = next(index for index, sequence in last_loaded.items() if sequence == bound_sequence)
+                block = readers[run].next_block()
+                frames.append(block)
+                if readers[run].exhausted:
+                    del last_loaded[run]
+                else:
+                    last_loaded[run] = int(block[_SEQUENCE].iat[-1])
+        finally:
+            for reader in readers:
+                reader.close()
+
+
+class ExternalSorter(_ExternalOperator):
+    """
+    Merge-based external sort.
+
+    Sorted runs of at most half the memory limit are written to disk and
+    merged block by block. Ties keep their arrival order, as a stable
+    in-memory sort does.
+    """
+
+    def __init__(self, by: Sequence[str], ascending: Any = True, memory_limit: int = 256 * 2 ** 20,
+                 spill_dir: Optional[str] = None):
+        """
+        Initialize external sorter.
+
+        Args:
+            by: Columns to sort by
+            ascending: Sort direction, for all columns or per column
+            memory_limit: Memory the sorter may use for buffered rows and merge blocks
+            spill_dir: Directory for run files (temp directory if unset)
+        """
+        super().__init__(memory_limit, spill_dir)
+        self.by = list(by)
+        self.ascending = list(ascending) if isinstance(ascending, (list, tuple)) else [ascending] * len(self.by)
+        self._runs: List[List[Path]] = []
+
+    def results(self, chunk_rows: int) -> Iterator[pd.DataFrame]:
+        if not self._runs:
+            frames = [self._sort(self._take_buffer())] if self._buffer else []
+        else:
+            if self._buffer:
+                self._spill(self._take_buffer())
+            logger.debug(f"Merging {len(self._runs)} sorted runs")
+            frames = self._merge(self._runs, self._sort)
+        for chunk in _rechunk(frames, chunk_rows):
+            yield chunk.drop(columns=_SEQUENCE)
+
+    def _spill(self, df: pd.DataFrame):
+        self._runs.append([self._write(self._sort(df), 'run')])
+
+    def _sort(self, df: pd.DataFrame) -> pd.DataFrame:
+        return df.sort_values(self.by + [_SEQUENCE], ascending=self.ascending + [True], kind='mergesort')
+
+
+class ExternalDeduplicator(_ExternalOperator):
+    """
+    Hash-partitioned duplicate removal.
+
+    Rows are routed to partition files by a hash of their values, so all
+    copies of a row land in the same partition; each partition is
+    deduplicated in memory (and split again with another hash if it is too
+    large) and the survivors are merged back into arrival order. The first
+    occurrence of every row is kept, as drop_duplicates does.
+    """
+
+    def __init__(self, subset: Optional[Sequence[str]] = None, memory_limit: int = 256 * 2 ** 20,
+                 spill_dir: Optional[str] = None, partitions: int = 16):
+        """
+        Initialize external deduplicator.
+
+        Args:
+            subset: Columns that identify duplicates (all data columns if omitted)
+            memory_limit: Memory the deduplicator may use for buffered rows and one partition
+            spill_dir: Directory for partition files (temp directory if unset)
+            partitions: Number of hash partitions
+        """
+        super().__init__(memory_limit, spill_dir)
+        self.subset = list(subset) if subset is not None else None
+        self.partitions = max(2, partitions)
+        self._pieces: Dict[int, List[Path]] = {}
+
+    def results(self, chunk_rows: int) -> Iterator[pd.DataFrame]:
+        if not self._pieces:
+            frames = [self._drop_duplicates(self._take_buffer())] if self._buffer else []
+        else:
+            if self._buffer:
+                self._spill(self._take_buffer())
+            runs = []
+            for partition in sorted(self._pieces):
+                runs.extend(self._deduplicate_partition(self._pieces[partition], level=0))
+            frames = self._merge(runs, self._by_sequence)
+        for chunk in _rechunk(frames, chunk_rows):
+            yield chunk.drop(columns=_SEQUENCE)
+
+    def _spill(self, df: pd.DataFrame):
+        for partition, piece in self._partition(df, level=0):
+            self._pieces.setdefault(partition, []).append(self._write(piece, f'partition-{partition}'))
+
+    def _partition(self, df: pd.DataFrame, level: int) -> Iterator[Tuple[int, pd.DataFrame]]:
+        partitions = (row_hashes(df[self._subset(df)], _HASH_KEYS[level]) % np.uint64(self.partitions)).astype('int64')
+        for partition in np.unique(partitions):
+            yield int(partition), df[partitions == partition]
+
+    def _deduplicate_partition(self, pieces: List[Path], level: int) -> List[List[Path]]:
+        """Deduplicate one partition into a run sorted by sequence."""
+        size = sum(path.stat().st_size for path in pieces)
+        if size > self.memory_limit // 2 and level + 1 < len(_HASH_KEYS):
+            # Too large for memory: split it again with a different hash
+            sub_pieces: Dict[int, List[Path]] = {}
+            for path in pieces:
+                for partition, piece in self._partition(self._read(path), level + 1):
+                    sub_pieces.setdefault(partition, []).append(self._write(piece, f'partition-{level + 1}'))
+                path.unlink()
+            runs = []
+            for partition in sorted(sub_pieces):
+                runs.extend(self._deduplicate_partition(sub_pieces[partition], level + 1))
+            return runs
+
+        frame = pd.concat([self._read(path) for path in pieces])
+        for path in pieces:
+            path.unlink()
+        # Pieces were written in arrival order, so keep='first' keeps the earliest row
+        survivors = self._drop_duplicates(self._by_sequence(frame))
+        return [[self._write(survivors, 'deduplicated')]] if len(survivors) else []
+
+    def _drop_duplicates(self, df: pd.DataFrame) -> pd.DataFrame:
+        return df.drop_duplicates(subset=self._subset(df), keep='first')
+
+    def _subset(self, df: pd.DataFrame) -> List[str]:
+        return self.subset if self.subset is not None else data_columns(df)
+
+    def _by_sequence(self, df: pd.DataFrame) -> pd.DataFrame:
+        return df.sort_values(_SEQUENCE, kind='mergesort')
+
+    def _read(self, path: Path) -> pd.DataFrame:
+        with pa.memory_map(str(path), 'r') as source:
+            return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+def row_hashes(df: pd.DataFrame, hash_key: str = _HASH_KEYS[0]) -> np.ndarray:
+    """
+    64-bit hash of every row that equal rows share even across chunks.
+
+    Chunks may infer different dtypes for the same column (1 vs 1.0, None vs
+    NaN), so numbers are hashed as floats and everything else as text.
+    Collisions only put different rows in the same partition.
+    """
+    hashed = np.zeros(len(df), dtype='uint64')
+    for position in range(df.shape[1]):
+        series = df.iloc[:, position]
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            # + 0.0 folds -0.0 into 0.0
+            values = series.to_numpy(dtype='float64', na_value=np.nan) + 0.0
+        elif series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) in ('string', 'empty'):
+            # Already text: hashed as is, with every null as None
+            values = series.to_numpy()
+            nulls = pd.isna(values)
+            if nulls.any():
+                values = values.copy()
+                values[nulls] = None
+        else:
+            values = series.astype(str).where(series.notna(), None).to_numpy(dtype=object)
+        # Hashing without factorizing first is much faster for mostly unique values
+        column_hash = hash_array(values, hash_key=hash_key, categorize=False)
+        hashed = hashed * _HASH_MULTIPLIER ^ column_hash
+    return hashed
+
+
+class ExternalTransformation:
+    """
+    Applies whole-frame global transformations (sort, remove_duplicates) out of core.
+
+    Chunks are added one at a time; results() runs them through one external
+    operator per transformation, in configured order, and yields the result
+    in chunks. Row-local transformations commute with these and are applied
+    to the chunks before they are added.
+    """
+
+    def __init__(self, transformations: List[Dict[str, Any]], memory_limit: int,
+                 spill_dir: Optional[str] = None, partitions: int = 16):
+        """
+        Initialize out-of-core transformation.
+
+        Args:
+            transformations: Global transformations; only whole-frame ones are applied
+            memory_limit: Memory shared by the operators
+            spill_dir: Directory for spill files (temp directory if unset)
+            partitions: Hash partitions of duplicate removal
+        """
+        steps = [transform for transform in transformations if is_whole_frame(transform)]
+        if not steps:
+            raise ValueError("No whole-frame global transformations to apply")
+        limit = memory_limit // max(1, len(steps))
+        self._operators: List[_ExternalOperator] = []
+        for transform in steps:
+            if transform['type'] == 'remove_duplicates':
+                self._operators.append(ExternalDeduplicator(None, limit, spill_dir, partitions))
+            else:
+                self._operators.append(ExternalSorter(transform['columns'], transform.get('ascending', True),
+                                                      limit, spill_dir))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, df: pd.DataFrame):
+        """Add a chunk of rows."""
+        self._operators[0].add(df)
+
+    def results(self, chunk_rows: int) -> Iterator[pd.DataFrame]:
+        """Yield the transformed rows in chunks of chunk_rows rows."""
+        previous = self._operators[0]
+        for operator in self._operators[1:]:
+            for chunk in previous.results(chunk_rows):
+                operator.add(chunk)
+            previous.close()
+            previous = operator
+        yield from previous.results(chunk_rows)
+
+    def close(self):
+        """Remove all spill files."""
+        for operator in self._operators:
+            operator.close()
+
+
+def is_whole_frame(transform: Dict[str, Any]) -> bool:
+    """Whether a global transformation needs every row of a sheet at once."""
+    # A sort without columns leaves the frame unchanged
+    return transform.get('type') == 'remove_duplicates' or (
+        transform.get('type') == 'sort' and bool(transform.get('columns'))
+    )
+
+
+def partition_count(estimated_bytes: int, memory_limit: int) -> int:
+    """Hash partitions needed for each partition of estimated_bytes to fit in half the memory limit."""
+    return min(256, max(2, math.ceil(2 * estimated_bytes / max(1, memory_limit))))
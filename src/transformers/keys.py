@@ -0,0 +1,113 @@
+"""Deterministic surrogate keys hashed from natural-key columns."""
+
+from typing import Any, Dict, Hashable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .external import row_hashes
+
+# hash_array key of surrogate keys; changing it changes every generated key
+_KEY_HASH_KEY = 'surrogate-key-v1'
+
+_HEX_DIGITS = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+_NIBBLE_SHIFTS = np.arange(60, -1, -4, dtype=np.uint64)
+
+# Source column holding the occurrence numbers of the natural key read from the named source columns
+OCCURRENCE_PREFIX = '_occurrence:'
+
+
+def surrogate_keys(df: pd.DataFrame, key_columns: List[str], prefix: str = '') -> pd.Series:
+    """
+    Key every row by a 64-bit hash of its natural-key columns.
+
+    Keys are the prefix followed by 16 hex digits. The hash is seeded with a
+    fixed key and computed over the values only, so the same natural key gets
+    the same surrogate key in every run, process and chunking of a file, which
+    lets a re-ingest update the rows it loaded before. Rows sharing a natural
+    key share a surrogate key, so the key columns must identify a row.
+
+    Args:
+        df: Frame holding the key columns
+        key_columns: Natural-key columns, hashed in the given order
+        prefix: ASCII text put in front of every key
+
+    Returns:
+        String Series of keys aligned with df
+    """
+    hashes = row_hashes(df[list(key_columns)], hash_key=_KEY_HASH_KEY)
+    # Format as hex without a Python call per row: split each hash into
+    # nibbles, look up their digits and read every row back as one string
+    digits = _HEX_DIGITS[((hashes[:, None] >> _NIBBLE_SHIFTS) & np.uint64(0xF)).astype(np.intp)]
+    if prefix:
+        prefix_bytes = np.frombuffer(prefix.encode('ascii'), dtype=np.uint8)
+        digits = np.hstack([np.broadcast_to(prefix_bytes, (len(hashes), len(prefix_bytes))), digits])
+    width = digits.shape[1]
+    keys = np.ascontiguousarray(digits).view(f'S{width}').ravel()
+    return pd.Series(keys.astype(f'U{width}').astype(object), index=df.index)
+
+
+def occurrence_sources(key_columns: List[str], column_mappings: List[Dict[str, Any]]) -> Optional[List[str]]:
+    """
+    Source columns the natural-key columns of a key_occurrence mapping are read from.
+
+    Returns:
+        One source column per key column, or None when a key column is
+        derived (an expression or another key) rather than read
+    """
+    mapped = {mapping['system_column']: mapping for mapping in column_mappings}
+    sources = []
+    for column in key_columns:
+        mapping = mapped.get(column)
+        if mapping is None:
+            sources.append(column)
+        elif mapping.get('source_column'):
+            sources.append(mapping['source_column'])
+        else:
+            return None
+    return sources
+
+
+def occurrence_column(source_columns: List[str]) -> str:
+    """Name of the column numbering the occurrences of a natural key read from source_columns."""
+    return OCCURRENCE_PREFIX + '|'.join(source_columns)
+
+
+def occurrence_numbers(df: pd.DataFrame) -> np.ndarray:
+    """Number the rows sharing values in every column of df 0, 1, 2, ... in frame order."""
+    hashes = pd.Series(row_hashes(df, hash_key=_KEY_HASH_KEY))
+    return hashes.groupby(hashes, sort=False).cumcount().to_numpy(dtype='int64')
+
+
+class KeyOccurrences:
+    """
+    Numbers the repeats of natural keys across the chunks of one file.
+
+    A row's number counts the earlier rows of the file with the same values
+    in the key columns, so it depends on the rows of its order rather than on
+    where the order sits in the file. Chunks must be numbered in file order.
+    """
+
+    def __init__(self):
+        """Initialize with no rows seen."""
+        self._seen: Dict[Hashable, Dict[int, int]] = {}
+
+    def number(self, name: Hashable, df: pd.DataFrame) -> np.ndarray:
+        """
+        Occurrence numbers of the rows of a chunk.
+
+        Args:
+            name: Key the counts of these columns are kept under
+            df: The chunk's natural-key columns
+
+        Returns:
+            int64 array aligned with df
+        """
+        seen = self._seen.setdefault(name, {})
+        hashes = pd.Series(row_hashes(df, hash_key=_KEY_HASH_KEY))
+        numbers = hashes.groupby(hashes, sort=False).cumcount().to_numpy(dtype='int64')
+        if seen:
+            numbers += hashes.map(seen).fillna(0).to_numpy(dtype='int64')
+        for key_hash, count in hashes.value_counts(sort=False).items():
+            seen[key_hash] = seen.get(key_hash, 0) + int(count)
+        return numbers
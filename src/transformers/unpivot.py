@@ -0,0 +1,64 @@
+"""Wide-to-long unpivot of amount columns into child rows."""
+
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+
+def unpivot_frame(df: pd.DataFrame, unpivot: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Melt the configured columns of a sheet into one row per non-empty value.
+
+    Every configured column contributes a row for each source row where it
+    holds a value other than null or zero. The row gets the value in
+    value_column, the constants configured for its column (e.g. the sponsor
+    of a discount) and the remaining columns of its source row (e.g. the
+    parent order ID). Values that are not numbers are kept, so the column
+    mapping reports them as coercion failures. Rows come out in source order,
+    then configured column order. The index is source index x number of
+    configured columns + column position, so it stays unique across chunks.
+
+    A frame that already lacks every configured column but has value_column
+    (rejected child rows being replayed) is returned as it is.
+
+    Args:
+        df: Parsed sheet with an integer index
+        unpivot: Unpivot configuration (columns, value_column, drop_zero)
+
+    Returns:
+        Long frame of child rows
+    """
+    specs = unpivot['columns']
+    value_column = unpivot.get('value_column', 'value')
+    present = [(position, spec) for position, spec in enumerate(specs) if spec['source_column'] in df.columns]
+    if not present:
+        if value_column in df.columns:
+            return df
+        raise ValueError(f"None of the unpivot columns {[spec['source_column'] for spec in specs]} found")
+    if len(present) < len(specs):
+        missing = [spec['source_column'] for spec in specs if spec['source_column'] not in df.columns]
+        logger.debug(f"Unpivot columns not in sheet: {missing}")
+
+    source_columns = [spec['source_column'] for _, spec in present]
+    values = df[source_columns]
+    keep = values.notna().to_numpy()
+    if unpivot.get('drop_zero', True):
+        numeric = values.apply(pd.to_numeric, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        keep &= numeric != 0
+    # Row-major nonzero: source rows in order, each with its columns in configured order
+    rows, columns = np.nonzero(keep)
+
+    positions = np.array([position for position, _ in present], dtype='int64')
+    index = np.asarray(df.index, dtype='int64')[rows] * len(specs) + positions[columns]
+    parent_columns = [column for column in df.columns
+                      if column not in {spec['source_column'] for spec in specs}]
+    long_df = df[parent_columns].iloc[rows].set_axis(pd.Index(index), axis=0)
+    long_df[value_column] = values.to_numpy()[rows, columns]
+
+    attributes = list(dict.fromkeys(name for _, spec in present for name in spec.get('values', {})))
+    for name in attributes:
+        constants = np.array([spec.get('values', {}).get(name) for _, spec in present], dtype=object)
+        long_df[name] = constants[columns]
+    return long_df
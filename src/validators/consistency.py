@@ -0,0 +1,140 @@
+"""Cross-table consistency checks between detail rows and order-level amounts."""
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+
+@dataclass(frozen=True)
+class ConsistencyRule:
+    """Sum of a detail column per key must match an amount on the header table."""
+    rule_id: str
+    detail_table: str
+    detail_column: str
+    header_table: str
+    header_column: str
+    key: str = 'order_id'
+
+
+DEFAULT_CONSISTENCY_RULES: Tuple[ConsistencyRule, ...] = (
+    ConsistencyRule('order_items.total_price.sum_matches_subtotal', 'order_items', 'total_price',
+                    'order_financial_details', 'subtotal'),
+)
+
+# Number of mismatching keys listed in each result
+_EXAMPLE_COUNT = 10
+
+
+class CrossTableValidator:
+    """
+    Accumulates per-key aggregates while sheets are processed and compares them at the end.
+
+    Only one number per key and table is kept (the partial sums of each frame
+    are summed again on evaluation), so a month of items costs a groupby per
+    frame and a hash join per rule rather than a post-load SQL query. Aggregates
+    are kept per partner so that a run covering several partners never mixes
+    their keys.
+    """
+
+    def __init__(self, tolerance: float = 0.01, relative_tolerance: float = 0.001,
+                 rules: Tuple[ConsistencyRule, ...] = DEFAULT_CONSISTENCY_RULES):
+        """
+        Initialize cross-table validator.
+
+        Args:
+            tolerance: Absolute variance always accepted (currency rounding)
+            relative_tolerance: Variance accepted as a fraction of the header amount
+            rules: Consistency rules to check
+        """
+        self.tolerance = tolerance
+        self.relative_tolerance = relative_tolerance
+        self.rules = rules
+        self._details: Dict[Tuple[str, str], List[pd.Series]] = {}
+        self._headers: Dict[Tuple[str, str], List[pd.Series]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, partner_id: str, table_name: str, df: pd.DataFrame):
+        """
+        Record the amounts of rows that will be loaded into a table.
+
+        Args:
+            partner_id: Partner the rows belong to
+            table_name: Target table of the rows
+            df: Transformed rows
+        """
+        for rule in self.rules:
+            if rule.key not in df.columns:
+                continue
+            if table_name == rule.detail_table and rule.detail_column in df.columns:
+                amounts = pd.to_numeric(df[rule.detail_column], errors='coerce')
+                partial = amounts.groupby(df[rule.key], sort=False).sum()
+                with self._lock:
+                    self._details.setdefault((partner_id, rule.rule_id), []).append(partial)
+            if table_name == rule.header_table and rule.header_column in df.columns:
+                amounts = pd.to_numeric(df[rule.header_column], errors='coerce')
+                header = pd.Series(amounts.to_numpy(), index=pd.Index(df[rule.key]))
+                with self._lock:
+                    self._headers.setdefault((partner_id, rule.rule_id), []).append(header)
+
+    def evaluate(self, partner_id: str) -> List[Dict[str, Any]]:
+        """
+        Compare accumulated aggregates for a partner and release them.
+
+        Keys present on only one side (e.g. items whose order is in another
+        drop) are not compared.
+
+        Args:
+            partner_id: Partner to evaluate
+
+        Returns:
+            One result per rule with data on both sides: rule_id, keys checked,
+            mismatch count and example mismatches (key, detail total, header
+            amount, variance)
+        """
+        results = []
+        for rule in self.rules:
+            with self._lock:
+                details = self._details.pop((partner_id, rule.rule_id), [])
+                headers = self._headers.pop((partner_id, rule.rule_id), [])
+            if not details or not headers:
+                continue
+
+            detail_totals = pd.concat(details).groupby(level=0, sort=False).sum()
+            header_amounts = pd.concat(headers)
+            header_amounts = header_amounts[~header_amounts.index.duplicated(keep='last')]
+
+            # Hash join of header keys into the detail totals
+            positions = detail_totals.index.get_indexer(header_amounts.index)
+            matched = positions >= 0
+            keys = header_amounts.index[matched]
+            header_values = header_amounts.to_numpy(dtype='float64')[matched]
+            detail_values = detail_totals.to_numpy(dtype='float64')[positions[matched]]
+
+            variance = detail_values - header_values
+            allowed = np.maximum(self.tolerance, self.relative_tolerance * np.abs(header_values))
+            with np.errstate(invalid='ignore'):
+                mismatch = ~(np.abs(variance) <= allowed)
+
+            order = np.argsort(-np.nan_to_num(np.abs(variance[mismatch]), nan=np.inf), kind='stable')
+            examples = pd.DataFrame({
+                rule.key: keys[mismatch],
+                f'{rule.detail_table}.{rule.detail_column}': detail_values[mismatch],
+                f'{rule.header_table}.{rule.header_column}': header_values[mismatch],
+                'variance': variance[mismatch]
+            }).iloc[order[:_EXAMPLE_COUNT]]
+
+            result = {
+                'rule_id': rule.rule_id,
+                'checked': int(matched.sum()),
+                'mismatches': int(mismatch.sum()),
+                'examples': examples.to_dict('records')
+            }
+            if result['mismatches']:
+                logger.warning(f"{rule.rule_id}: {result['mismatches']} of {result['checked']} "
+                               f"{rule.key} values differ beyond tolerance")
+            results.append(result)
+        return results
@@ -1,204 +1,208 @@
 """Data validation implementation."""
 
-from typing import Any, Dict
+from typing import Any, Dict, Tuple
 
+import numpy as np
 import pandas as pd
 from loguru import logger
 
 from ..interfaces.data_interfaces import IDataValidator
+from .rules import (
+    EMPTY_ROW, ERROR, MIN_VALUE, NOT_NULL, REQUIRED_COLUMN, UNIQUE, WARNING, RuleReport, ValidationRule,
+    build_table_rules, evaluate_rules
+)
+
+# Validation depth
+FULL = 'full'
+SAMPLE = 'sample'
+AUTO = 'auto'
+VALIDATION_MODES = (FULL, SAMPLE, AUTO)
+
+# Rules checked on every row even in sample mode: keys, and the null checks read from one isna() sweep
+_ALWAYS_FULL_KINDS = frozenset({UNIQUE, NOT_NULL, REQUIRED_COLUMN, EMPTY_ROW})
+
+# Business checks that the schema cannot express; reported as warnings
+_BUSINESS_RULES: Dict[str, Tuple[ValidationRule, ...]] = {
+    'order_items': (
+        ValidationRule('order_items.quantity.positive', MIN_VALUE, ('quantity',), WARNING,
+                       {'min': 0, 'inclusive': False}),
+        ValidationRule('order_items.unit_price.non_negative', MIN_VALUE, ('unit_price',), WARNING, {'min': 0}),
+    ),
+    'payments': (
+        ValidationRule('payments.amount.non_negative', MIN_VALUE, ('amount',), WARNING, {'min': 0}),
+    ),
+    'settlement_reports': tuple(
+        ValidationRule(f'settlement_reports.{column}.non_negative', MIN_VALUE, (column,), WARNING, {'min': 0})
+        for column in ('total_amount', 'commission_amount', 'settlement_amount')
+    ),
+    'invoices': (
+        ValidationRule('invoices.invoice_number.unique', UNIQUE, ('invoice_number',), WARNING),
+    ),
+}
 
 
 class DataValidator(IDataValidator):
     """Implementation of data validator."""
-    
+
+    def __init__(self, mode: str = FULL, sample_size: int = 10000, escalation_rate: float = 0.0,
+                 full_max_rows: int = 100000):
+        """
+        Initialize data validator.
+
+        Args:
+            mode: 'full' checks every row; 'sample' checks a stratified sample
+                and escalates to a full check when the sample's error rate
+                exceeds escalation_rate; 'auto' samples only frames larger
+                than full_max_rows
+            sample_size: Number of rows checked in sample mode
+            escalation_rate: Sample error rate above which the whole frame is checked
+            full_max_rows: Largest frame 'auto' still checks in full
+        """
+        if mode not in VALIDATION_MODES:
+            raise ValueError(f"Unknown validation mode: {mode}")
+        self.mode = mode
+        self.sample_size = sample_size
+        self.escalation_rate = escalation_rate
+        self.full_max_rows = full_max_rows
+
     def validate(self, df: pd.DataFrame, table_name: str) -> Dict[str, Any]:
         """
         Validate data and return validation results.
-        
+
+        Rules are generated from the table definition in Base.metadata and
+        evaluated together in one vectorized sweep.
+
         Args:
             df: DataFrame to validate
             table_name: Target table name
-            
+
         Returns:
-            Validation results with errors and warnings
+            Validation results with per-rule violation counts ('violations'),
+            per-rule row masks ('rule_masks'), the violated error-severity rules
+            ('error_rules'), the combined mask of rows that fail an error rule
+            ('row_mask'), the depth used ('mode', 'sample_size', 'escalated')
+            and summary errors and warnings. In sample mode counts and masks
+            of the other rules cover the sampled rows only, and a warning says
+            how many rows those rules checked; uniqueness, required columns and
+            nulls are always checked on the whole frame.
         """
         logger.debug(f"Validating DataFrame for table: {table_name}")
-        
+
         result = {
             'valid': True,
             'errors': [],
             'warnings': [],
             'row_count': len(df),
-            'column_count': len(df.columns) if not df.empty else 0
+            'column_count': len(df.columns) if not df.empty else 0,
+            'violations': {},
+            'rule_masks': {},
+            'error_rules': [],
+            'row_mask': np.zeros(len(df), dtype=bool),
+            'mode': FULL,
+            'sample_size': len(df),
+            'escalated': False
         }
-        
+
         if df.empty:
             result['warnings'].append("DataFrame is empty")
             return result
-        
+
         try:
-            # Table-specific validations
-            if table_name == 'orders':
-                self._validate_orders(df, result)
-            elif table_name == 'order_items':
-                self._validate_order_items(df, result)
-            elif table_name == 'payments':
-                self._validate_payments(df, result)
-            elif table_name == 'settlement_reports':
-                self._validate_settlement_reports(df, result)
-            elif table_name == 'invoices':
-                self._validate_invoices(df, result)
-            
-            # Generic validations
-            self._validate_generic(df, result)
-            
+            rules = self.get_rules(table_name)
+            if self._should_sample(len(df)):
+                report, sample_size, escalated = self._evaluate_sampled(df, rules)
+                result['mode'] = FULL if escalated else SAMPLE
+                result['sample_size'] = sample_size
+                result['escalated'] = escalated
+                if escalated:
+                    logger.info(f"Sample of {sample_size} rows of {table_name} exceeded the "
+                                f"{self.escalation_rate:.2%} error rate, validating all {len(df)} rows")
+                sampled = sorted({rule.kind for rule in rules if rule.kind not in _ALWAYS_FULL_KINDS})
+                if sampled and not escalated:
+                    result['warnings'].append(
+                        f"Sampled validation: {', '.join(sampled)} checked on {sample_size} of {len(df)} rows "
+                        f"({sample_size / len(df):.1%}); the other rows are loaded without these checks"
+                    )
+            else:
+                report = evaluate_rules(df, rules)
+
+            result['violations'] = {rule_id: count for rule_id, count in report.violations.items() if count}
+            result['rule_masks'] = {rule_id: report.masks[rule_id] for rule_id in result['violations']}
+            result['row_mask'] = report.error_mask
+
+            for rule_id, count in result['violations'].items():
+                message = f"{rule_id}: {count} of {len(df)} rows"
+                if report.rules[rule_id].severity == ERROR:
+                    result['error_rules'].append(rule_id)
+                    result['errors'].append(message)
+                else:
+                    result['warnings'].append(message)
+
             # Set overall validity
             result['valid'] = len(result['errors']) == 0
-            
+
             logger.debug(f"Validation complete for {table_name}: "
-                        f"{'PASS' if result['valid'] else 'FAIL'}, "
-                        f"{len(result['errors'])} errors, {len(result['warnings'])} warnings")
-            
+                        f"{'PASS' if result['valid'] else 'FAIL'} ({result['mode']}), "
+                        f"{int(result['row_mask'].sum())} invalid rows, {len(result['warnings'])} warnings")
+
             return result
-            
+
         except Exception as e:
             logger.error(f"Validation failed for table {table_name}: {e}")
             result['valid'] = False
             result['errors'].append(f"Validation error: {e}")
             return result
-    
-    def _validate_orders(self, df: pd.DataFrame, result: Dict[str, Any]):
-        """Validate orders table data."""
-        required_columns = ['order_id', 'order_date', 'order_status']
-        
-        for col in required_columns:
-            if col not in df.columns:
-                result['errors'].append(f"Required column missing: {col}")
-            elif df[col].isna().any():
-                null_count = df[col].isna().sum()
-                result['errors'].append(f"Column '{col}' has {null_count} null values")
-        
-        # Check for duplicate order IDs
-        if 'order_id' in df.columns:
-            duplicates = df['order_id'].duplicated().sum()
-            if duplicates > 0:
-                result['warnings'].append(f"Found {duplicates} duplicate order IDs")
-        
-        # Validate order status values
-        if 'order_status' in df.columns:
-            valid_statuses = ['pending', 'confirmed', 'in_preparation', 'ready', 
-                            'out_for_delivery', 'delivered', 'cancelled', 'refunded']
-            invalid_statuses = df[~df['order_status'].isin(valid_statuses)]['order_status'].unique()
-            if len(invalid_statuses) > 0:
-                result['warnings'].append(f"Invalid order statuses found: {list(invalid_statuses)}")
-    
-    def _validate_order_items(self, df: pd.DataFrame, result: Dict[str, Any]):
-        """Validate order items table data."""
-        required_columns = ['order_id', 'item_name', 'quantity', 'unit_price']
-        
-        for col in required_columns:
-            if col not in df.columns:
-                result['errors'].append(f"Required column missing: {col}")
-            elif df[col].isna().any():
-                null_count = df[col].isna().sum()
-                result['errors'].append(f"Column '{col}' has {null_count} null values")
-        
-        # Validate numeric fields
-        if 'quantity' in df.columns:
-            invalid_qty = df[df['quantity'] <= 0]['quantity'].count()
-            if invalid_qty > 0:
-                result['warnings'].append(f"Found {invalid_qty} items with invalid quantity (<= 0)")
-        
-        if 'unit_price' in df.columns:
-            invalid_price = df[df['unit_price'] < 0]['unit_price'].count()
-            if invalid_price > 0:
-                result['warnings'].append(f"Found {invalid_price} items with negative unit price")
-    
-    def _validate_payments(self, df: pd.DataFrame, result: Dict[str, Any]):
-        """Validate payments table data."""
-        required_columns = ['payment_id', 'order_id', 'payment_method', 'payment_status', 'amount']
-        
-        for col in required_columns:
-            if col not in df.columns:
-                result['errors'].append(f"Required column missing: {col}")
-            elif df[col].isna().any():
-                null_count = df[col].isna().sum()
-                result['errors'].append(f"Column '{col}' has {null_count} null values")
-        
-        # Validate payment amounts
-        if 'amount' in df.columns:
-            negative_amounts = df[df['amount'] < 0]['amount'].count()
-            if negative_amounts > 0:
-                result['warnings'].append(f"Found {negative_amounts} payments with negative amounts")
-        
-        # Validate payment methods
-        if 'payment_method' in df.columns:
-            valid_methods = ['cash', 'card', 'upi', 'wallet', 'net_banking']
-            invalid_methods = df[~df['payment_method'].isin(valid_methods)]['payment_method'].unique()
-            if len(invalid_methods) > 0:
-                result['warnings'].append(f"Invalid payment methods found: {list(invalid_methods)}")
-    
-    def _validate_settlement_reports(self, df: pd.DataFrame, result: Dict[str, Any]):
-        """Validate settlement reports table data."""
-        required_columns = ['settlement_id', 'settlement_date', 'total_amount']
-        
-        for col in required_columns:
-            if col not in df.columns:
-                result['errors'].append(f"Required column missing: {col}")
-            elif df[col].isna().any():
-                null_count = df[col].isna().sum()
-                result['errors'].append(f"Column '{col}' has {null_count} null values")
-        
-        # Validate amounts
-        numeric_columns = ['total_amount', 'commission_amount', 'settlement_amount']
-        for col in numeric_columns:
-            if col in df.columns:
-                negative_values = df[df[col] < 0][col].count()
-                if negative_values > 0:
-                    result['warnings'].append(f"Found {negative_values} negative values in {col}")
-    
-    def _validate_invoices(self, df: pd.DataFrame, result: Dict[str, Any]):
-        """Validate invoices table data."""
-        required_columns = ['invoice_number', 'invoice_date', 'total_amount']
-        
-        for col in required_columns:
-            if col not in df.columns:
-                result['errors'].append(f"Required column missing: {col}")
-            elif df[col].isna().any():
-                null_count = df[col].isna().sum()
-                result['errors'].append(f"Column '{col}' has {null_count} null values")
-        
-        # Check for duplicate invoice numbers
-        if 'invoice_number' in df.columns:
-            duplicates = df['invoice_number'].duplicated().sum()
-            if duplicates > 0:
-                result['warnings'].append(f"Found {duplicates} duplicate invoice numbers")
-    
-    def _validate_generic(self, df: pd.DataFrame, result: Dict[str, Any]):
-        """Perform generic validations on any DataFrame."""
-        # Check for completely empty rows
-        empty_rows = df.isna().all(axis=1).sum()
-        if empty_rows > 0:
-            result['warnings'].append(f"Found {empty_rows} completely empty rows")
-        
-        # Check for columns with all null values
-        null_columns = df.columns[df.isna().all()].tolist()
-        if null_columns:
-            result['warnings'].append(f"Columns with all null values: {null_columns}")
-        
-        # Check data types consistency (basic check)
-        for col in df.columns:
-            if df[col].dtype == 'object':
-                # Check for mixed data types in object columns
-                non_null_values = df[col].dropna()
-                if len(non_null_values) > 0:
-                    # Simple check for numeric values in string columns
-                    numeric_count = pd.to_numeric(non_null_values, errors='coerce').notna().sum()
-                    if 0 < numeric_count < len(non_null_values):
-                        result['warnings'].append(f"Column '{col}' has mixed data types")
-        
-        # Check for extremely long strings that might indicate data issues
-        for col in df.select_dtypes(include=['object']).columns:
-            max_length = df[col].astype(str).str.len().max()
-            if max_length > 1000:  # Arbitrary threshold
-                result['warnings'].append(f"Column '{col}' has very long values (max: {max_length} chars)") 
\ No newline at end of file
+
+    def get_rules(self, table_name: str) -> Tuple[ValidationRule, ...]:
+        """Get schema-derived and business rules for a table."""
+        return build_table_rules(table_name) + _BUSINESS_RULES.get(table_name, ())
+
+    def _should_sample(self, row_count: int) -> bool:
+        """Whether a frame of this size is validated on a sample."""
+        if row_count <= self.sample_size:
+            return False
+        return self.mode == SAMPLE or (self.mode == AUTO and row_count > self.full_max_rows)
+
+    def _evaluate_sampled(self, df: pd.DataFrame,
+                          rules: Tuple[ValidationRule, ...]) -> Tuple[RuleReport, int, bool]:
+        """
+        Evaluate row-level rules on a stratified sample, escalating if it is too dirty.
+
+        Returns:
+            Report over the whole frame, the sample size and whether the
+            check escalated to full validation
+        """
+        row_rules = tuple(rule for rule in rules if rule.kind != UNIQUE)
+        full_rules = tuple(rule for rule in rules if rule.kind in _ALWAYS_FULL_KINDS)
+
+        positions = _stratified_positions(len(df), self.sample_size)
+        sample_report = evaluate_rules(df.iloc[positions], row_rules)
+        error_rate = sample_report.error_mask.sum() / len(positions)
+        if error_rate > self.escalation_rate:
+            return evaluate_rules(df, rules), len(positions), True
+
+        # Spread the sample outcome of the other rules over the frame; unsampled rows count as passing
+        report = evaluate_rules(df, full_rules)
+        for rule_id, sample_mask in sample_report.masks.items():
+            if rule_id in report.masks:
+                continue
+            mask = np.zeros(len(df), dtype=bool)
+            mask[positions] = sample_mask
+            report.rules[rule_id] = sample_report.rules[rule_id]
+            report.masks[rule_id] = mask
+            report.violations[rule_id] = sample_report.violations[rule_id]
+        return report, len(positions), False
+
+
+def _stratified_positions(row_count: int, sample_size: int, seed: int = 0) -> np.ndarray:
+    """
+    Pick one random row from each of sample_size equal row ranges.
+
+    Stratifying by position spreads the sample over the whole file, so
+    problems confined to one section (a bad export day, a trailing footer)
+    are still likely to be seen.
+    """
+    edges = np.linspace(0, row_count, sample_size + 1)
+    offsets = np.random.default_rng(seed).random(sample_size)
+    positions = (edges[:-1] + offsets * np.diff(edges)).astype('int64')
+    return np.minimum(positions, row_count - 1)
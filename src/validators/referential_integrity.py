@@ -0,0 +1,180 @@
+"""In-memory referential-integrity checks against existing and in-flight parent keys."""
+
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from ..database.models import Base
+
+# (child column, parent table, parent column)
+ForeignKey = Tuple[str, str, str]
+
+
+def hash_keys(values: Any) -> np.ndarray:
+    """
+    Hash key values to int64.
+
+    Values are compared as text, so '42' and 42 are the same key. Collisions
+    between distinct 64-bit hashes are negligible and can only hide, never
+    invent, a violation.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    series = series.dropna()
+    if series.empty:
+        return np.empty(0, dtype='int64')
+    text = series.astype(str).to_numpy(dtype=object)
+    return pd.util.hash_array(text, categorize=False).view('int64')
+
+
+class KeySet:
+    """Compact set of keys stored as a sorted array of int64 hashes."""
+
+    def __init__(self, hashes: Optional[np.ndarray] = None):
+        """Initialize from (unsorted, possibly duplicated) hashes."""
+        self._hashes = np.unique(hashes) if hashes is not None else np.empty(0, dtype='int64')
+
+    def update(self, values: Any):
+        """Add key values to the set."""
+        hashes = hash_keys(values)
+        if len(hashes):
+            self._hashes = np.union1d(self._hashes, hashes)
+
+    def contains(self, values: pd.Series) -> np.ndarray:
+        """
+        Vectorized membership test.
+
+        Args:
+            values: Key values to look up
+
+        Returns:
+            Boolean array aligned with values; missing values count as present
+        """
+        result = np.ones(len(values), dtype=bool)
+        present = values.notna().to_numpy()
+        if not present.any():
+            return result
+        hashes = hash_keys(values[present])
+        if len(self._hashes) == 0:
+            result[present] = False
+            return result
+        positions = np.searchsorted(self._hashes, hashes)
+        positions[positions == len(self._hashes)] = 0
+        result[present] = self._hashes[positions] == hashes
+        return result
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+
+@lru_cache(maxsize=None)
+def get_foreign_keys(table_name: str) -> Tuple[ForeignKey, ...]:
+    """Get foreign keys of a table from Base.metadata."""
+    table = Base.metadata.tables.get(table_name)
+    if table is None:
+        return ()
+    return tuple(
+        (fk.parent.name, fk.column.table.name, fk.column.name)
+        for fk in table.foreign_keys
+    )
+
+
+@lru_cache(maxsize=None)
+def get_referenced_keys() -> frozenset:
+    """Get all (table, column) pairs referenced by some foreign key."""
+    return frozenset(
+        (fk.column.table.name, fk.column.name)
+        for table in Base.metadata.tables.values()
+        for fk in table.foreign_keys
+    )
+
+
+def get_table_order(table_name: str) -> int:
+    """Position of a table in dependency order (parents before children)."""
+    for position, table in enumerate(Base.metadata.sorted_tables):
+        if table.name == table_name:
+            return position
+    return len(Base.metadata.sorted_tables)
+
+
+class ReferentialIntegrityChecker:
+    """
+    Checks child foreign-key columns against parent keys before any write.
+
+    Existing parent keys are loaded from the database once per checker (i.e.
+    once per run) and unioned with the keys of parent frames processed in the
+    same run, so violations surface before the load instead of aborting it.
+    """
+
+    def __init__(self, database_service):
+        """Initialize with the database service used to load existing keys."""
+        self.database_service = database_service
+        self._key_sets: Dict[Tuple[str, str], Optional[KeySet]] = {}
+        self._pending: Dict[Tuple[str, str], List[pd.Series]] = {}
+        self._lock = threading.RLock()
+
+    def register(self, table_name: str, df: pd.DataFrame):
+        """
+        Register keys of a parent frame that will be loaded in this run.
+
+        Args:
+            table_name: Table the frame will be loaded into
+            df: Rows that will be loaded
+        """
+        referenced = get_referenced_keys()
+        for column in df.columns:
+            key = (table_name, column)
+            if key not in referenced:
+                continue
+            with self._lock:
+                key_set = self._key_sets.get(key)
+                if key_set is not None:
+                    key_set.update(df[column])
+                elif key not in self._key_sets:
+                    # Existing keys not loaded yet; keep until the first lookup
+                    self._pending.setdefault(key, []).append(df[column])
+
+    def check(self, table_name: str, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Check the foreign-key columns of a child frame in one membership test each.
+
+        Args:
+            table_name: Table the frame will be loaded into
+            df: Rows to check
+
+        Returns:
+            Violation masks keyed by '<table>.<column>.foreign_key'
+        """
+        violations = {}
+        for column, parent_table, parent_column in get_foreign_keys(table_name):
+            if column not in df.columns:
+                continue
+            with self._lock:
+                key_set = self._get_key_set(parent_table, parent_column)
+                if key_set is None:
+                    continue
+                mask = ~key_set.contains(df[column])
+            if mask.any():
+                violations[f"{table_name}.{column}.foreign_key"] = mask
+                logger.warning(f"{int(mask.sum())} rows of {table_name} reference missing "
+                               f"{parent_table}.{parent_column} values")
+        return violations
+
+    def _get_key_set(self, table_name: str, column: str) -> Optional[KeySet]:
+        """Get the key set of a parent column, loading existing keys on first use."""
+        key = (table_name, column)
+        if key not in self._key_sets:
+            try:
+                existing = self.database_service.get_column_values(table_name, column)
+                key_set = KeySet(hash_keys(existing))
+                for values in self._pending.pop(key, []):
+                    key_set.update(values)
+                logger.debug(f"Loaded {len(key_set)} existing keys of {table_name}.{column}")
+            except Exception as e:
+                logger.warning(f"Cannot load keys of {table_name}.{column}, skipping check: {e}")
+                key_set = None
+            self._key_sets[key] = key_set
+        return self._key_sets[key]
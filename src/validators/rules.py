@@ -0,0 +1,209 @@
+"""Validation rules derived from the SQLAlchemy models and evaluated in one sweep."""
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Enum, Float, Integer, Numeric, String
+
+from ..database.introspection import get_table
+
+NOT_NULL = 'not_null'
+REQUIRED_COLUMN = 'required_column'
+MAX_LENGTH = 'max_length'
+NUMERIC = 'numeric'
+NUMERIC_PRECISION = 'numeric_precision'
+ENUM = 'enum'
+UNIQUE = 'unique'
+MIN_VALUE = 'min_value'
+EMPTY_ROW = 'empty_row'
+
+ERROR = 'error'
+WARNING = 'warning'
+
+
+@dataclass(frozen=True)
+class ValidationRule:
+    """Single column-level (or key-level) check."""
+    rule_id: str
+    kind: str
+    columns: Tuple[str, ...]
+    severity: str = ERROR
+    params: Dict[str, Any] = field(default_factory=dict, compare=False, hash=False)
+
+
+@dataclass
+class RuleReport:
+    """Outcome of evaluating a rule set against a DataFrame."""
+    row_count: int
+    rules: Dict[str, ValidationRule]
+    violations: Dict[str, int]
+    masks: Dict[str, np.ndarray]
+
+    @property
+    def error_mask(self) -> np.ndarray:
+        """Rows violating at least one error-severity rule."""
+        mask = np.zeros(self.row_count, dtype=bool)
+        for rule_id, rule_mask in self.masks.items():
+            if self.rules[rule_id].severity == ERROR:
+                mask |= rule_mask
+        return mask
+
+
+@lru_cache(maxsize=None)
+def build_table_rules(table_name: str) -> Tuple[ValidationRule, ...]:
+    """
+    Generate validation rules from a table definition in Base.metadata.
+
+    Args:
+        table_name: Target table name
+
+    Returns:
+        Rules for nullability, string length, numeric precision, enum
+        membership and primary-key uniqueness
+    """
+    table = get_table(table_name)
+    if table is None:
+        return ()
+
+    rules: List[ValidationRule] = []
+    for column in table.columns:
+        name = column.name
+        has_default = column.default is not None or column.server_default is not None
+        if not column.nullable and not has_default:
+            rules.append(ValidationRule(f"{table_name}.{name}.{NOT_NULL}", NOT_NULL, (name,)))
+
+        sa_type = column.type
+        if isinstance(sa_type, Enum):
+            allowed = set(sa_type.enums)
+            if sa_type.enum_class is not None:
+                allowed.update(member.value for member in sa_type.enum_class)
+                allowed.update(sa_type.enum_class)
+            rules.append(ValidationRule(f"{table_name}.{name}.{ENUM}", ENUM, (name,),
+                                        params={'allowed': frozenset(allowed)}))
+        elif isinstance(sa_type, String) and sa_type.length:
+            rules.append(ValidationRule(f"{table_name}.{name}.{MAX_LENGTH}", MAX_LENGTH, (name,),
+                                        params={'length': sa_type.length}))
+        elif isinstance(sa_type, Numeric) and not isinstance(sa_type, Float) and sa_type.precision:
+            scale = sa_type.scale or 0
+            rules.append(ValidationRule(f"{table_name}.{name}.{NUMERIC_PRECISION}", NUMERIC_PRECISION, (name,),
+                                        params={'limit': 10 ** (sa_type.precision - scale)}))
+        elif isinstance(sa_type, (Integer, Numeric)):
+            rules.append(ValidationRule(f"{table_name}.{name}.{NUMERIC}", NUMERIC, (name,)))
+
+    primary_key = tuple(column.name for column in table.primary_key.columns)
+    if primary_key:
+        rules.append(ValidationRule(f"{table_name}.primary_key.{UNIQUE}", UNIQUE, primary_key))
+
+    return tuple(rules)
+
+
+class _ColumnState:
+    """Lazily derived views of one column, shared by every rule on that column."""
+
+    def __init__(self, series: pd.Series, isna: np.ndarray):
+        self.series = series
+        self.isna = isna
+        self._numeric: Optional[np.ndarray] = None
+        self._lengths: Optional[np.ndarray] = None
+
+    @property
+    def numeric(self) -> np.ndarray:
+        if self._numeric is None:
+            values = self.series
+            if not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+                values = pd.to_numeric(values, errors='coerce')
+            self._numeric = values.to_numpy(dtype='float64', na_value=np.nan)
+        return self._numeric
+
+    @property
+    def lengths(self) -> np.ndarray:
+        if self._lengths is None:
+            series = self.series
+            if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series):
+                self._lengths = np.zeros(len(series), dtype='int64')
+            else:
+                lengths = series.astype(str).str.len() if series.dtype == object else series.str.len()
+                self._lengths = np.where(self.isna, 0, lengths.to_numpy(dtype='float64', na_value=0))
+        return self._lengths
+
+
+def evaluate_rules(df: pd.DataFrame, rules: Tuple[ValidationRule, ...]) -> RuleReport:
+    """
+    Evaluate all rules for a table in a single vectorized sweep.
+
+    The null matrix is computed once for the whole frame and each column is
+    converted (to numbers, to lengths) at most once however many rules use it.
+
+    Args:
+        df: DataFrame to validate
+        rules: Rules to evaluate
+
+    Returns:
+        Per-rule violation counts and row masks
+    """
+    row_count = len(df)
+    null_matrix = df.isna().to_numpy()
+    column_positions = {name: position for position, name in enumerate(df.columns)}
+    states: Dict[str, _ColumnState] = {}
+
+    def state(name: str) -> _ColumnState:
+        if name not in states:
+            position = column_positions[name]
+            states[name] = _ColumnState(df.iloc[:, position], null_matrix[:, position])
+        return states[name]
+
+    report = RuleReport(row_count=row_count, rules={}, violations={}, masks={})
+    empty_rule = ValidationRule(EMPTY_ROW, EMPTY_ROW, (), severity=WARNING)
+    all_rules = tuple(rules) + (empty_rule,)
+
+    for rule in all_rules:
+        missing = [name for name in rule.columns if name not in column_positions]
+        if missing:
+            if rule.kind == NOT_NULL:
+                # Column absent entirely: every row would violate the constraint
+                _record(report, ValidationRule(rule.rule_id.replace(NOT_NULL, REQUIRED_COLUMN), REQUIRED_COLUMN,
+                                               rule.columns, rule.severity), np.ones(row_count, dtype=bool))
+            continue
+
+        if rule.kind == EMPTY_ROW:
+            mask = null_matrix.all(axis=1) if null_matrix.shape[1] else np.zeros(row_count, dtype=bool)
+        elif rule.kind == NOT_NULL:
+            mask = state(rule.columns[0]).isna
+        elif rule.kind == MAX_LENGTH:
+            mask = state(rule.columns[0]).lengths > rule.params['length']
+        elif rule.kind == NUMERIC:
+            column = state(rule.columns[0])
+            mask = ~column.isna & np.isnan(column.numeric)
+        elif rule.kind == NUMERIC_PRECISION:
+            column = state(rule.columns[0])
+            numeric = column.numeric
+            with np.errstate(invalid='ignore'):
+                mask = (~column.isna & np.isnan(numeric)) | (np.abs(numeric) >= rule.params['limit'])
+        elif rule.kind == ENUM:
+            column = state(rule.columns[0])
+            mask = ~column.isna & ~column.series.isin(rule.params['allowed']).to_numpy()
+        elif rule.kind == UNIQUE:
+            mask = df.duplicated(subset=list(rule.columns), keep='first').to_numpy()
+        elif rule.kind == MIN_VALUE:
+            numeric = state(rule.columns[0]).numeric
+            with np.errstate(invalid='ignore'):
+                if rule.params.get('inclusive', True):
+                    mask = numeric < rule.params['min']
+                else:
+                    mask = numeric <= rule.params['min']
+        else:
+            raise ValueError(f"Unknown rule kind: {rule.kind}")
+
+        _record(report, rule, np.asarray(mask, dtype=bool))
+
+    return report
+
+
+def _record(report: RuleReport, rule: ValidationRule, mask: np.ndarray):
+    """Store a rule outcome in the report."""
+    report.rules[rule.rule_id] = rule
+    report.masks[rule.rule_id] = mask
+    report.violations[rule.rule_id] = int(mask.sum())
@@ -0,0 +1,97 @@
+"""Shared fixtures for the processing tests."""
+
+import copy
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+
+ITEMS_CONFIG = {
+    "partner_id": "testpos",
+    "partner_name": "Test POS",
+    "template_id": "testpos_v1",
+    "source_config": {
+        "file_format": "csv",
+        "sheets_config": [
+            {
+                "sheet_name": "items",
+                "target_table": "order_items",
+                "column_mappings": [
+                    {"source_column": "Item ID", "system_column": "order_item_id"},
+                    {"source_column": "Order ID", "system_column": "order_id"},
+                    {"source_column": "Item", "system_column": "item_name"},
+                    {"source_column": "Qty", "system_column": "quantity"},
+                    {"source_column": "Rate", "system_column": "unit_price"},
+                    {"expression": "quantity * unit_price", "system_column": "total_price"}
+                ]
+            }
+        ]
+    }
+}
+
+
+class RecordingDatabaseService:
+    """In-memory stand-in for DatabaseService that records inserted frames."""
+
+    def __init__(self):
+        self.inserted = {}
+
+    def insert_data(self, df, table_name, batch_size=1000):
+        self.inserted.setdefault(table_name, []).append(df.copy())
+        return True
+
+    def insert_data_with_recovery(self, df, table_name, batch_size=1000):
+        self.insert_data(df, table_name, batch_size)
+        return {"success": True, "rows_inserted": len(df), "failed_rows": df.iloc[0:0].assign(db_error=None)}
+
+    def get_column_values(self, table_name, column_name):
+        return pd.Series([row for frame in self.inserted.get(table_name, []) for row in frame[column_name]],
+                         dtype=object)
+
+
+def _create_service(tmp_path, database_service, config=ITEMS_CONFIG, **kwargs):
+    """Build a DataProcessingService over temporary directories."""
+    from src.parsers.parser_factory import ParserFactory
+    from src.services.config_service import ConfigService
+    from src.services.data_processing_service import DataProcessingService
+    from src.services.reject_service import RejectService
+    from src.transformers.data_transformer import DataTransformer
+    from src.validators.data_validator import DataValidator
+
+    configs_path = tmp_path / "configs"
+    configs_path.mkdir()
+    (configs_path / "testpos.json").write_text(json.dumps(config))
+
+    return DataProcessingService(
+        parser_factory=ParserFactory(),
+        data_transformer=DataTransformer(),
+        database_service=database_service,
+        config_service=ConfigService(str(configs_path)),
+        data_validator=DataValidator(),
+        reject_service=RejectService(str(tmp_path / "rejects")),
+        **kwargs
+    )
+
+
+@pytest.fixture
+def items_config():
+    """A copy of the single-sheet testpos config, free to modify."""
+    return copy.deepcopy(ITEMS_CONFIG)
+
+
+@pytest.fixture
+def recording_database():
+    """An empty in-memory database stand-in."""
+    return RecordingDatabaseService()
+
+
+@pytest.fixture
+def create_service():
+    """Factory of DataProcessingService instances: create_service(tmp_path, database_service, **kwargs)."""
+    return _create_service
@@ -0,0 +1,37 @@
+"""Tests for cross-table consistency checks."""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+
+def test_item_totals_compared_with_subtotal():
+    """Test that item sums per order are joined against subtotals across frames."""
+    from src.validators.consistency import CrossTableValidator
+
+    validator = CrossTableValidator(tolerance=0.01, relative_tolerance=0)
+    validator.add("petpooja", "order_items", pd.DataFrame({
+        "order_id": ["o1", "o1", "o2", "o3"],
+        "total_price": [10.0, 5.0, 20.0, 7.0],
+    }))
+    validator.add("petpooja", "order_items", pd.DataFrame({
+        "order_id": ["o2"],
+        "total_price": [5.0],
+    }))
+    validator.add("petpooja", "order_financial_details", pd.DataFrame({
+        "order_id": ["o1", "o2", "o4"],
+        "subtotal": [15.0, 30.0, 9.0],
+    }))
+
+    results = validator.evaluate("petpooja")
+
+    assert len(results) == 1
+    assert results[0]["checked"] == 2
+    assert results[0]["mismatches"] == 1
+    assert results[0]["examples"][0]["order_id"] == "o2"
+    assert results[0]["examples"][0]["variance"] == -5.0
+    assert validator.evaluate("petpooja") == []
@@ -0,0 +1,114 @@
+"""Tests for database operations against a local SQLite database."""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+
+@pytest.fixture
+def sqlite_database(tmp_path):
+    """Point the global database connection at a fresh SQLite file."""
+    from src.database import connection
+
+    connection._db_connection = connection.DatabaseConnection(f"sqlite:///{tmp_path / 'test.db'}")
+    connection._db_connection.create_tables()
+    yield connection._db_connection
+    connection.close_database_connection()
+
+
+def test_insert_recovery_isolates_bad_rows(sqlite_database):
+    """Test that failing batches are bisected and only offending rows are returned."""
+    from sqlalchemy import text
+    from src.services.database_service import DatabaseService
+
+    df = pd.DataFrame({
+        "partner_id": ["p1", "p2", "p3", "p1", "p5", "p6", "p7"],
+        "partner_name": ["A", "B", None, "D", "E", "F", "G"],
+    }, index=[10, 11, 12, 13, 14, 15, 16])
+
+    result = DatabaseService().insert_data_with_recovery(df, "partners", batch_size=4)
+
+    assert result["success"]
+    assert result["rows_inserted"] == 5
+    assert result["failed_rows"].index.tolist() == [12, 13]
+    assert "NOT NULL" in result["failed_rows"].loc[12, "db_error"]
+    assert "UNIQUE" in result["failed_rows"].loc[13, "db_error"]
+
+    with sqlite_database.engine.connect() as conn:
+        loaded = conn.execute(text("SELECT partner_id FROM partners ORDER BY partner_id")).scalars().all()
+    assert loaded == ["p1", "p2", "p5", "p6", "p7"]
+
+
+def test_insert_recovery_does_not_bisect_database_errors(sqlite_database):
+    """Test that errors not caused by a row fail the load instead of quarantining every row."""
+    from sqlalchemy import text
+    from src.services.database_service import DatabaseService
+
+    with sqlite_database.engine.begin() as conn:
+        conn.execute(text("DROP TABLE partners"))
+    df = pd.DataFrame({"partner_id": ["p1", "p2", "p3"], "partner_name": ["A", "B", "C"]})
+
+    result = DatabaseService().insert_data_with_recovery(df, "partners", batch_size=2)
+
+    assert not result["success"]
+    assert result["rows_inserted"] == 0
+    assert result["failed_rows"].empty
+
+
+def test_upsert_updates_existing_rows(sqlite_database):
+    """Test that upsert mode updates rows whose key was loaded before."""
+    from sqlalchemy import text
+    from src.services.database_service import DatabaseService
+
+    service = DatabaseService(upsert=True)
+    first = pd.DataFrame({"partner_id": ["p1", "p2"], "partner_name": ["A", "B"], "partner_type": ["aggregator", "pos"]})
+    assert service.insert_data(first, "partners")
+
+    second = pd.DataFrame({"partner_id": ["p2", "p3"], "partner_name": ["B2", "C"]})
+    result = service.insert_data_with_recovery(second, "partners")
+    assert result["success"] and result["failed_rows"].empty
+
+    with sqlite_database.engine.connect() as conn:
+        loaded = conn.execute(
+            text("SELECT partner_id, partner_name, partner_type FROM partners ORDER BY partner_id")
+        ).all()
+    assert [tuple(row) for row in loaded] == [("p1", "A", "aggregator"), ("p2", "B2", "pos"), ("p3", "C", None)]
+
+
+def test_checkpointed_insert_resumes_after_last_commit(sqlite_database):
+    """Test that a failed checkpointed load keeps its committed batches and resumes without duplicates."""
+    from sqlalchemy import text
+    from src.services.database_service import DatabaseService
+
+    service = DatabaseService()
+    progress = {"partner_id": "p", "source_file": "/data/partners.csv", "sheet_name": "partners",
+                "target_table": "partners", "file_signature": "100:1", "run_id": "run-1"}
+    df = pd.DataFrame({
+        "partner_id": [f"p{i}" for i in range(10)],
+        "partner_name": ["A", "B", "C", "D", "E", "F", "G", None, "I", "J"],
+    })
+
+    # Batches of two rows, committed in pairs: rows 0-3 commit, the batch holding row 7 fails
+    result = service.insert_data_checkpointed(df, "partners", progress, end_offset=10, batch_size=2,
+                                              commit_every=2, recovery=False)
+    assert not result["success"]
+    assert result["rows_inserted"] == 4 and result["row_offset"] == 4
+    assert service.get_load_progress(progress) == (4, 0)
+
+    df.loc[7, "partner_name"] = "H"
+    resumed = service.insert_data_checkpointed(df[df.index >= 4], "partners", {**progress, "run_id": "run-2"},
+                                               end_offset=10, batch_size=2, commit_every=2)
+    assert resumed["success"] and resumed["rows_inserted"] == 6
+    service.set_rejects_offset(progress, 10)
+    assert service.get_load_progress(progress) == (10, 10)
+    # A rewritten file starts from the beginning
+    assert service.get_load_progress({**progress, "file_signature": "120:2"}) == (0, 0)
+
+    with sqlite_database.engine.connect() as conn:
+        loaded = conn.execute(text("SELECT partner_id FROM partners ORDER BY partner_id")).scalars().all()
+    assert loaded == [f"p{i}" for i in range(10)]
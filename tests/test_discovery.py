@@ -0,0 +1,153 @@
+"""Tests for source discovery and the watch loop."""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+
+def test_discovery_lists_only_changed_directories(tmp_path, recording_database, create_service):
+    """Test that the discovery snapshot persists and only changed directories are listed again."""
+    import os
+    from src.services.discovery_service import DiscoveryService
+
+    data_path = tmp_path / "data" / "TestPOS"
+    (data_path / "june").mkdir(parents=True)
+    (data_path / "july").mkdir()
+    (data_path / "june" / "items.csv").write_text("Item ID,Order ID,Item,Qty,Rate\ni1,o1,Tea,2,10\n")
+    (data_path / "~$items.csv").write_text("lock")
+
+    def age(*directories, mtime_ns=1_000_000_000_000):
+        # Directories modified within the last seconds are always listed again
+        for directory in directories:
+            os.utime(directory, ns=(mtime_ns, mtime_ns))
+
+    age(data_path, data_path / "june", data_path / "july")
+    snapshot = tmp_path / "discovery.json"
+    database = recording_database
+    service = create_service(tmp_path, database, referential_checks=False,
+                             discovery_service=DiscoveryService(str(snapshot)))
+
+    first = service.process_partner_data("testpos", str(tmp_path / "data"), new_only=True)
+    assert first["success"] and first["files_processed"] == 1
+    assert snapshot.exists()
+
+    # A new process reads the snapshot; nothing changed, so nothing is listed or processed
+    discovery = DiscoveryService(str(snapshot))
+    unchanged = discovery.scan(data_path)
+    assert (unchanged.directories, unchanged.directories_listed, unchanged.changed) == (3, 0, [])
+    assert [path.name for path in unchanged.files] == ["items.csv", "~$items.csv"]
+
+    (data_path / "july" / "items.csv").write_text("Item ID,Order ID,Item,Qty,Rate\ni2,o2,Bun,1,15\n")
+    age(data_path / "july", mtime_ns=2_000_000_000_000)
+    service.discovery_service = discovery
+    second = service.process_partner_data("testpos", str(tmp_path / "data"), new_only=True)
+    assert second["files_processed"] == 1
+    assert [frame["order_item_id"].tolist() for frame in database.inserted["order_items"]] == [["i1"], ["i2"]]
+
+    # Removing a directory drops it and everything below it from the snapshot
+    (data_path / "july" / "items.csv").unlink()
+    (data_path / "july").rmdir()
+    removed = discovery.scan(data_path)
+    assert [path.name for path in removed.files] == ["items.csv", "~$items.csv"]
+    assert not any("july" in directory for directory in discovery._directories)
+
+    third = service.process_partner_data("testpos", str(tmp_path / "data"), new_only=True)
+    assert third["success"] and third["files_processed"] == 0
+    assert third["warnings"] == ["No new data files found"]
+
+
+
+def test_discovery_retries_only_failed_files(tmp_path, recording_database, create_service):
+    """Test that a partner run with one failed file reports only that file as new next time."""
+    from src.services.discovery_service import DiscoveryService
+
+    data_path = tmp_path / "data" / "testpos"
+    (data_path / "june").mkdir(parents=True)
+    (data_path / "july").mkdir()
+    (data_path / "june" / "items.csv").write_text("Item ID,Order ID,Item,Qty,Rate\ni1,o1,Tea,2,10\n")
+    (data_path / "july" / "items.csv").write_text("Item ID,Order ID,Item,Qty,Rate\ni2,o2,Bun,1,15\n")
+    insert = recording_database.insert_data_with_recovery
+
+    def fail_july(df, table_name, batch_size=1000):
+        if "o2" in set(df["order_id"]):
+            raise RuntimeError("connection lost")
+        return insert(df, table_name, batch_size)
+
+    recording_database.insert_data_with_recovery = fail_july
+    service = create_service(tmp_path, recording_database, referential_checks=False,
+                             discovery_service=DiscoveryService(str(tmp_path / "discovery.json")))
+
+    first = service.process_partner_data("testpos", str(tmp_path / "data"), new_only=True)
+    assert not first["success"]
+    assert first["failed_files"] == [str(data_path / "july" / "items.csv")]
+
+    second = service.process_partner_data("testpos", str(tmp_path / "data"), new_only=True)
+    assert second["failed_files"] == first["failed_files"]
+    assert second["files_processed"] == 0
+    assert [frame["order_item_id"].tolist() for frame in recording_database.inserted["order_items"]] == [["i1"]]
+
+
+def test_watch_loads_files_once_settled(tmp_path, recording_database, create_service):
+    """Test that watch loads a dropped file only after its size and mtime stop changing."""
+    from concurrent.futures import ThreadPoolExecutor
+    from src.services.discovery_service import DiscoveryService
+    from src.services.watch_service import WatchService
+
+    data_path = tmp_path / "data" / "testpos"
+    data_path.mkdir(parents=True)
+    database = recording_database
+    service = create_service(tmp_path, database, referential_checks=False,
+                             discovery_service=DiscoveryService(str(tmp_path / "discovery.json")))
+    watcher = WatchService(service, service.config_service, interval=0.05, settle_seconds=0.2)
+
+    items = data_path / "items.csv"
+    items.write_text("Item ID,Order ID,Item,Qty,Rate\ni1,o1,Tea,2,10\n")
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        watcher.poll(str(tmp_path / "data"), None, False, pool)
+        # Still being written: the next poll sees a new size and waits again
+        items.write_text("Item ID,Order ID,Item,Qty,Rate\ni1,o1,Tea,2,10\ni2,o1,Coffee,1,20\n")
+        watcher.poll(str(tmp_path / "data"), None, False, pool)
+    assert "order_items" not in database.inserted
+
+    results = []
+    stats = watcher.run(str(tmp_path / "data"), max_polls=10, on_result=results.append)
+
+    assert (stats.batches, stats.files_processed, stats.records_processed) == (1, 1, 2)
+    assert results[0]["success"]
+    assert database.inserted["order_items"][0]["order_item_id"].tolist() == ["i1", "i2"]
+    # Loaded files are recorded in the snapshot and not loaded again
+    assert service.discover_files(str(tmp_path / "data"), "testpos")[1] == []
+    assert DiscoveryService(str(tmp_path / "discovery.json")).scan(data_path).changed == []
+
+
+def test_watch_keeps_only_failed_files_of_a_batch(tmp_path, recording_database, create_service):
+    """Test that watch records the loaded files of a partly failed batch and retries only the failed ones."""
+    from src.services.discovery_service import DiscoveryService
+    from src.services.watch_service import WatchService
+
+    data_path = tmp_path / "data" / "testpos"
+    (data_path / "june").mkdir(parents=True)
+    (data_path / "july").mkdir()
+    (data_path / "june" / "items.csv").write_text("Item ID,Order ID,Item,Qty,Rate\ni1,o1,Tea,2,10\n")
+    (data_path / "july" / "items.csv").write_text("Item ID,Order ID,Item,Qty,Rate\ni2,o2,Bun,1,15\n")
+    insert = recording_database.insert_data_with_recovery
+
+    def fail_july(df, table_name, batch_size=1000):
+        if "o2" in set(df["order_id"]):
+            raise RuntimeError("connection lost")
+        return insert(df, table_name, batch_size)
+
+    recording_database.insert_data_with_recovery = fail_july
+    service = create_service(tmp_path, recording_database, referential_checks=False,
+                             discovery_service=DiscoveryService(str(tmp_path / "discovery.json")))
+    watcher = WatchService(service, service.config_service, interval=0.05, settle_seconds=0.1)
+
+    stats = watcher.run(str(tmp_path / "data"), max_polls=10)
+
+    assert (stats.batches, stats.files_processed, stats.files_failed) == (1, 1, 1)
+    assert [frame["order_item_id"].tolist() for frame in recording_database.inserted["order_items"]] == [["i1"]]
+    assert DiscoveryService(str(tmp_path / "discovery.json")).scan(data_path).changed == [
+        data_path / "july" / "items.csv"
+    ]
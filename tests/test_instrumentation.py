@@ -0,0 +1,93 @@
+"""Tests for stage instrumentation and profiling."""
+
+import json
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+
+def test_stage_timings_exported(tmp_path, recording_database, create_service):
+    """Test that each stage reports its timing and rows as JSON and Prometheus text."""
+    from src.services.instrumentation import Instrumentation
+
+    data_path = tmp_path / "data" / "testpos"
+    data_path.mkdir(parents=True)
+    (data_path / "items.csv").write_text("Item ID,Order ID,Item,Qty,Rate\ni1,o1,Tea,2,10\ni2,o1,,1,5\ni3,o1,Bun,1,15\n")
+    database = recording_database
+    instrumentation = Instrumentation(enabled=True, metrics_path=str(tmp_path / "metrics"))
+    service = create_service(tmp_path, database, referential_checks=False, instrumentation=instrumentation)
+
+    result = service.process_partner_data("testpos", str(tmp_path / "data"))
+
+    report = json.loads(Path(result["metrics_report"]).read_text())
+    assert list(report["stages"]) == ["read", "header", "transform", "validate", "load"]
+    assert report["stages"]["read"]["rows_out"] == 3
+    assert report["stages"]["read"]["bytes_read"] == (data_path / "items.csv").stat().st_size
+    assert report["stages"]["validate"]["rows_out"] == 2
+    assert report["stages"]["load"]["rows_out"] == 2
+    load = next(record for record in report["records"] if record["stage"] == "load")
+    assert (load["partner_id"], load["file"], load["table"]) == ("testpos", "items.csv", "order_items")
+    assert load["peak_rss_bytes"] > 0
+
+    prometheus = (tmp_path / "metrics" / "data_parser.prom").read_text()
+    assert '# TYPE data_parser_stage_seconds_total counter' in prometheus
+    assert 'data_parser_stage_rows_out_total{partner="testpos",stage="load"} 2' in prometheus
+    assert 'data_parser_runs_total 1' in prometheus
+
+    # Disabled instrumentation records and writes nothing
+    disabled = Instrumentation(enabled=False, metrics_path=str(tmp_path / "off"))
+    service.instrumentation = disabled
+    assert "metrics_report" not in service.process_partner_data("testpos", str(tmp_path / "data"))
+    assert not (tmp_path / "off").exists()
+
+
+def test_profiler_reports_stages_files_and_allocations(tmp_path, recording_database, create_service):
+    """Test that a profiled run reports its stages, files, hotspots and allocation sites."""
+    from src.services.instrumentation import Instrumentation
+    from src.services.profiling import Profiler
+
+    data_path = tmp_path / "data" / "testpos"
+    data_path.mkdir(parents=True)
+    (data_path / "items.csv").write_text("Item ID,Order ID,Item,Qty,Rate\ni1,o1,Tea,2,10\ni2,o1,Bun,1,15\n")
+    service = create_service(tmp_path, recording_database, referential_checks=False)
+
+    for mode in ["deterministic", "sampling"]:
+        # Instrumentation stays disabled: the profiler still gets the stage records, nothing is exported
+        service.instrumentation = Instrumentation(enabled=False, metrics_path=str(tmp_path / "metrics"))
+        profiler = Profiler(profile_path=str(tmp_path / "profiles" / mode), mode=mode, memory=True, top=5,
+                            sample_interval=0.001)
+        service.instrumentation.add_listener(profiler.add_run)
+        profiler.start()
+        service.process_partner_data("testpos", str(tmp_path / "data"))
+        profiler.stop()
+
+        report_path, report = profiler.write("parse-partner")
+        assert json.loads(report_path.read_text())["mode"] == mode
+        assert list(report["stages"]) == ["read", "header", "transform", "validate", "load"]
+        assert report["files"]["testpos/items.csv"]["stages"]["load"]["rows_out"] == 2
+        assert report["traced_peak_bytes"] > 0
+        assert 0 < len(report["allocations"]) <= 5
+        if mode == "deterministic":
+            assert 0 < len(report["hotspots"]) <= 5
+            assert report_path.with_suffix(".prof").exists()
+    assert not (tmp_path / "metrics").exists()
+
+
+def test_profiler_samples_where_threads_share_one_cprofile(monkeypatch):
+    """Test that the deterministic mode falls back to sampling where cProfile cannot run per thread."""
+    import threading
+
+    from src.services import profiling
+
+    monkeypatch.setattr(profiling, "_PER_THREAD_PROFILERS", False)
+    profiler = profiling.Profiler(mode=profiling.DETERMINISTIC, sample_interval=0.001)
+    assert profiler.mode == profiling.SAMPLING
+
+    profiler.start()
+    worker = threading.Thread(target=lambda: sum(i * i for i in range(200000)))
+    worker.start()
+    worker.join()
+    profiler.stop()
+    assert profiler.report("test")["mode"] == profiling.SAMPLING
@@ -0,0 +1,157 @@
+"""Tests for the job queue."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+
+def test_job_queue_scheduling_and_retries(tmp_path, monkeypatch):
+    """Test that queued files run parents first, then smallest first, and failures back off."""
+    from src.services import job_queue as job_queue_module
+    from src.services.job_queue import JobQueue
+
+    files = {}
+    for name, size in [("orders.csv", 500), ("big_items.csv", 900), ("small_items.csv", 100)]:
+        files[name] = tmp_path / name
+        files[name].write_bytes(b"x" * size)
+    clock = [1000.0]
+    monkeypatch.setattr(job_queue_module.time, "time", lambda: clock[0])
+    queue = JobQueue(f"sqlite:///{tmp_path / 'jobs.sqlite'}", partner_concurrency=2, retry_delay=10,
+                     aging_rate=1.0)
+
+    queue.enqueue("testpos", [(files["orders.csv"], 1), (files["big_items.csv"], 2), (files["small_items.csv"], 2)])
+    assert queue.enqueue("testpos", [(files["orders.csv"], 1)]) == []
+
+    # Child files wait for the parent file, then the smaller child goes first
+    orders = queue.claim()
+    assert Path(orders.file_path).name == "orders.csv"
+    assert queue.claim() is None
+    queue.complete(orders, {"run_id": "r1", "records_processed": 5})
+    small = queue.claim()
+    assert Path(small.file_path).name == "small_items.csv"
+
+    # A failed attempt is retried after an exponentially growing delay
+    assert queue.fail(small, "boom")
+    big = queue.claim()
+    assert Path(big.file_path).name == "big_items.csv"
+    assert queue.claim() is None
+    clock[0] += 10
+    small = queue.claim()
+    assert small.attempts == 2
+    queue.fail(small, "boom")
+    clock[0] += 10
+    assert queue.claim() is None
+    clock[0] += 10
+    small = queue.claim()
+    assert not queue.fail(small, "boom")
+    assert queue.counts() == {"testpos": {"done": 1, "running": 1, "failed": 1}}
+
+    # Waiting long enough lets a large file overtake newer small ones
+    queue.complete(big, {"records_processed": 1})
+    queue.enqueue("other", [(files["big_items.csv"], 0)])
+    clock[0] += 1000
+    queue.enqueue("other", [(files["small_items.csv"], 0)])
+    assert Path(queue.claim().file_path).name == "big_items.csv"
+
+
+def test_job_queue_drained_through_processing_service(tmp_path, recording_database, create_service):
+    """Test that draining the queue loads every queued file of a partner."""
+    from src.services.job_queue import JobQueue
+
+    data_path = tmp_path / "data" / "testpos"
+    for month, row in [("june", "i1,o1,Tea,2,10"), ("july", "i2,o2,Bun,1,15")]:
+        (data_path / month).mkdir(parents=True)
+        (data_path / month / "items.csv").write_text(f"Item ID,Order ID,Item,Qty,Rate\n{row}\n")
+    database = recording_database
+    service = create_service(tmp_path, database, referential_checks=False)
+    queue = JobQueue(f"sqlite:///{tmp_path / 'jobs.sqlite'}")
+
+    queue.enqueue("testpos", service.plan_files(str(tmp_path / "data"), "testpos"))
+    stats = queue.drain(lambda job: service.process_files(job.partner_id, [Path(job.file_path)]), workers=2)
+
+    assert (stats.succeeded, stats.failed, stats.records_processed) == (2, 0, 2)
+    assert [job.status for job in queue.jobs()] == ["done", "done"]
+    assert queue.drain(lambda job: None).succeeded == 0
+
+
+def test_job_queue_leases_expire_and_pass_to_other_nodes(tmp_path, monkeypatch):
+    """Test that a node's expired jobs are reclaimed by another node and its late result is discarded."""
+    from src.services import job_queue as job_queue_module
+    from src.services.job_queue import JobQueue, LeaseLostError
+
+    files = []
+    for name in ["a.csv", "b.csv", "c.csv"]:
+        files.append(tmp_path / name)
+        files[-1].write_bytes(b"x" * 10)
+    clock = [1000.0]
+    monkeypatch.setattr(job_queue_module.time, "time", lambda: clock[0])
+    url = f"sqlite:///{tmp_path / 'jobs.sqlite'}"
+    node_a = JobQueue(url, partner_concurrency=3, lease_seconds=60, node_id="a")
+    node_b = JobQueue(url, partner_concurrency=3, lease_seconds=60, node_id="b")
+
+    node_a.enqueue("testpos", [(path, 0) for path in files])
+    # A second node queueing the same drop adds nothing
+    assert node_b.enqueue("testpos", [(path, 0) for path in files], skip_done=True) == []
+    first = node_a.claim()
+    second = node_b.claim()
+    assert first.id != second.id and (first.lease_owner, second.lease_owner) == ("a", "b")
+    # Running jobs are only requeued once their lease has expired
+    assert node_b.requeue(statuses=("failed", "running")) == 0
+
+    # Node a keeps its lease alive; node b stops sending heartbeats
+    clock[0] += 50
+    assert node_a.heartbeat() == 1
+    clock[0] += 20
+    taken_over = node_a.claim()
+    assert taken_over.id == second.id and taken_over.attempts == 2
+    assert "Lease of b expired" in taken_over.last_error
+    with pytest.raises(LeaseLostError):
+        node_b.complete(second, {"records_processed": 1})
+    node_a.complete(first, {"records_processed": 1})
+    node_a.complete(taken_over, {"records_processed": 1})
+
+    # Done files are queued again by --distributed only once they change
+    third = node_b.claim()
+    node_b.complete(third, {"records_processed": 1})
+    assert node_b.enqueue("testpos", [(path, 0) for path in files], skip_done=True) == []
+    files[0].write_bytes(b"x" * 20)
+    assert len(node_b.enqueue("testpos", [(path, 0) for path in files], skip_done=True)) == 1
+
+
+def test_job_queue_shared_by_concurrent_nodes(tmp_path):
+    """Test that nodes draining one queue together run every job exactly once."""
+    import threading
+    import time
+    from src.services.job_queue import JobQueue
+
+    files = []
+    for index in range(12):
+        files.append(tmp_path / f"file_{index}.csv")
+        files[-1].write_bytes(b"x" * (index + 1))
+    url = f"sqlite:///{tmp_path / 'jobs.sqlite'}"
+    nodes = [JobQueue(url, partner_concurrency=4, heartbeat_interval=0.05, node_id=f"node-{n}") for n in range(3)]
+    nodes[0].enqueue("testpos", [(path, 0) for path in files])
+    processed = []
+
+    def process(node_id, job):
+        processed.append((node_id, job.file_path))
+        time.sleep(0.02)
+        return {"success": True, "records_processed": 1}
+
+    threads = [
+        threading.Thread(target=node.drain, args=(lambda job, node_id=node.node_id: process(node_id, job),),
+                         kwargs={"workers": 2, "poll_interval": 0.05})
+        for node in nodes
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(path for _, path in processed) == sorted(str(path.resolve()) for path in files)
+    assert len({node_id for node_id, _ in processed}) > 1
+    assert [job.status for job in nodes[0].jobs()] == ["done"] * 12
@@ -0,0 +1,129 @@
+"""Tests for the staged pipeline executor."""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+
+def test_pipeline_preserves_order_and_bounds_in_flight_items():
+    """Test that results keep input order and a slow stage throttles the reader."""
+    from src.services.pipeline_executor import PipelineExecutor, PipelineStage
+
+    lock = threading.Lock()
+    state = {"read": 0, "loaded": 0, "max_ahead": 0}
+    load_order = []
+
+    def read(item):
+        with lock:
+            state["read"] += 1
+            state["max_ahead"] = max(state["max_ahead"], state["read"] - state["loaded"])
+        time.sleep(0.001 * (item % 3))
+        return item
+
+    def load(item):
+        time.sleep(0.005)
+        load_order.append(item)
+        with lock:
+            state["loaded"] += 1
+        return item * 10
+
+    executor = PipelineExecutor([
+        PipelineStage("read", read, workers=3),
+        PipelineStage("load", load, workers=1, ordered=True),
+    ], queue_size=2)
+
+    results = executor.run(range(30))
+
+    assert results == [item * 10 for item in range(30)]
+    assert load_order == list(range(30))
+    assert state["max_ahead"] <= 3 + 2 + 2 + 1
+
+
+def test_pipeline_groups_overlap_only_within_a_group():
+    """Test that an item of a grouped stage waits for earlier items of other groups to finish."""
+    from src.services.pipeline_executor import PipelineExecutor, PipelineStage
+
+    lock = threading.Lock()
+    running = set()
+    overlaps = []
+
+    def load(item):
+        group, _ = item
+        with lock:
+            overlaps.extend((group, other) for other, _ in running if other != group)
+            running.add(item)
+        time.sleep(0.01)
+        with lock:
+            running.discard(item)
+        return item
+
+    items = [("a", 0), ("a", 1), ("a", 2), ("b", 0), ("b", 1), ("c", 0)]
+    executor = PipelineExecutor([
+        PipelineStage("load", load, workers=3, ordered=True, group=lambda item: item[0]),
+    ], queue_size=2)
+
+    assert executor.run(items) == items
+    assert overlaps == []
+    with pytest.raises(ValueError):
+        PipelineExecutor([PipelineStage("load", load, group=lambda item: item[0])])
+
+
+def test_pipeline_propagates_first_error():
+    """Test that a failing stage cancels the run and its error reaches the caller."""
+    from src.services.pipeline_executor import PipelineExecutor, PipelineStage
+
+    seen = []
+
+    def transform(item):
+        if item == 3:
+            raise ValueError("bad item")
+        seen.append(item)
+        return item
+
+    executor = PipelineExecutor([PipelineStage("transform", transform, workers=2)], queue_size=1)
+
+    with pytest.raises(ValueError, match="bad item"):
+        executor.run(range(1000))
+    assert len(seen) < 1000
+
+
+def test_pipeline_cancel():
+    """Test that cancel() stops a blocked run."""
+    from src.services.pipeline_executor import PipelineCancelled, PipelineExecutor, PipelineStage
+
+    started = threading.Event()
+
+    def slow(item):
+        started.set()
+        time.sleep(0.01)
+        return item
+
+    executor = PipelineExecutor([PipelineStage("slow", slow)], queue_size=1)
+    threading.Thread(target=lambda: (started.wait(), executor.cancel()), daemon=True).start()
+
+    with pytest.raises(PipelineCancelled):
+        executor.run(iter(range(10 ** 6)))
+
+
+def test_arrow_handoff_round_trip(tmp_path):
+    """Test that frames survive the Arrow IPC hand-off, including mixed-type columns."""
+    import pandas as pd
+
+    from src.parsers.arrow_handoff import read_frame, write_frame
+
+    df = pd.DataFrame({"Order ID": ["o1", "o2", None], "Qty": [1, "two", None], "Rate": [1.5, 2.0, None]})
+
+    handle = write_frame(df, "items", tmp_path)
+    restored = read_frame(handle, arrow_dtypes=True)
+
+    assert handle.rows == 3
+    assert not Path(handle.path).exists()
+    assert restored["Order ID"].tolist()[:2] == ["o1", "o2"]
+    assert restored["Qty"].tolist()[:2] == ["1", "two"]
+    assert str(restored["Rate"].dtype) == "double[pyarrow]"
@@ -0,0 +1,469 @@
+"""Tests for the data processing pipeline."""
+
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+
+@pytest.mark.parametrize("string_storage", ["python", "pyarrow"])
+def test_rejects_quarantined_and_replayed(tmp_path, recording_database, create_service, string_storage):
+    """Test that bad rows are quarantined, good rows load and corrected rejects replay."""
+    data_path = tmp_path / "data" / "testpos"
+    data_path.mkdir(parents=True)
+    (data_path / "items.csv").write_text(
+        "Item ID,Order ID,Item,Qty,Rate\n"
+        "i1,o1,Tea,2,10\n"
+        "i2,o1,Coffee,two,20\n"
+        "i3,o2,,1,5\n"
+        "i4,o2,Bun,1,15\n"
+    )
+    database = recording_database
+    database.inserted["orders"] = [pd.DataFrame({"order_id": ["o1", "o2"]})]
+    service = create_service(tmp_path, database, string_storage=string_storage)
+
+    result = service.process_partner_data("testpos", str(tmp_path / "data"))
+
+    assert result["success"]
+    assert result["records_processed"] == 2
+    assert result["records_rejected"] == 2
+    assert database.inserted["order_items"][0]["order_item_id"].tolist() == ["i1", "i4"]
+    if string_storage == "pyarrow":
+        assert database.inserted["order_items"][0]["item_name"].dtype == "string[pyarrow]"
+
+    rejects = service.reject_service.load(result["run_id"])
+    assert rejects["_reject_reason"].tolist() == ["type_coercion", "validation"]
+    assert rejects["_reject_detail"].tolist() == ["quantity;", "order_items.item_name.not_null;"]
+
+    # Correct the quarantined rows and replay only them
+    reject_file = next((tmp_path / "rejects" / result["run_id"]).glob("*.parquet"))
+    corrected = rejects.copy()
+    corrected["Qty"] = ["2", "1"]
+    corrected["Item"] = ["Coffee", "Muffin"]
+    corrected.to_csv(reject_file.with_suffix(".csv"), index=False)
+
+    # A replay that fails to load leaves the rejects to be replayed again
+    def lose_connection(*args):
+        raise RuntimeError("connection lost")
+
+    database.insert_data_with_recovery = lose_connection
+    assert not service.reingest_rejects(result["run_id"])["success"]
+    assert not service.reject_service.list_runs()[0]["replayed"]
+    del database.insert_data_with_recovery
+
+    replay = service.reingest_rejects(result["run_id"])
+
+    assert replay["success"]
+    assert replay["records_processed"] == 2
+    assert replay["records_rejected"] == 0
+    assert database.inserted["order_items"][1]["total_price"].tolist() == [40.0, 5.0]
+    assert service.reject_service.list_runs()[0]["replayed"]
+
+    # Replaying again would load the rows twice, so it needs force
+    again = service.reingest_rejects(result["run_id"])
+    assert not again["success"]
+    assert "already replayed" in again["errors"][0]
+    assert len(database.inserted["order_items"]) == 2
+    assert service.reingest_rejects(result["run_id"], force=True)["records_processed"] == 2
+
+
+def test_foreign_keys_checked_before_load(tmp_path, recording_database, create_service):
+    """Test that rows referencing missing parents are quarantined before any insert."""
+    data_path = tmp_path / "data" / "testpos"
+    data_path.mkdir(parents=True)
+    (data_path / "items.csv").write_text(
+        "Item ID,Order ID,Item,Qty,Rate\n"
+        "i1,o1,Tea,2,10\n"
+        "i2,o9,Coffee,1,20\n"
+    )
+    database = recording_database
+    database.inserted["orders"] = [pd.DataFrame({"order_id": ["o1"]})]
+    service = create_service(tmp_path, database)
+
+    result = service.process_partner_data("testpos", str(tmp_path / "data"))
+
+    assert result["success"]
+    assert result["records_processed"] == 1
+    assert database.inserted["order_items"][0]["order_item_id"].tolist() == ["i1"]
+    rejects = service.reject_service.load(result["run_id"])
+    assert rejects["_reject_reason"].tolist() == ["foreign_key"]
+    assert rejects["_reject_detail"].tolist() == ["order_items.order_id.foreign_key;"]
+
+
+def test_child_file_loaded_after_parent_with_several_loaders(tmp_path, recording_database, create_service,
+                                                             items_config):
+    """Test that a child file does not start loading while its parent file is still loading."""
+    import threading
+    import time
+
+    data_path = tmp_path / "data" / "testpos"
+    data_path.mkdir(parents=True)
+    (data_path / "orders.csv").write_text("Order ID,Outlet,Source,Date,Status,Type\n"
+                                          "o1,out1,src1,2024-01-01,delivered,delivery\n")
+    (data_path / "items.csv").write_text("Item ID,Order ID,Item,Qty,Rate\ni1,o1,Tea,2,10\n")
+    config = items_config
+    config["source_config"]["sheets_config"].insert(0, {
+        "sheet_name": "orders",
+        "target_table": "orders",
+        "column_mappings": [
+            {"source_column": "Order ID", "system_column": "order_id"},
+            {"source_column": "Outlet", "system_column": "partner_outlet_id"},
+            {"source_column": "Source", "system_column": "source_id"},
+            {"source_column": "Date", "system_column": "order_date"},
+            {"source_column": "Status", "system_column": "order_status"},
+            {"source_column": "Type", "system_column": "order_type"}
+        ]
+    })
+    events = []
+    lock = threading.Lock()
+
+    insert = recording_database.insert_data_with_recovery
+
+    def slow_parent_insert(df, table_name, batch_size=1000):
+        with lock:
+            events.append(("start", table_name))
+        if table_name == "orders":
+            time.sleep(0.3)
+        result = insert(df, table_name, batch_size)
+        with lock:
+            events.append(("end", table_name))
+        return result
+
+    recording_database.insert_data_with_recovery = slow_parent_insert
+    service = create_service(tmp_path, recording_database, config=config, referential_checks=False,
+                             reader_workers=2, transform_workers=2, loader_workers=2)
+
+    result = service.process_partner_data("testpos", str(tmp_path / "data"))
+
+    assert result["success"], result["errors"]
+    assert events == [("start", "orders"), ("end", "orders"), ("start", "order_items"), ("end", "order_items")]
+
+
+def test_key_set_membership():
+    """Test vectorized key lookups, with missing values treated as present."""
+    from src.validators.referential_integrity import KeySet
+
+    key_set = KeySet()
+    key_set.update(pd.Series(["a", "b", 3]))
+
+    found = key_set.contains(pd.Series(["b", "3", "z", None]))
+
+    assert found.tolist() == [True, True, False, True]
+
+
+def test_sheet_fanned_out_to_several_tables(tmp_path, recording_database, create_service, items_config, monkeypatch):
+    """Test that one read of a sheet feeds every table configured as its target."""
+    from src.parsers.csv_parser import CSVParser
+
+    config = items_config
+    sheet = config["source_config"]["sheets_config"][0]
+    sheet["targets"] = [
+        {"target_table": "order_items", "column_mappings": sheet.pop("column_mappings")},
+        {
+            "target_table": "order_financial_details",
+            "column_mappings": [
+                {"source_column": "Order ID", "system_column": "order_id"},
+                {"source_column": "Rate", "system_column": "subtotal"},
+                {"source_column": "Rate", "system_column": "final_amount"},
+                {"system_column": "financial_id", "key_columns": ["order_id"], "key_prefix": "fin_"}
+            ],
+            "filters": {"order_id": {"type": "equals", "value": "o1"}}
+        }
+    ]
+    del sheet["target_table"]
+    data_path = tmp_path / "data" / "testpos"
+    data_path.mkdir(parents=True)
+    (data_path / "items.csv").write_text("Item ID,Order ID,Item,Qty,Rate\ni1,o1,Tea,2,10\ni2,o2,Bun,1,15\n")
+    parses = []
+    parse = CSVParser.parse
+    monkeypatch.setattr(CSVParser, "parse", lambda self, *args: parses.append(args) or parse(self, *args))
+    database = recording_database
+    service = create_service(tmp_path, database, config=config, referential_checks=False)
+
+    result = service.process_partner_data("testpos", str(tmp_path / "data"))
+
+    assert result["success"]
+    assert len(parses) == 1
+    assert database.inserted["order_items"][0]["order_item_id"].tolist() == ["i1", "i2"]
+    financials = database.inserted["order_financial_details"][0]
+    assert financials["order_id"].tolist() == ["o1"]
+    assert financials["subtotal"].tolist() == [10.0]
+    assert financials["financial_id"].str.startswith("fin_").all()
+
+
+def test_config_registry_revalidates_only_changed_files(tmp_path, items_config, monkeypatch):
+    """Test that configs are validated once and reloaded only when their content changes."""
+    import os
+    from src.config import registry
+    from src.services.config_service import ConfigService
+
+    validations = []
+    partner_config = registry.PartnerConfig
+    monkeypatch.setattr(registry, "PartnerConfig", lambda **data: validations.append(1) or partner_config(**data))
+    config_file = tmp_path / "testpos.json"
+    config_file.write_text(json.dumps(items_config))
+    service = ConfigService(str(tmp_path))
+
+    first = service.load_partner_config("testpos")
+    assert service.load_partner_config("testpos") is first
+    os.utime(config_file, ns=(0, 0))
+    assert service.load_partner_config("testpos") is first
+    assert len(validations) == 1
+
+    compiled = service.get_compiled_config("testpos")
+    assert compiled.source_columns["items"] == {"Item ID", "Order ID", "Item", "Qty", "Rate"}
+    assert compiled.missing_columns("items", "order_items", ["Item ID", "Order ID", "Item"]) == ["Qty", "Rate"]
+
+    changed = json.loads(json.dumps(items_config))
+    changed["partner_name"] = "Renamed"
+    config_file.write_text(json.dumps(changed))
+    assert service.load_partner_config("testpos")["partner_name"] == "Renamed"
+    assert len(validations) == 2
+
+
+def test_legacy_config_normalized_and_files_routed():
+    """Test that the legacy swiggy layout loads and its file_patterns route files in one match."""
+    from src.config.registry import FileRouter
+    from src.services.config_service import ConfigService
+
+    service = ConfigService(str(Path(__file__).parent.parent / "configs" / "partners"))
+    compiled = service.get_compiled_config("swiggy")
+    source = compiled.config["source_config"]
+
+    assert compiled.partner_id == "swiggy"
+    assert [(sheet["sheet_name"], sheet["target_table"], sheet["headers_row"]) for sheet in source["sheets_config"]] \
+        == [("Summary", "partners", 1), ("Order Level", "orders", 3)]
+    status = source["sheets_config"][1]["column_mappings"][-1]
+    assert status["transformations"] == [
+        {"type": "map", "values": {"Delivered": "delivered", "Cancelled": "cancelled", "Refunded": "refunded"}}
+    ]
+    assert compiled.route("Swiggy_Invoice-Annexure_June.XLSX") is source
+    assert compiled.route("notes.csv") is None
+
+    router = FileRouter([["*.csv"], ["orders*.csv", "*.xlsx"], []])
+    assert [router.route(name) for name in ["orders_1.csv", "report.XLSX", "report.json"]] == [0, 1, 2]
+
+
+def test_files_parsed_in_reader_processes(tmp_path, recording_database, create_service):
+    """Test that frames parsed in a worker process are handed back through Arrow IPC files."""
+    data_path = tmp_path / "data" / "testpos"
+    data_path.mkdir(parents=True)
+    (data_path / "items.csv").write_text("Item ID,Order ID,Item,Qty,Rate\ni1,o1,Tea,2,10\n")
+    handoff_path = tmp_path / "handoff"
+    handoff_path.mkdir()
+    database = recording_database
+    service = create_service(tmp_path, database, referential_checks=False, reader_processes=1,
+                             handoff_dir=str(handoff_path))
+
+    try:
+        result = service.process_partner_data("testpos", str(tmp_path / "data"))
+    finally:
+        service.close()
+
+    assert result["success"]
+    assert database.inserted["order_items"][0]["total_price"].tolist() == [20.0]
+    assert list(handoff_path.iterdir()) == []
+
+
+def test_files_streamed_under_memory_budget(tmp_path, recording_database, create_service):
+    """Test that a file over the memory budget is processed in chunks with whole-sheet row numbers."""
+    data_path = tmp_path / "data" / "testpos"
+    data_path.mkdir(parents=True)
+    rows = [f"i{index},o1,Tea,1,10" for index in range(2500)]
+    rows[2200] = "i2200,o1,Tea,one,10"
+    (data_path / "items.csv").write_text("Item ID,Order ID,Item,Qty,Rate\n" + "\n".join(rows) + "\n")
+    database = recording_database
+    service = create_service(tmp_path, database, referential_checks=False, memory_budget=64 * 1024)
+
+    result = service.process_partner_data("testpos", str(tmp_path / "data"))
+
+    assert result["success"]
+    assert [plan["mode"] for plan in result["plans"]] == ["chunked"]
+    assert result["files_processed"] == 1
+    assert result["records_processed"] == 2499
+    assert [len(frame) for frame in database.inserted["order_items"]] == [1000, 1000, 499]
+    assert service.reject_service.load(result["run_id"])["_source_row"].tolist() == [2200]
+
+
+def test_global_transformations_out_of_core(tmp_path, recording_database, create_service, items_config):
+    """Test that sort and remove_duplicates over spilled chunks match the in-memory result."""
+    items_config["source_config"]["global_transformations"] = [
+        {"type": "remove_empty_rows"},
+        {"type": "remove_duplicates"},
+        {"type": "sort", "columns": ["unit_price", "item_name"], "ascending": [False, True]}
+    ]
+    data_path = tmp_path / "data" / "testpos"
+    data_path.mkdir(parents=True)
+    # The last 1000 rows repeat earlier ones, in other chunks
+    rows = [f"i{index},o{index % 7},Item {index % 13},1,{index % 50}" for index in range(1500)]
+    rows += rows[:1000]
+    rows[1700] = "i1700,o1,Tea,one,10"
+    (data_path / "items.csv").write_text("Item ID,Order ID,Item,Qty,Rate\n" + "\n".join(rows) + "\n")
+
+    loaded = {}
+    for name, kwargs in {"whole": {}, "spill": {"memory_budget": 64 * 1024}}.items():
+        run_path = tmp_path / f"run_{name}"
+        run_path.mkdir()
+        recording_database.inserted.clear()
+        service = create_service(run_path, recording_database, config=items_config, referential_checks=False,
+                                 spill_dir=str(tmp_path / "spill"), **kwargs)
+        result = service.process_partner_data("testpos", str(tmp_path / "data"))
+        assert result["success"]
+        assert [plan["mode"] for plan in result["plans"]] == ([] if name == "whole" else ["spill"])
+        assert service.reject_service.load(result["run_id"])["_source_row"].tolist() == [1700]
+        loaded[name] = pd.concat(recording_database.inserted["order_items"])
+
+    assert len(loaded["whole"]) == 1500
+    pd.testing.assert_frame_equal(loaded["spill"], loaded["whole"])
+    assert list((tmp_path / "spill").iterdir()) == []
+
+
+def test_memory_sizes_parsed():
+    """Test memory budget strings."""
+    from src.config.sizes import parse_memory_size
+
+    assert parse_memory_size("2GB") == 2 * 1024 ** 3
+    assert parse_memory_size("512 mb") == 512 * 1024 ** 2
+    assert parse_memory_size("") == 0
+    with pytest.raises(ValueError):
+        parse_memory_size("lots")
+
+
+def test_overlapping_rows_skipped(tmp_path, recording_database, create_service):
+    """Test that rows loaded by an earlier run are skipped when a report overlaps it."""
+    from src.services.fingerprint_service import FingerprintService
+
+    data_path = tmp_path / "data" / "testpos"
+    data_path.mkdir(parents=True)
+    items = data_path / "items.csv"
+    items.write_text("Item ID,Order ID,Item,Qty,Rate\ni1,o1,Tea,2,10\ni2,o1,Coffee,1,20\n")
+    database = recording_database
+    service = create_service(tmp_path, database, referential_checks=False, row_fingerprints=True,
+                             fingerprint_service=FingerprintService(str(tmp_path / "fingerprints")))
+
+    first = service.process_partner_data("testpos", str(tmp_path / "data"))
+    # The monthly report repeats the weekly rows and adds one
+    items.write_text("Item ID,Order ID,Item,Qty,Rate\ni1,o1,Tea,2,10\ni2,o1,Coffee,1,20\ni3,o2,Bun,1,15\n")
+    second = service.process_partner_data("testpos", str(tmp_path / "data"))
+
+    assert (first["records_processed"], first["records_skipped"]) == (2, 0)
+    assert (second["records_processed"], second["records_skipped"]) == (1, 2)
+    assert database.inserted["order_items"][1]["order_item_id"].tolist() == ["i3"]
+
+
+
+def test_repeated_items_keyed_alike_in_overlapping_reports(tmp_path, recording_database, create_service,
+                                                          items_config):
+    """Test that occurrence-numbered item keys do not depend on where an order sits in its file."""
+    from src.services.fingerprint_service import FingerprintService
+
+    column_mappings = items_config["source_config"]["sheets_config"][0]["column_mappings"]
+    del column_mappings[0]
+    column_mappings.append(
+        {"system_column": "order_item_id", "key_columns": ["order_id", "item_name"], "key_occurrence": True}
+    )
+    data_path = tmp_path / "data" / "testpos"
+    data_path.mkdir(parents=True)
+    items = data_path / "items.csv"
+    items.write_text("Order ID,Item,Qty,Rate\no2,Tea,2,10\no2,Tea,1,12\no2,Bun,1,15\n")
+    service = create_service(tmp_path, recording_database, config=items_config, referential_checks=False,
+                             row_fingerprints=True,
+                             fingerprint_service=FingerprintService(str(tmp_path / "fingerprints")))
+
+    weekly = service.process_partner_data("testpos", str(tmp_path / "data"))
+    weekly_keys = recording_database.inserted["order_items"][0]["order_item_id"].tolist()
+    # The monthly report lists another order first, so o2's lines sit at other offsets
+    items.write_text("Order ID,Item,Qty,Rate\no1,Cake,1,30\no2,Tea,2,10\no2,Tea,1,12\no2,Bun,1,15\n")
+    monthly_frame = service.data_transformer.transform(
+        pd.read_csv(items, dtype=str), items_config["source_config"]["sheets_config"][0]
+    )
+    monthly = service.process_partner_data("testpos", str(tmp_path / "data"))
+
+    assert len(set(weekly_keys)) == 3
+    assert monthly_frame["order_item_id"].tolist()[1:] == weekly_keys
+    assert (weekly["records_processed"], monthly["records_skipped"], monthly["records_processed"]) == (3, 3, 1)
+    assert recording_database.inserted["order_items"][1]["item_name"].tolist() == ["Cake"]
+
+
+def test_fingerprint_store_compaction(tmp_path):
+    """Test that fingerprint segments are merged into one sorted base file."""
+    import numpy as np
+    from src.services.fingerprint_service import FingerprintStore
+
+    store = FingerprintStore(tmp_path / "store", compact_after=3)
+    store.add(np.array([30, 10], dtype="uint64"))
+    store.add(np.array([20, 10], dtype="uint64"))
+    assert len(list((tmp_path / "store").iterdir())) == 2
+    store.add(np.array([40], dtype="uint64"))
+
+    assert [path.name for path in (tmp_path / "store").iterdir()] == ["fingerprints.u64"]
+    assert np.fromfile(tmp_path / "store" / "fingerprints.u64", dtype="uint64").tolist() == [10, 20, 30, 40]
+    assert store.contains(np.array([40, 15, 10], dtype="uint64")).tolist() == [True, False, True]
+
+
+def test_checkpointed_load_resumes_after_crash(tmp_path, create_service, items_config, monkeypatch):
+    """Test that a streamed file failing mid-load resumes at its last checkpoint without duplicates."""
+    from sqlalchemy import text
+    from src.database import connection
+    from src.services.database_service import DatabaseService
+
+    config = {**items_config, "source_config": {"file_format": "csv", "sheets_config": [{
+        "sheet_name": "partners",
+        "target_table": "partners",
+        "column_mappings": [
+            {"source_column": "Partner ID", "system_column": "partner_id"},
+            {"source_column": "Name", "system_column": "partner_name"}
+        ]
+    }]}}
+    data_path = tmp_path / "data" / "testpos"
+    data_path.mkdir(parents=True)
+    rows = [f"p{index},Partner {index}" for index in range(2500)]
+    rows[300] = "p300,"
+    rows[2200] = "p2200,"
+    (data_path / "partners.csv").write_text("Partner ID,Name\n" + "\n".join(rows) + "\n")
+    connection._db_connection = connection.DatabaseConnection(f"sqlite:///{tmp_path / 'test.db'}")
+    connection._db_connection.create_tables()
+    service = create_service(tmp_path, DatabaseService(), config, referential_checks=False, insert_recovery=False,
+                             memory_budget=64 * 1024, batch_size=100, checkpoint_every=4)
+
+    # The 18th batch (rows 1700-1799 of the second chunk) fails; the second chunk committed up to row 1400
+    insert_batch = DatabaseService._insert_batch
+    calls = []
+
+    def failing_insert_batch(self, session, table_name, records):
+        calls.append(len(records))
+        if len(calls) == 18:
+            raise RuntimeError("connection lost")
+        return insert_batch(self, session, table_name, records)
+
+    monkeypatch.setattr(DatabaseService, "_insert_batch", failing_insert_batch)
+    try:
+        first = service.process_partner_data("testpos", str(tmp_path / "data"))
+        assert not first["success"]
+        assert first["records_processed"] == 999 + 400
+        # The third chunk is not loaded past the gap left by the second
+        assert any("earlier chunk failed" in error for error in first["errors"])
+        assert service.reject_service.load(first["run_id"])["_source_row"].tolist() == [300]
+
+        monkeypatch.setattr(DatabaseService, "_insert_batch", insert_batch)
+        resumed = service.process_partner_data("testpos", str(tmp_path / "data"))
+        assert resumed["success"]
+        assert resumed["records_processed"] == 600 + 499
+        assert service.reject_service.load(resumed["run_id"])["_source_row"].tolist() == [2200]
+
+        # Every version of a file loads once
+        again = service.process_partner_data("testpos", str(tmp_path / "data"))
+        assert again["success"] and again["records_processed"] == 0
+
+        with connection._db_connection.engine.connect() as conn:
+            count, distinct = conn.execute(
+                text("SELECT COUNT(*), COUNT(DISTINCT partner_id) FROM partners")
+            ).one()
+        assert count == distinct == 2498
+    finally:
+        connection.close_database_connection()
@@ -0,0 +1,97 @@
+"""Tests for data validation."""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+
+def test_model_derived_rules():
+    """Test that rules are generated from the table definition."""
+    from src.validators.rules import build_table_rules
+
+    rules = {rule.rule_id: rule for rule in build_table_rules("order_items")}
+
+    assert "order_items.order_id.not_null" in rules
+    assert rules["order_items.item_name.max_length"].params["length"] == 255
+    assert rules["order_items.unit_price.numeric_precision"].params["limit"] == 10 ** 8
+    assert rules["order_items.primary_key.unique"].columns == ("order_item_id",)
+    assert "order_items.created_at.not_null" not in rules
+
+
+def test_validate_reports_rule_masks():
+    """Test per-rule violation counts and the combined row mask."""
+    from src.validators.data_validator import DataValidator
+
+    df = pd.DataFrame({
+        "payment_id": ["p1", "p2", "p2", "p4"],
+        "order_id": ["o1", None, "o3", "o4"],
+        "payment_method": ["CASH", "upi", "cheque", "card"],
+        "payment_status": ["COMPLETED", "pending", "failed", "refunded"],
+        "amount": [10.0, 1e9, 5.0, -1.0],
+        "currency": ["INR", "INR", "RUPEES", "INR"],
+    })
+
+    result = DataValidator().validate(df, "payments")
+
+    assert not result["valid"]
+    assert result["violations"] == {
+        "payments.order_id.not_null": 1,
+        "payments.payment_method.enum": 1,
+        "payments.amount.numeric_precision": 1,
+        "payments.currency.max_length": 1,
+        "payments.primary_key.unique": 1,
+        "payments.amount.non_negative": 1,
+    }
+    assert result["row_mask"].tolist() == [False, True, True, False]
+    assert len(result["warnings"]) == 1
+
+
+def test_missing_required_column():
+    """Test that an unmapped non-nullable column flags every row."""
+    from src.validators.data_validator import DataValidator
+
+    df = pd.DataFrame({"order_item_id": ["i1", "i2"], "order_id": ["o1", "o2"]})
+    result = DataValidator().validate(df, "order_items")
+
+    assert result["violations"]["order_items.item_name.required_column"] == 2
+    assert result["row_mask"].all()
+
+
+def test_sample_validation_escalates_on_dirty_sample():
+    """Test that a clean sample skips full validation and a dirty one escalates."""
+    from src.validators.data_validator import DataValidator
+
+    df = pd.DataFrame({
+        "payment_id": [f"p{i}" for i in range(1000)],
+        "order_id": ["o1"] * 1000,
+        "payment_method": ["cash"] * 1000,
+        "payment_status": ["completed"] * 1000,
+        "amount": [10.0] * 1000,
+    })
+    validator = DataValidator(mode="sample", sample_size=100, escalation_rate=0.05)
+
+    clean = validator.validate(df, "payments")
+
+    assert (clean["mode"], clean["sample_size"], clean["escalated"]) == ("sample", 100, False)
+    assert clean["valid"]
+    assert any("100 of 1000 rows (10.0%)" in warning for warning in clean["warnings"])
+
+    # Nulls are checked on every row, sampled or not
+    sparse_df = df.copy()
+    sparse_df.loc[[3, 501], "order_id"] = None
+    sparse = validator.validate(sparse_df, "payments")
+
+    assert sparse["mode"] == "sample"
+    assert sparse["violations"]["payments.order_id.not_null"] == 2
+    assert sparse["row_mask"].nonzero()[0].tolist() == [3, 501]
+
+    dirty_df = df.copy()
+    dirty_df.loc[::2, "order_id"] = None
+    dirty = validator.validate(dirty_df, "payments")
+
+    assert (dirty["mode"], dirty["escalated"]) == ("full", True)
+    assert dirty["violations"]["payments.order_id.not_null"] == 500